@@ -21,6 +21,12 @@ from arch_classes import *
 #  The "tsar_generic_leti" architecture  includes 5 external peripherals located 
 #  in cluster[x_size-1][y_size-1]: TTY, IOC, FBF, NIC, PIC.
 #  The upper row (y = y_size-1) does not contain processors or memory.
+#  When nb_ios > 1, secondary IO clusters are distributed in the upper row
+#  (see the io_clusters() function). Each secondary IO cluster contains one IOC,
+#  one NIC (nb_nics channels) and one PIC, with the same PIC ports as the
+#  main IO cluster. The TTY and FBF are only in the main IO cluster.
+#  The IOC of the secondary IO cluster k uses the "<disk_image>.k" file in the
+#  simulator (-DISK argument of top.cpp), and this file must exist.
 #  The "tsar_generic_leti" does not use the IOB component.
 #  It does not use an external ROM, as the preloader code is (pre)loaded
 #  at address 0x0, in the physical memory of cluster[0][0].
@@ -36,6 +42,21 @@ from arch_classes import *
 #  - nb_nics        : number of NIC channels (from 1 to 2)
 #  - fbf_width      : frame_buffer width = frame_buffer heigth
 #  - ioc_type       : can be 'IOC_BDV','IOC_HBA','IOC_SDC','IOC_RDK'
+#  - nb_ios         : number of IO clusters (from 1 to x_size)
+#
+#  The optional "geometry" parameters are not used by the OS, but are written in
+#  the "hard_config.h" file, and used by the top.cpp file to build the simulator:
+#  - memc_ways      : L2 cache number of ways (1 to 16, power of 2)
+#  - memc_sets      : L2 cache number of sets (16 to 4096, power of 2)
+#  - l1_iways       : L1 instruction cache number of ways (1 to 16, power of 2)
+#  - l1_isets       : L1 instruction cache number of sets (1 to 1024, power of 2)
+#  - l1_dways       : L1 data cache number of ways (1 to 16, power of 2)
+#  - l1_dsets       : L1 data cache number of sets (1 to 1024, power of 2)
+#  - xram_latency   : external RAM latency (cycles)
+#  - frozen_cycles  : max number of frozen cycles for a processor (debug)
+#  - bdv_async      : use the asynchronous disk image backend for the IOC_BDV
+#                     controllers of the IO clusters (0 or 1)
+#  The platform name includes the cache and memory geometry.
 #
 #  The others hardware parameters are defined below :
 #  - x_width        : number of bits for x coordinate
@@ -50,6 +71,50 @@ from arch_classes import *
 #####################################################################################
 
 
+########################
+def is_pow2( n ):
+
+    return (n > 0) and ((n & (n - 1)) == 0)
+
+########################
+class LetiArchinfo( Archinfo ):
+    '''
+    Archinfo extended with the simulator only parameters (cache and memory
+    geometry, IO clusters), that are appended to the generated "hard_config.h"
+    file (list of (name, value) tuples).
+    '''
+
+    def __init__( self, sim_defines, **kwargs ):
+
+        Archinfo.__init__( self, **kwargs )
+        self.sim_defines = sim_defines
+
+    def hard_config( self, *args ):
+
+        s = Archinfo.hard_config( self, *args )
+
+        g = '\n/* simulator only parameters */\n\n'
+        for ( name, value ) in self.sim_defines:
+            g += '#define %-24s %d\n' % (name, value)
+        g += '\n'
+
+        # insert before the final #endif of the include guard
+        index = s.rfind( '#endif' )
+        if index < 0: return s + g
+        return s[:index] + g + s[index:]
+
+########################
+def io_clusters( x_size, y_size, y_width, nb_ios ):
+    '''
+    Returns the list of IO clusters identifiers. The main IO cluster is the
+    upper right cluster, and the secondary IO clusters are distributed in the
+    upper row, from right to left, with a (x_size / nb_ios) step.
+    This must be consistent with the IO_X() macro in top.cpp.
+    '''
+
+    step = x_size // nb_ios
+    return [ (((x_size - 1) - k * step) << y_width) + (y_size - 1) for k in range( nb_ios ) ]
+
 ########################
 def arch( x_size    = 2,
           y_size    = 3,
@@ -57,7 +122,17 @@ def arch( x_size    = 2,
           nb_ttys   = 3,
           nb_nics  = 1,
           fbf_width = 128,
-          ioc_type  = 'IOC_BDV'):
+          ioc_type  = 'IOC_BDV',
+          nb_ios        = 1,
+          memc_ways     = 16,
+          memc_sets     = 256,
+          l1_iways      = 4,
+          l1_isets      = 64,
+          l1_dways      = 4,
+          l1_dsets      = 64,
+          xram_latency  = 0,
+          frozen_cycles = 500000,
+          bdv_async     = 0 ):
 
     ### architecture constants
 
@@ -91,10 +166,30 @@ def arch( x_size    = 2,
 
     assert( (io_cxy == 0) or (io_cxy == ((x_size-1)<<y_width) + (y_size-1)) ) 
 
+    assert( (nb_ios >= 1) and (nb_ios <= x_size) )
+
     assert( ((boot_cxy >> y_width) < x_size) and ((boot_cxy & ((1<<y_width)-1)) < y_size) )
 
     assert( (cache_line == 16) or (cache_line == 32) or (cache_line == 64)  )
 
+    assert( is_pow2( memc_ways ) and (memc_ways <= 16) )
+
+    assert( is_pow2( memc_sets ) and (memc_sets >= 16) and (memc_sets <= 4096) )
+
+    assert( is_pow2( l1_iways ) and (l1_iways <= 16) )
+
+    assert( is_pow2( l1_isets ) and (l1_isets <= 1024) )
+
+    assert( is_pow2( l1_dways ) and (l1_dways <= 16) )
+
+    assert( is_pow2( l1_dsets ) and (l1_dsets <= 1024) )
+
+    assert( xram_latency >= 0 )
+
+    assert( frozen_cycles > 0 )
+
+    assert( bdv_async in [0, 1] )
+
     # assert( nb_cores <= 4 )
 
     # assert( x_size <= (1 << x_width) )
@@ -111,6 +206,9 @@ def arch( x_size    = 2,
     ### define type and name 
 
     platform_name  = 'tsar_leti_%d_%d_%d' % ( x_size, y_size, nb_cores )
+    if nb_ios > 1: platform_name += '_io%d' % nb_ios
+    platform_name += '_i%dx%d_d%dx%d_m%dx%d_x%d' % ( l1_iways, l1_isets, l1_dways, l1_dsets,
+                                                     memc_ways, memc_sets, xram_latency )
 
     ### define physical segments replicated in all non-IO clusters
     ### the base address is extended by the cxy (8 bits)
@@ -146,20 +244,34 @@ def arch( x_size    = 2,
     ### call header constructor
     #############################
 
-    archi = Archinfo( name           = platform_name,
-                      x_size         = x_size,
-                      y_size         = y_size,
-                      cores_max      = nb_cores,
-                      devices_max    = devices_max,
-                      paddr_width    = paddr_width,
-                      x_width        = x_width,
-                      y_width        = y_width,
-                      irqs_per_core  = irq_per_proc,
-                      io_cxy         = io_cxy,          
-                      boot_cxy       = boot_cxy,
-                      cache_line     = cache_line,
-                      reset_address  = reset_address,
-                      p_width        = p_width )
+    io_cxys = io_clusters( x_size, y_size, y_width, nb_ios )
+
+    sim_defines = [ ('NB_IO_CLUSTERS'    , nb_ios),
+                    ('MEMC_WAYS'         , memc_ways),
+                    ('MEMC_SETS'         , memc_sets),
+                    ('L1_IWAYS'          , l1_iways),
+                    ('L1_ISETS'          , l1_isets),
+                    ('L1_DWAYS'          , l1_dways),
+                    ('L1_DSETS'          , l1_dsets),
+                    ('XRAM_LATENCY'      , xram_latency),
+                    ('MAX_FROZEN_CYCLES' , frozen_cycles),
+                    ('USE_BDV_ASYNC'     , bdv_async) ]
+
+    archi = LetiArchinfo( sim_defines    = sim_defines,
+                          name           = platform_name,
+                          x_size         = x_size,
+                          y_size         = y_size,
+                          cores_max      = nb_cores,
+                          devices_max    = devices_max,
+                          paddr_width    = paddr_width,
+                          x_width        = x_width,
+                          y_width        = y_width,
+                          irqs_per_core  = irq_per_proc,
+                          io_cxy         = io_cxy,          
+                          boot_cxy       = boot_cxy,
+                          cache_line     = cache_line,
+                          reset_address  = reset_address,
+                          p_width        = p_width )
 
     ###########################
     ### Hardware Description
@@ -225,13 +337,15 @@ def arch( x_size    = 2,
                                           (x<<y_width) + y,                           # cluster 
                                            p )                                        # local index            
 
-            ###  peripherals in external cluster_io 
-            if( cluster_xy == io_cxy ):
+            ###  peripherals in external IO clusters
+            ###  (TTY and FBF are only in the main IO cluster)
+            if( cluster_xy in io_cxys ):
 
-                tty = archi.addDevice( ptype    = 'TXT_TTY',
-                                       base     = tty_base + offset,
-                                       size     = tty_size, 
-                                       channels = nb_ttys )
+                if( cluster_xy == io_cxy ):
+                    tty = archi.addDevice( ptype    = 'TXT_TTY',
+                                           base     = tty_base + offset,
+                                           size     = tty_size, 
+                                           channels = nb_ttys )
 
                 ioc = archi.addDevice( ptype    = ioc_type,
                                        base     = ioc_base + offset,
@@ -242,11 +356,12 @@ def arch( x_size    = 2,
                                        size     = nic_size, 
                                        channels = nb_nics )
 
-                fbf = archi.addDevice( ptype    = 'FBF_SCL',
-                                       base     = fbf_base + offset,
-                                       size     = fbf_size, 
-                                       arg0     = fbf_width,
-                                       arg1     = fbf_width )
+                if( cluster_xy == io_cxy ):
+                    fbf = archi.addDevice( ptype    = 'FBF_SCL',
+                                           base     = fbf_base + offset,
+                                           size     = fbf_size, 
+                                           arg0     = fbf_width,
+                                           arg1     = fbf_width )
 
                 pic = archi.addDevice( ptype    = 'PIC_TSR',
                                        base     = pic_base + offset,
@@ -254,10 +369,12 @@ def arch( x_size    = 2,
                                        channels = 32,
                                        arg0     = 32) # nb of input IRQs
 
-                archi.addIrq( dstdev = pic, port = 0, srcdev = nic, channel = 0, is_rx = True )
-                archi.addIrq( dstdev = pic, port = 1, srcdev = nic, channel = 1, is_rx = True )
-                archi.addIrq( dstdev = pic, port = 2, srcdev = nic, channel = 0, is_rx = False )
-                archi.addIrq( dstdev = pic, port = 3, srcdev = nic, channel = 1, is_rx = False )
+                # NIC_RX[channel] => port channel / NIC_TX[channel] => port 2 + channel
+                for channel in xrange( nb_nics ):
+                    archi.addIrq( dstdev = pic, port = channel, srcdev = nic,
+                                  channel = channel, is_rx = True )
+                    archi.addIrq( dstdev = pic, port = 2 + channel, srcdev = nic,
+                                  channel = channel, is_rx = False )
 
                 # archi.addIrq( dstdev    = pic,
                 #               port      = 1,
@@ -302,23 +419,24 @@ def arch( x_size    = 2,
 
                 archi.addIrq( dstdev = pic, port = 8, srcdev = ioc )
 
-                archi.addIrq( dstdev = pic, port = 16, srcdev = tty, channel = 0, is_rx = True )
-                archi.addIrq( dstdev = pic, port = 17, srcdev = tty, channel = 1, is_rx = True )
-                archi.addIrq( dstdev = pic, port = 18, srcdev = tty, channel = 2, is_rx = True )
-                archi.addIrq( dstdev = pic, port = 19, srcdev = tty, channel = 3, is_rx = True )
-                archi.addIrq( dstdev = pic, port = 20, srcdev = tty, channel = 4, is_rx = True )
-                archi.addIrq( dstdev = pic, port = 21, srcdev = tty, channel = 5, is_rx = True )
-                archi.addIrq( dstdev = pic, port = 22, srcdev = tty, channel = 6, is_rx = True )
-                archi.addIrq( dstdev = pic, port = 23, srcdev = tty, channel = 7, is_rx = True )
-
-                archi.addIrq( dstdev = pic, port = 24, srcdev = tty, channel = 0, is_rx = False )
-                archi.addIrq( dstdev = pic, port = 25, srcdev = tty, channel = 1, is_rx = False )
-                archi.addIrq( dstdev = pic, port = 26, srcdev = tty, channel = 2, is_rx = False )
-                archi.addIrq( dstdev = pic, port = 27, srcdev = tty, channel = 3, is_rx = False )
-                archi.addIrq( dstdev = pic, port = 28, srcdev = tty, channel = 4, is_rx = False )
-                archi.addIrq( dstdev = pic, port = 29, srcdev = tty, channel = 5, is_rx = False )
-                archi.addIrq( dstdev = pic, port = 30, srcdev = tty, channel = 6, is_rx = False )
-                archi.addIrq( dstdev = pic, port = 31, srcdev = tty, channel = 7, is_rx = False )
+                if( cluster_xy == io_cxy ):
+                    archi.addIrq( dstdev = pic, port = 16, srcdev = tty, channel = 0, is_rx = True )
+                    archi.addIrq( dstdev = pic, port = 17, srcdev = tty, channel = 1, is_rx = True )
+                    archi.addIrq( dstdev = pic, port = 18, srcdev = tty, channel = 2, is_rx = True )
+                    archi.addIrq( dstdev = pic, port = 19, srcdev = tty, channel = 3, is_rx = True )
+                    archi.addIrq( dstdev = pic, port = 20, srcdev = tty, channel = 4, is_rx = True )
+                    archi.addIrq( dstdev = pic, port = 21, srcdev = tty, channel = 5, is_rx = True )
+                    archi.addIrq( dstdev = pic, port = 22, srcdev = tty, channel = 6, is_rx = True )
+                    archi.addIrq( dstdev = pic, port = 23, srcdev = tty, channel = 7, is_rx = True )
+
+                    archi.addIrq( dstdev = pic, port = 24, srcdev = tty, channel = 0, is_rx = False )
+                    archi.addIrq( dstdev = pic, port = 25, srcdev = tty, channel = 1, is_rx = False )
+                    archi.addIrq( dstdev = pic, port = 26, srcdev = tty, channel = 2, is_rx = False )
+                    archi.addIrq( dstdev = pic, port = 27, srcdev = tty, channel = 3, is_rx = False )
+                    archi.addIrq( dstdev = pic, port = 28, srcdev = tty, channel = 4, is_rx = False )
+                    archi.addIrq( dstdev = pic, port = 29, srcdev = tty, channel = 5, is_rx = False )
+                    archi.addIrq( dstdev = pic, port = 30, srcdev = tty, channel = 6, is_rx = False )
+                    archi.addIrq( dstdev = pic, port = 31, srcdev = tty, channel = 7, is_rx = False )
 
     return archi
 
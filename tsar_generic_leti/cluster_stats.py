@@ -0,0 +1,323 @@
+#!/usr/bin/env python
+
+import sys
+import struct
+
+from arch_info import arch, io_clusters
+
+#######################################################################################
+#   file   : cluster_stats.py
+#   date   : october 2026
+#
+#  This file decodes the activity counters dump generated by the simul.x simulator
+#  (-STATS and -STATSFILE arguments of top.cpp), and displays per-cluster heatmaps
+#  and time series of L1/L2 miss rates and coherence traffic.
+#######################################################################################
+#  The mesh geometry (cluster coordinates, IO clusters) is obtained from the
+#  arch_info.arch() and arch_info.io_clusters() functions, called with the
+#  parameters found in the dump header.
+#  As arch_info.py, it requires the "arch_classes.py" file in the python path.
+#
+#  The dump file contains one 32 bytes header (stats_header_t in top.cpp), followed
+#  by one 144 bytes record (TsarLetiClusterStats in tsar_leti_cluster.h) per cluster
+#  and per sampling period. All counters are cumulative since reset.
+#
+#  Usage : python cluster_stats.py [-png prefix] [-cluster x,y] [stats_file]
+#  - the default stats_file is "cluster_stats.bin".
+#  - the -cluster option can be repeated: a time series is displayed for each
+#    selected cluster, after the time series aggregated on all clusters
+#    ("-cluster all" selects all clusters).
+#  - with the -png option, the heatmaps and time series are also saved as
+#    <prefix>_*.png files (this requires the matplotlib package).
+#######################################################################################
+
+STATS_MAGIC   = 0x54534C54     # "TLST"
+STATS_VERSION = 1
+
+HEADER_FORMAT = '<8I'
+RECORD_FORMAT = '<QII' + '4I' * 6 + '8I'
+
+HEADER_SIZE   = struct.calcsize( HEADER_FORMAT )
+RECORD_SIZE   = struct.calcsize( RECORD_FORMAT )
+
+PROC_FIELDS   = [ 'l1_imiss', 'l1_dmiss', 'l1_unc', 'l1_write', 'l1_m2p', 'l1_p2m' ]
+
+MEMC_FIELDS   = [ 'memc_read', 'memc_write', 'memc_xram_read', 'memc_xram_write',
+                  'memc_m2p', 'memc_p2m', 'memc_clack', 'xicu_irq' ]
+
+########################
+def read_stats( pathname ):
+    '''
+    Returns a (header, archi, samples) tuple, where samples is a list of
+    (cycle, records) tuples, and records a dictionary indexed by cxy.
+    Each record is a dictionary indexed by the counter name, and the
+    per-processor counters are summed on all processors of the cluster.
+    '''
+
+    f    = open( pathname, 'rb' )
+    data = f.read()
+    f.close()
+
+    assert len( data ) >= HEADER_SIZE, 'truncated stats file'
+
+    ( magic, version, x_size, y_size, nb_procs,
+      period, record_size, nb_ios ) = struct.unpack_from( HEADER_FORMAT, data, 0 )
+
+    assert magic == STATS_MAGIC, 'not a stats file : %s' % pathname
+    assert version == STATS_VERSION, 'unsupported stats version %d' % version
+    assert record_size == RECORD_SIZE, 'illegal record size %d' % record_size
+
+    nb_ios = max( nb_ios, 1 )        # 0 in dumps without IO clusters count
+    archi  = arch( x_size = x_size, y_size = y_size, nb_cores = nb_procs, nb_ios = nb_ios )
+
+    header = { 'x_size'   : x_size,
+               'y_size'   : y_size,
+               'nb_procs' : nb_procs,
+               'period'   : period,
+               'nb_ios'   : nb_ios,
+               'ios'      : io_clusters( x_size, y_size, archi.y_width, nb_ios ) }
+
+    nb_clusters = x_size * (y_size - 1)
+    samples     = []
+    offset      = HEADER_SIZE
+
+    # the last sample is discarded if it is incomplete
+    while offset + (nb_clusters * RECORD_SIZE) <= len( data ):
+        records = {}
+        cycle   = 0
+        for c in range( nb_clusters ):
+            values = struct.unpack_from( RECORD_FORMAT, data, offset )
+            offset = offset + RECORD_SIZE
+
+            cycle  = values[0]
+            cxy    = values[1]
+            nprocs = values[2]
+
+            record = {}
+            index  = 3
+            for name in PROC_FIELDS:
+                record[name] = sum( values[index:index + nprocs] )
+                index = index + 4
+            for name in MEMC_FIELDS:
+                record[name] = values[index]
+                index = index + 1
+
+            records[cxy] = record
+
+        samples.append( (cycle, records) )
+
+    return ( header, archi, samples )
+
+########################
+def delta( new, old ):
+    '''
+    Returns the per-counter difference between two records (old can be None).
+    '''
+
+    if old == None: return dict( new )
+
+    result = {}
+    for name in new:
+        result[name] = (new[name] - old[name]) & 0xFFFFFFFF    # 32 bits wrap
+    return result
+
+########################
+def metrics( record, cycles ):
+    '''
+    Returns the derived metrics for a (delta) record covering <cycles> cycles:
+    - l1_mpkc  : L1 misses (instruction + data) per 1000 cycles
+    - l2_miss  : L2 miss rate (XRAM line reads / MEMC read transactions)
+    - coh_pkc  : coherence packets (M2P + P2M + CLACK) per 1000 cycles
+    - irq_pkc  : processors IRQs per 1000 cycles
+    '''
+
+    kcycles = max( cycles, 1 ) / 1000.0
+    reads   = record['memc_read']
+
+    if reads: l2_miss = float( record['memc_xram_read'] ) / reads
+    else:     l2_miss = 0.0
+
+    return { 'l1_mpkc' : (record['l1_imiss'] + record['l1_dmiss']) / kcycles,
+             'l2_miss' : l2_miss,
+             'coh_pkc' : (record['memc_m2p'] + record['memc_p2m']
+                          + record['memc_clack']) / kcycles,
+             'irq_pkc' : record['xicu_irq'] / kcycles }
+
+########################
+def series( samples, cxys ):
+    '''
+    Returns the list of (cycle, metrics) tuples for each sampling period,
+    with the counters aggregated on the <cxys> clusters.
+    '''
+
+    result   = []
+    previous = {}
+    last_cyc = 0
+    for ( cycle, records ) in samples:
+        total = None
+        for cxy in cxys:
+            d = delta( records[cxy], previous.get( cxy ) )
+            if total == None: total = d
+            else:
+                for name in d: total[name] = total[name] + d[name]
+        result.append( (cycle, metrics( total, cycle - last_cyc )) )
+        previous = records
+        last_cyc = cycle
+    return result
+
+########################
+def print_series( title, points ):
+    '''
+    Displays one time series returned by series().
+    '''
+
+    print( title )
+    print( '%12s %10s %10s %10s %10s' % ('cycle', 'L1_MPKC', 'L2_MISS', 'COH_PKC', 'IRQ_PKC') )
+    for ( cycle, m ) in points:
+        print( '%12d %10.2f %10.3f %10.2f %10.2f' % (cycle, m['l1_mpkc'], m['l2_miss'],
+                                                     m['coh_pkc'], m['irq_pkc']) )
+
+########################
+def heatmap( archi, ios, values, title, fmt ):
+    '''
+    Returns a text heatmap of <values> (dictionary indexed by cxy), with the
+    north row on top. The IO clusters (IO0 is the main IO cluster) and the
+    empty clusters are labeled.
+    '''
+
+    lines = [ title ]
+    for y in reversed( range( archi.y_size ) ):
+        line = 'y=%-2d |' % y
+        for x in range( archi.x_size ):
+            cxy = (x << archi.y_width) + y
+            if   cxy in values: cell = fmt % values[cxy]
+            elif cxy in ios:    cell = 'IO%d' % ios.index( cxy )
+            else:               cell = '-'
+            line = line + ' %9s' % cell
+        lines.append( line )
+
+    line = '     |'
+    for x in range( archi.x_size ): line = line + ' %9s' % ('x=%d' % x)
+    lines.append( line )
+    return '\n'.join( lines )
+
+########################
+def plot( archi, totals, curves, prefix ):
+    '''
+    Saves the heatmaps and time series as png files (requires matplotlib).
+    <curves> is a list of (label, points) tuples, as returned by series().
+    '''
+
+    import matplotlib
+    matplotlib.use( 'Agg' )
+    import matplotlib.pyplot as plt
+
+    for name in [ 'l1_mpkc', 'l2_miss', 'coh_pkc' ]:
+        grid = [ [ 0.0 ] * archi.x_size for y in range( archi.y_size - 1 ) ]
+        for cxy in totals:
+            grid[cxy & ((1 << archi.y_width) - 1)][cxy >> archi.y_width] = totals[cxy][name]
+
+        plt.figure()
+        plt.imshow( grid, origin = 'lower', interpolation = 'nearest' )
+        plt.colorbar()
+        plt.title( name )
+        plt.xlabel( 'x' )
+        plt.ylabel( 'y' )
+        plt.savefig( '%s_heatmap_%s.png' % (prefix, name) )
+        plt.close()
+
+    for name in [ 'l1_mpkc', 'l2_miss', 'coh_pkc' ]:
+        plt.figure()
+        for ( label, points ) in curves:
+            plt.plot( [ p[0] for p in points ], [ p[1][name] for p in points ], label = label )
+        plt.legend()
+        plt.title( name )
+        plt.xlabel( 'cycle' )
+        plt.savefig( '%s_series_%s.png' % (prefix, name) )
+        plt.close()
+
+########################
+def main( argv ):
+
+    pathname = 'cluster_stats.bin'
+    prefix   = None
+    selected = []
+
+    n = 1
+    while n < len( argv ):
+        if argv[n] == '-png' and (n + 1) < len( argv ):
+            prefix = argv[n + 1]
+            n = n + 2
+        elif argv[n] == '-cluster' and (n + 1) < len( argv ):
+            selected.append( argv[n + 1] )
+            n = n + 2
+        else:
+            pathname = argv[n]
+            n = n + 1
+
+    ( header, archi, samples ) = read_stats( pathname )
+
+    if len( samples ) == 0:
+        print( 'no sample in %s' % pathname )
+        return 1
+
+    ( cycle, records ) = samples[-1]
+
+    cxys = []
+    for name in selected:
+        if name == 'all':
+            cxys = cxys + sorted( records )
+            continue
+        ( x, y ) = [ int( v ) for v in name.split( ',' ) ]
+        cxy = (x << archi.y_width) + y
+        assert cxy in records, 'illegal cluster : %s' % name
+        cxys.append( cxy )
+
+    ### time series : global metrics, and per-cluster metrics for the selected clusters
+
+    curves = [ ('all', series( samples, sorted( records ) )) ]
+    print_series( 'All clusters', curves[0][1] )
+
+    for cxy in cxys:
+        label = '%d,%d' % (cxy >> archi.y_width, cxy & ((1 << archi.y_width) - 1))
+        curves.append( (label, series( samples, [ cxy ] )) )
+        print( '' )
+        print_series( 'Cluster (%s)' % label, curves[-1][1] )
+
+    ### heatmaps : per-cluster metrics on the whole run
+
+    ios    = header['ios']
+    totals = {}
+    for cxy in records:
+        totals[cxy] = metrics( records[cxy], cycle )
+
+    print( '' )
+    print( heatmap( archi, ios, dict( (c, totals[c]['l1_mpkc']) for c in totals ),
+                    'L1 misses per kcycle (cycle %d)' % cycle, '%.2f' ) )
+    print( '' )
+    print( heatmap( archi, ios, dict( (c, totals[c]['l2_miss']) for c in totals ),
+                    'L2 miss rate (cycle %d)' % cycle, '%.3f' ) )
+    print( '' )
+    print( heatmap( archi, ios, dict( (c, totals[c]['coh_pkc']) for c in totals ),
+                    'Coherence packets per kcycle (cycle %d)' % cycle, '%.2f' ) )
+
+    if prefix != None:
+        plot( archi, totals, curves, prefix )
+
+    return 0
+
+########################## stats display #############################################
+
+if __name__ == '__main__':
+
+    sys.exit( main( sys.argv ) )
+
+
+# Local Variables:
+# tab-width: 4;
+# c-basic-offset: 4;
+# c-file-offsets:((innamespace . 0)(inline-open . 0));
+# indent-tabs-mode: nil;
+# End:
+#
+# vim: filetype=python:expandtab:shiftwidth=4:tabstop=4:softtabstop=4
@@ -0,0 +1,167 @@
+//////////////////////////////////////////////////////////////////////////////
+// File: disk_image_backend.h
+// Copyright: UPMC/LIP6
+// Date : october 2026
+// This program is released under the GNU public license
+//////////////////////////////////////////////////////////////////////////////
+// This object implements the host side of a simulated block device:
+// it serves block read and write requests on a disk image file, without
+// blocking the simulation thread on the host file system latency.
+//
+// - The requests are served by a pool of <nb_threads> worker threads
+//   (POSIX threads), using pread() / pwrite() on the image file.
+//   With nb_threads == 0, the requests are served synchronously.
+// - The blocks read from the image are stored in a LRU cache of
+//   <cache_blocks> blocks.
+// - The blocks of a read request are requested by a read-ahead window of
+//   min(<prefetch_blocks>, <cache_blocks>) blocks, that is refilled when
+//   read_block() consumes the blocks: the number of pending blocks in the
+//   cache is bounded by the window size, whatever the request size.
+//   When a read request starts at the block following the previous read
+//   request, the window continues on the next <prefetch_blocks> blocks
+//   after the request (sequential read-ahead).
+// - With use_mmap, the image is mapped in the host address space: the
+//   blocks are read without copy from the mapping, the read-ahead is
+//   delegated to the host kernel (madvise), and the worker threads and
+//   the cache are not used.
+//
+// The simulated timing does not depend on this object: the block device
+// posts the requests (read_request) when the command is received, and
+// gets the data (read_block) in the same cycle as with a synchronous
+// file access. The simulation thread only waits when a block is not yet
+// available, so only the host execution time is modified.
+//
+// Write requests (write_block) are posted to the worker threads, and the
+// cache is updated immediately. The block device must call write_sync()
+// before reporting the command completion, to get the write status.
+//////////////////////////////////////////////////////////////////////////////
+
+#ifndef SOCLIB_COMMON_DISK_IMAGE_BACKEND_H
+#define SOCLIB_COMMON_DISK_IMAGE_BACKEND_H
+
+#include <pthread.h>
+#include <stdint.h>
+#include <string>
+#include <vector>
+#include <deque>
+#include <list>
+#include <map>
+
+namespace soclib { namespace common {
+
+class DiskImageBackend
+{
+    // cache entry states
+    enum entry_state_e
+    {
+        ENTRY_PENDING,              // read posted, data not available
+        ENTRY_VALID,                // data available
+        ENTRY_ERROR,                // read failed
+    };
+
+    struct entry_t
+    {
+        entry_state_e           state;
+        std::list<uint64_t>::iterator lru;      // position in the LRU list
+        size_t                  writes;         // write jobs not yet executed
+        bool                    writing;        // write job in progress
+        std::vector<uint8_t>    data;
+    };
+
+    // worker thread job : <count> contiguous blocks from <block>
+    struct job_t
+    {
+        bool                    write;
+        uint64_t                block;
+        size_t                  count;
+        std::vector<uint8_t>    data;           // write data
+    };
+
+    const std::string           m_filename;
+    const size_t                m_block_size;
+    const size_t                m_cache_blocks;
+    const size_t                m_prefetch_blocks;
+    const size_t                m_window;       // read-ahead window (blocks)
+    const bool                  m_use_mmap;
+
+    int                         m_fd;
+    uint64_t                    m_nb_blocks;
+    uint8_t*                    m_map;          // mmap base (NULL if not used)
+    size_t                      m_map_size;     // mapped length (bytes)
+
+    // cache and jobs queue, protected by m_lock
+    pthread_mutex_t             m_lock;
+    pthread_cond_t              m_job_cond;     // new job / stop
+    pthread_cond_t              m_done_cond;    // job completion
+    std::map<uint64_t, entry_t> m_cache;
+    std::list<uint64_t>         m_lru;          // most recently used first
+    std::deque<job_t*>          m_jobs;
+    size_t                      m_pending_writes;
+    bool                        m_write_error;
+    bool                        m_stop;
+    uint64_t                    m_next_block;   // sequential stream detection
+    uint64_t                    m_ahead_next;   // next block requested by the window
+    uint64_t                    m_ahead_end;    // end of the read-ahead stream
+    uint64_t                    m_request_end;  // end of the last read request
+
+    std::vector<pthread_t>      m_threads;
+
+    // statistics
+    uint64_t                    m_blocks_read;  // blocks consumed by read_block()
+    uint64_t                    m_hits;         // block available without wait
+    uint64_t                    m_waits;        // simulation thread waited
+    uint64_t                    m_prefetched;   // blocks requested by read-ahead
+    uint64_t                    m_blocks_written;
+
+    static void* worker_entry( void* arg );
+
+    void    worker();
+    void    execute( job_t* job );
+    void    post( job_t* job );
+    void    request( uint64_t block, size_t count );
+    void    refill( uint64_t block );
+    void    evict();
+
+public:
+
+    DiskImageBackend( const std::string  &filename,
+                      size_t             block_size,
+                      size_t             nb_threads,
+                      size_t             cache_blocks,
+                      size_t             prefetch_blocks,
+                      bool               use_mmap );
+
+    ~DiskImageBackend();
+
+    // image size, in blocks (0 if the image cannot be opened)
+    uint64_t nb_blocks() const { return m_nb_blocks; }
+
+    // post a read request for <count> blocks from <block>
+    void read_request( uint64_t block, size_t count );
+
+    // returns a pointer on the data of one block, after waiting the block
+    // if required. The data is copied in <buf>, or directly read from the
+    // image mapping. Returns NULL in case of error.
+    const uint8_t* read_block( uint64_t block, uint8_t* buf );
+
+    // post a write request for one block
+    bool write_block( uint64_t block, const uint8_t* buf );
+
+    // wait completion of all posted writes, returns false in case of error
+    bool write_sync();
+
+    void print_stats() const;
+};
+
+}}
+
+#endif
+
+// Local Variables:
+// tab-width: 4
+// c-basic-offset: 4
+// c-file-offsets:((innamespace . 0)(inline-open . 0))
+// indent-tabs-mode: nil
+// End:
+
+// vim: filetype=cpp:expandtab:shiftwidth=4:tabstop=4:softtabstop=4
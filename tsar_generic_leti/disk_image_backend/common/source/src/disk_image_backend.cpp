@@ -0,0 +1,523 @@
+//////////////////////////////////////////////////////////////////////////////
+// File: disk_image_backend.cpp
+// Copyright: UPMC/LIP6
+// Date : october 2026
+// This program is released under the GNU public license
+//////////////////////////////////////////////////////////////////////////////
+
+#include <iostream>
+#include <algorithm>
+#include <cstring>
+#include <cerrno>
+#include <fcntl.h>
+#include <unistd.h>
+#include <sys/mman.h>
+
+#include "../include/disk_image_backend.h"
+
+namespace soclib { namespace common {
+
+// maximum number of blocks handled by one worker thread job
+#define MAX_JOB_BLOCKS  32
+
+// pread() / pwrite() loops, returning the number of bytes transfered
+static size_t read_all( int fd, uint8_t* buf, size_t length, off_t offset )
+{
+    size_t done = 0;
+    while ( done < length )
+    {
+        ssize_t n = pread( fd, buf + done, length - done, offset + done );
+        if ( (n < 0) and (errno == EINTR) ) continue;
+        if ( n <= 0 ) break;
+        done += n;
+    }
+    return done;
+}
+
+static size_t write_all( int fd, const uint8_t* buf, size_t length, off_t offset )
+{
+    size_t done = 0;
+    while ( done < length )
+    {
+        ssize_t n = pwrite( fd, buf + done, length - done, offset + done );
+        if ( (n < 0) and (errno == EINTR) ) continue;
+        if ( n <= 0 ) break;
+        done += n;
+    }
+    return done;
+}
+
+//////////////////////////////////////////////////////////////
+DiskImageBackend::DiskImageBackend( const std::string  &filename,
+                                    size_t             block_size,
+                                    size_t             nb_threads,
+                                    size_t             cache_blocks,
+                                    size_t             prefetch_blocks,
+                                    bool               use_mmap )
+//////////////////////////////////////////////////////////////
+    : m_filename( filename ),
+      m_block_size( block_size ),
+      m_cache_blocks( cache_blocks ? cache_blocks : 1 ),
+      m_prefetch_blocks( prefetch_blocks ),
+      m_window( std::min( prefetch_blocks, m_cache_blocks ) ),
+      m_use_mmap( use_mmap ),
+      m_fd( -1 ),
+      m_nb_blocks( 0 ),
+      m_map( NULL ),
+      m_map_size( 0 ),
+      m_pending_writes( 0 ),
+      m_write_error( false ),
+      m_stop( false ),
+      m_next_block( 0 ),
+      m_ahead_next( 0 ),
+      m_ahead_end( 0 ),
+      m_request_end( 0 ),
+      m_blocks_read( 0 ),
+      m_hits( 0 ),
+      m_waits( 0 ),
+      m_prefetched( 0 ),
+      m_blocks_written( 0 )
+{
+    pthread_mutex_init( &m_lock, NULL );
+    pthread_cond_init( &m_job_cond, NULL );
+    pthread_cond_init( &m_done_cond, NULL );
+
+    m_fd = open( filename.c_str(), O_RDWR );
+    if ( m_fd < 0 )
+    {
+        std::cout << "[DISK_IMAGE_BACKEND] error : cannot open file "
+                  << filename << std::endl;
+        return;
+    }
+
+    off_t size  = lseek( m_fd, 0, SEEK_END );
+    m_nb_blocks = size / block_size;
+
+    if ( use_mmap and (size > 0) )
+    {
+        void* map = mmap( NULL, size, PROT_READ | PROT_WRITE, MAP_SHARED, m_fd, 0 );
+        if ( map == MAP_FAILED )
+        {
+            std::cout << "[DISK_IMAGE_BACKEND] warning : cannot map file "
+                      << filename << " / use worker threads" << std::endl;
+        }
+        else
+        {
+            m_map      = (uint8_t*)map;
+            m_map_size = size;
+            return;
+        }
+    }
+
+    for ( size_t i = 0 ; i < nb_threads ; i++ )
+    {
+        pthread_t thread;
+        if ( pthread_create( &thread, NULL, &DiskImageBackend::worker_entry, this ) == 0 )
+        {
+            m_threads.push_back( thread );
+        }
+    }
+}
+
+////////////////////////////////////
+DiskImageBackend::~DiskImageBackend()
+////////////////////////////////////
+{
+    pthread_mutex_lock( &m_lock );
+    m_stop = true;
+    pthread_cond_broadcast( &m_job_cond );
+    pthread_mutex_unlock( &m_lock );
+
+    for ( size_t i = 0 ; i < m_threads.size() ; i++ )
+    {
+        pthread_join( m_threads[i], NULL );
+    }
+
+    if ( m_map ) munmap( m_map, m_map_size );
+    if ( m_fd >= 0 ) close( m_fd );
+
+    pthread_cond_destroy( &m_done_cond );
+    pthread_cond_destroy( &m_job_cond );
+    pthread_mutex_destroy( &m_lock );
+}
+
+/////////////////////////////////////////////////
+void* DiskImageBackend::worker_entry( void* arg )
+/////////////////////////////////////////////////
+{
+    ((DiskImageBackend*)arg)->worker();
+    return NULL;
+}
+
+/////////////////////////////
+void DiskImageBackend::worker()
+/////////////////////////////
+{
+    pthread_mutex_lock( &m_lock );
+    while ( true )
+    {
+        while ( m_jobs.empty() and not m_stop )
+        {
+            pthread_cond_wait( &m_job_cond, &m_lock );
+        }
+        if ( m_jobs.empty() ) break;
+
+        job_t* job = m_jobs.front();
+        m_jobs.pop_front();
+
+        pthread_mutex_unlock( &m_lock );
+        execute( job );
+        delete job;
+        pthread_mutex_lock( &m_lock );
+    }
+    pthread_mutex_unlock( &m_lock );
+}
+
+////////////////////////////////////////////
+void DiskImageBackend::execute( job_t* job )
+////////////////////////////////////////////
+// The file access is done without lock, and the cache is
+// updated with the lock. The entries that are not pending
+// anymore (updated by a write) are not modified.
+{
+    size_t length = job->count * m_block_size;
+    off_t  offset = job->block * m_block_size;
+
+    if ( job->write )
+    {
+        // the writes of a given block are serialized, and write the
+        // last data of the cache entry (not evicted before the write)
+        pthread_mutex_lock( &m_lock );
+        std::map<uint64_t, entry_t>::iterator it = m_cache.find( job->block );
+        while ( it->second.writing )
+        {
+            pthread_cond_wait( &m_done_cond, &m_lock );
+        }
+        it->second.writing = true;
+        job->data          = it->second.data;
+        pthread_mutex_unlock( &m_lock );
+
+        bool ok = ( write_all( m_fd, &job->data[0], length, offset ) == length );
+
+        pthread_mutex_lock( &m_lock );
+        it->second.writing = false;
+        it->second.writes--;
+        m_pending_writes--;
+        if ( not ok ) m_write_error = true;
+        pthread_cond_broadcast( &m_done_cond );
+        pthread_mutex_unlock( &m_lock );
+    }
+    else
+    {
+        std::vector<uint8_t> data( length );
+        size_t nbytes = read_all( m_fd, &data[0], length, offset );
+
+        pthread_mutex_lock( &m_lock );
+        for ( size_t i = 0 ; i < job->count ; i++ )
+        {
+            std::map<uint64_t, entry_t>::iterator it = m_cache.find( job->block + i );
+            if ( (it == m_cache.end()) or (it->second.state != ENTRY_PENDING) ) continue;
+
+            if ( nbytes >= (i + 1) * m_block_size )
+            {
+                it->second.data.assign( data.begin() + i * m_block_size,
+                                        data.begin() + (i + 1) * m_block_size );
+                it->second.state = ENTRY_VALID;
+            }
+            else
+            {
+                it->second.state = ENTRY_ERROR;
+            }
+        }
+        pthread_cond_broadcast( &m_done_cond );
+        pthread_mutex_unlock( &m_lock );
+    }
+}
+
+/////////////////////////////////////////
+void DiskImageBackend::post( job_t* job )
+/////////////////////////////////////////
+// must be called with the lock
+{
+    m_jobs.push_back( job );
+    pthread_cond_signal( &m_job_cond );
+}
+
+//////////////////////////////////////////////////////////////
+void DiskImageBackend::request( uint64_t block, size_t count )
+//////////////////////////////////////////////////////////////
+// Allocates a pending cache entry for all blocks not in the cache,
+// and posts one read job for each run of contiguous missing blocks.
+// must be called with the lock
+{
+    job_t* job = NULL;
+
+    for ( uint64_t b = block ; (b < block + count) and (b < m_nb_blocks) ; b++ )
+    {
+        if ( m_cache.find( b ) != m_cache.end() )
+        {
+            if ( job ) post( job );
+            job = NULL;
+            continue;
+        }
+
+        m_lru.push_front( b );
+        entry_t &entry = m_cache[b];
+        entry.state    = ENTRY_PENDING;
+        entry.lru      = m_lru.begin();
+        entry.writes   = 0;
+        entry.writing  = false;
+
+        if ( job == NULL )
+        {
+            job        = new job_t;
+            job->write = false;
+            job->block = b;
+            job->count = 0;
+        }
+        job->count++;
+
+        if ( job->count == MAX_JOB_BLOCKS )
+        {
+            post( job );
+            job = NULL;
+        }
+    }
+    if ( job ) post( job );
+
+    evict();
+}
+
+///////////////////////////
+void DiskImageBackend::evict()
+///////////////////////////
+// Removes the least recently used entries that are not pending
+// (read not completed, or write not executed), until the cache
+// size is not larger than m_cache_blocks.
+// must be called with the lock
+{
+    std::list<uint64_t>::iterator it = m_lru.end();
+
+    while ( (m_cache.size() > m_cache_blocks) and (it != m_lru.begin()) )
+    {
+        --it;
+        std::map<uint64_t, entry_t>::iterator e = m_cache.find( *it );
+        if ( (e->second.state == ENTRY_PENDING) or e->second.writes ) continue;
+
+        m_cache.erase( e );
+        it = m_lru.erase( it );
+    }
+}
+
+///////////////////////////////////////////////////////////////////
+void DiskImageBackend::read_request( uint64_t block, size_t count )
+///////////////////////////////////////////////////////////////////
+{
+    if ( m_fd < 0 ) return;
+
+    bool   sequential = ( block == m_next_block );
+    size_t prefetch   = sequential ? m_prefetch_blocks : 0;
+
+    m_next_block = block + count;
+
+    if ( m_map )
+    {
+        // the read-ahead is done by the host kernel
+        long     page  = sysconf( _SC_PAGESIZE );
+        uint64_t first = (block * m_block_size) & ~(uint64_t)(page - 1);
+        uint64_t last  = (block + count + prefetch) * m_block_size;
+        if ( last > m_nb_blocks * m_block_size ) last = m_nb_blocks * m_block_size;
+        if ( last > first ) madvise( m_map + first, last - first, MADV_WILLNEED );
+        return;
+    }
+
+    if ( m_threads.empty() ) return;
+
+    pthread_mutex_lock( &m_lock );
+    m_ahead_next  = block;
+    m_ahead_end   = std::min( block + count + prefetch, m_nb_blocks );
+    m_request_end = block + count;
+    refill( block );
+    pthread_mutex_unlock( &m_lock );
+}
+
+////////////////////////////////////////////////
+void DiskImageBackend::refill( uint64_t block )
+////////////////////////////////////////////////
+// Requests the blocks of the read-ahead stream that are in the
+// window starting at <block> (next block to be consumed).
+// must be called with the lock
+{
+    if ( m_ahead_next < block ) m_ahead_next = block;
+
+    uint64_t limit = std::min( m_ahead_end, block + m_window );
+    if ( m_ahead_next >= limit ) return;
+
+    request( m_ahead_next, limit - m_ahead_next );
+    if ( limit > m_request_end )
+    {
+        m_prefetched += limit - std::max( m_ahead_next, m_request_end );
+    }
+    m_ahead_next = limit;
+}
+
+//////////////////////////////////////////////////////////////////////////
+const uint8_t* DiskImageBackend::read_block( uint64_t block, uint8_t* buf )
+//////////////////////////////////////////////////////////////////////////
+{
+    if ( (m_fd < 0) or (block >= m_nb_blocks) ) return NULL;
+
+    m_blocks_read++;
+
+    if ( m_map )
+    {
+        m_hits++;
+        return m_map + block * m_block_size;
+    }
+
+    if ( m_threads.empty() )
+    {
+        if ( read_all( m_fd, buf, m_block_size, block * m_block_size ) != m_block_size )
+        {
+            return NULL;
+        }
+        return buf;
+    }
+
+    pthread_mutex_lock( &m_lock );
+
+    std::map<uint64_t, entry_t>::iterator it = m_cache.find( block );
+    if ( it == m_cache.end() )
+    {
+        request( block, 1 );
+        it = m_cache.find( block );
+    }
+
+    if ( it->second.state == ENTRY_PENDING ) m_waits++;
+    else                                     m_hits++;
+
+    while ( it->second.state == ENTRY_PENDING )
+    {
+        pthread_cond_wait( &m_done_cond, &m_lock );
+    }
+
+    const uint8_t* data = NULL;
+    if ( it->second.state == ENTRY_VALID )
+    {
+        memcpy( buf, &it->second.data[0], m_block_size );
+        m_lru.splice( m_lru.begin(), m_lru, it->second.lru );
+        data = buf;
+    }
+    else
+    {
+        // the entry is removed, in order to retry on the next access
+        m_lru.erase( it->second.lru );
+        m_cache.erase( it );
+    }
+
+    // the read-ahead window moves with the consumed blocks
+    // (after the copy, as the refill can evict this block)
+    refill( block + 1 );
+
+    pthread_mutex_unlock( &m_lock );
+    return data;
+}
+
+/////////////////////////////////////////////////////////////////////
+bool DiskImageBackend::write_block( uint64_t block, const uint8_t* buf )
+/////////////////////////////////////////////////////////////////////
+{
+    if ( (m_fd < 0) or (block >= m_nb_blocks) ) return false;
+
+    m_blocks_written++;
+
+    if ( m_map )
+    {
+        memcpy( m_map + block * m_block_size, buf, m_block_size );
+        return true;
+    }
+
+    if ( m_threads.empty() )
+    {
+        return ( write_all( m_fd, buf, m_block_size, block * m_block_size ) == m_block_size );
+    }
+
+    job_t* job = new job_t;
+    job->write = true;
+    job->block = block;
+    job->count = 1;
+
+    pthread_mutex_lock( &m_lock );
+
+    // the written block is inserted (or refreshed) as a valid cache entry:
+    // a read job already queued for this block does not update a valid
+    // entry, and the entry is not evicted before the write job is executed.
+    std::map<uint64_t, entry_t>::iterator it = m_cache.find( block );
+    if ( it == m_cache.end() )
+    {
+        m_lru.push_front( block );
+        it = m_cache.insert( std::make_pair( block, entry_t() ) ).first;
+        it->second.lru     = m_lru.begin();
+        it->second.writes  = 0;
+        it->second.writing = false;
+    }
+    else
+    {
+        m_lru.splice( m_lru.begin(), m_lru, it->second.lru );
+    }
+    it->second.data.assign( buf, buf + m_block_size );
+    it->second.state = ENTRY_VALID;
+    it->second.writes++;
+
+    m_pending_writes++;
+    post( job );
+    evict();
+
+    pthread_mutex_unlock( &m_lock );
+    return true;
+}
+
+//////////////////////////////////
+bool DiskImageBackend::write_sync()
+//////////////////////////////////
+{
+    if ( m_threads.empty() ) return true;
+
+    pthread_mutex_lock( &m_lock );
+    while ( m_pending_writes )
+    {
+        pthread_cond_wait( &m_done_cond, &m_lock );
+    }
+    bool ok       = not m_write_error;
+    m_write_error = false;
+    pthread_mutex_unlock( &m_lock );
+
+    return ok;
+}
+
+///////////////////////////////////////////
+void DiskImageBackend::print_stats() const
+///////////////////////////////////////////
+{
+    std::cout << "[DISK_IMAGE_BACKEND] " << m_filename << std::endl
+              << "  mode           = ";
+    if      ( m_map )             std::cout << "mmap";
+    else if ( m_threads.empty() ) std::cout << "synchronous";
+    else                          std::cout << m_threads.size() << " worker threads";
+    std::cout << std::endl
+              << "  blocks read    = " << m_blocks_read << std::endl
+              << "  hits / waits   = " << m_hits << " / " << m_waits << std::endl
+              << "  prefetched     = " << m_prefetched << std::endl
+              << "  blocks written = " << m_blocks_written << std::endl;
+}
+
+}}
+
+// Local Variables:
+// tab-width: 4
+// c-basic-offset: 4
+// c-file-offsets:((innamespace . 0)(inline-open . 0))
+// indent-tabs-mode: nil
+// End:
+
+// vim: filetype=cpp:expandtab:shiftwidth=4:tabstop=4:softtabstop=4
@@ -0,0 +1,249 @@
+#!/usr/bin/env python
+
+import os
+import re
+import sys
+import subprocess
+
+from trace_decode import read_trace, records, is_irq, TYPE_NAMES, EVENT_NAMES, FLAG_INITIATOR, FLAG_EOP
+
+#######################################################################################
+#   file   : nic_bench.py
+#   date   : october 2026
+#
+#  This file reports the network throughput of one simulation of the
+#  "tsar_generic_leti" platform with the pcap NIC backends (NICMODE 3):
+#  packets per simulated second, dropped packets, and NIC IRQ rates for each
+#  NIC channel, and DMA bursts and register accesses rates for each NIC.
+#######################################################################################
+#  The report uses the following files (both are optional):
+#  - the simulator log, containing the statistics displayed by the pcap NIC
+#    backends ([NIC_PCAP_RX] / [NIC_PCAP_TX] blocks, see nic_pcap_backend.h):
+#    the rates are computed on the simulated cycles counted by the backends,
+#  - the binary trace (see tsar_leti_trace.h), recorded with the "nic" type:
+#    the NIC IRQs give the IRQ rates, the NIC VCI initiator commands give the
+#    DMA bursts rate, and the NIC VCI target commands give the driver accesses.
+#
+#  With the -run option, the simulator is first executed in the current directory,
+#  in NICMODE 3, with the binary trace restricted to the NIC events, and the
+#  simulator output is saved in the "nic_bench.log" file.
+#
+#  Usage : python nic_bench.py [-freq MHz] [-run ncycles] [-pcap files] [-rate pps]
+#                              [-burst packets] [-gap cycles] [-log pathname]
+#                              [-trace pathname]
+#  - freq is the simulated clock frequency (default 1000 MHz), also given to
+#    the simulator with -run.
+#  - pcap, rate and burst are comma separated lists of per channel values
+#    (-NICPCAP / -NICRATE / -NICBURST arguments of simul.x), and gap is the NIC
+#    inter frame gap (-NICGAP), only used with -run.
+#  - the default log is "nic_bench.log", and the default trace is "nic_trace.bin".
+#
+#  Example : python nic_bench.py -run 5000000 -pcap web.pcap,dns.pcap -rate 100000,20000
+#                                -burst 8,1
+#######################################################################################
+
+CHANNEL_NAME = r'(NIC_\d+_\d+)_(RX|TX)(\d+)'
+
+########################
+def run( ncycles, freq, options, log_name, trace_name ):
+    '''
+    Executes the simulator in NICMODE 3 (pcap backends), with the binary trace
+    restricted to the NIC events.
+    '''
+
+    command = [ './simul.x', '-NCYCLES', str( ncycles ), '-NICMODE', '3',
+                '-NICFREQ', str( int( freq ) ), '-TRACE', trace_name,
+                '-TRACEFILTER', 'types=nic' ] + options
+
+    log = open( log_name, 'w' )
+    status = subprocess.call( command, stdout = log, stderr = subprocess.STDOUT )
+    log.close()
+    return status == 0
+
+########################
+def read_log( pathname ):
+    '''
+    Returns the list of (kind, name, counters) tuples found in the simulator log,
+    where kind is 'RX' or 'TX', and counters a dictionary indexed by counter name.
+    '''
+
+    result  = []
+    current = None
+
+    for line in open( pathname ):
+        m = re.match( r'\[NIC_PCAP_(RX|TX)\] (\S+) : (.*)', line )
+        if m:
+            current = ( m.group( 1 ), m.group( 2 ), {} )
+            result.append( current )
+            continue
+        m = re.match( r'\s+([a-z ]+?)\s+= (\d+)', line )
+        if m and current != None:
+            current[2][m.group( 1 ).replace( ' ', '_' )] = int( m.group( 2 ) )
+        else:
+            current = None
+
+    return result
+
+########################
+def channel( name ):
+    '''
+    Returns the (NIC, channel index) key of a backend or IRQ name
+    (NIC_<x>_<y>_RX<i> / NIC_<x>_<y>_TX<i>), or None.
+    '''
+
+    m = re.match( CHANNEL_NAME, name )
+    if not m: return None
+    return ( m.group( 1 ), int( m.group( 3 ) ) )
+
+########################
+def trace_rates( pathname, cycles ):
+    '''
+    Returns a (cycles, irqs, dma, regs) tuple, where irqs is a dictionary of
+    IRQ activations indexed by the NIC channel name, dma and regs dictionaries
+    of VCI commands (initiator bursts / target accesses) indexed by the NIC name.
+    The observed duration is <cycles>, or the last recorded cycle.
+    '''
+
+    ( header, segments, data, offset ) = read_trace( pathname )
+
+    nic   = TYPE_NAMES.index( 'nic' )
+    rise  = EVENT_NAMES.index( 'IRQ_RISE' )
+    rsp   = EVENT_NAMES.index( 'RSP' )
+    width = header['y_width']
+    irqs  = {}
+    dma   = {}
+    regs  = {}
+    last  = 0
+
+    for record in records( data, offset ):
+        last = record['cycle']
+        if record['type'] != nic: continue
+
+        cxy = record['cxy']
+        io  = 'NIC_%d_%d' % (cxy >> width, cxy & ((1 << width) - 1))
+
+        if is_irq( record ):
+            if record['event'] != rise: continue
+            if record['index'] < 2: name = '%s_RX%d' % (io, record['index'])
+            else:                   name = '%s_TX%d' % (io, record['index'] - 2)
+            irqs[name] = irqs.get( name, 0 ) + 1
+        elif record['event'] != rsp and (record['flags'] & FLAG_EOP):
+            if record['flags'] & FLAG_INITIATOR: dma[io]  = dma.get( io, 0 ) + 1
+            else:                                regs[io] = regs.get( io, 0 ) + 1
+
+    if cycles == None: cycles = last
+    return ( cycles, irqs, dma, regs )
+
+########################
+def main( argv ):
+
+    freq       = 1000.0
+    ncycles    = None
+    options    = []
+    log_name   = 'nic_bench.log'
+    trace_name = 'nic_trace.bin'
+
+    n = 1
+    while n < len( argv ):
+        if argv[n] in [ '-freq', '-run', '-pcap', '-rate', '-burst', '-gap', '-log',
+                        '-trace' ] and (n + 1) < len( argv ):
+            key   = argv[n][1:]
+            value = argv[n + 1]
+            n     = n + 2
+
+            if   key == 'freq':  freq       = float( value )
+            elif key == 'run':   ncycles    = int( value, 0 )
+            elif key == 'pcap':  options   += [ '-NICPCAP', value ]
+            elif key == 'rate':  options   += [ '-NICRATE', value ]
+            elif key == 'burst': options   += [ '-NICBURST', value ]
+            elif key == 'gap':   options   += [ '-NICGAP', value ]
+            elif key == 'log':   log_name   = value
+            elif key == 'trace': trace_name = value
+        else:
+            print( '[NIC_BENCH] illegal argument : %s' % argv[n] )
+            return 1
+
+    hz = freq * 1e6
+
+    if ncycles != None and not run( ncycles, freq, options, log_name, trace_name ):
+        print( '[NIC_BENCH] simulation failed (see %s)' % log_name )
+        return 1
+
+    ### per channel packets (pcap backends) and IRQs (trace)
+
+    channels = {}
+    cycles   = None
+
+    if os.path.exists( log_name ):
+        for ( kind, name, counters ) in read_log( log_name ):
+            key = channel( name )
+            if key == None: continue
+            stats = channels.setdefault( key, {} )
+            if kind == 'RX':
+                stats['offered'] = counters.get( 'packets_offered', 0 )
+                stats['rx']      = counters.get( 'packets_sent', 0 )
+                stats['dropped'] = counters.get( 'packets_dropped', 0 )
+            else:
+                stats['tx']      = counters.get( 'packets', 0 )
+                stats['errors']  = counters.get( 'errors', 0 )
+            cycles = max( cycles or 0, counters.get( 'cycles', 0 ) )
+
+    dma  = {}
+    regs = {}
+    if os.path.exists( trace_name ):
+        ( trace_cycles, irqs, dma, regs ) = trace_rates( trace_name, ncycles )
+        if cycles == None: cycles = trace_cycles
+        for name in irqs:
+            key = channel( name )
+            if key == None: continue
+            if '_RX' in name: channels.setdefault( key, {} )['rx_irqs'] = irqs[name]
+            else:             channels.setdefault( key, {} )['tx_irqs'] = irqs[name]
+
+    if cycles == None:
+        print( '[NIC_BENCH] no statistics found (%s / %s)' % (log_name, trace_name) )
+        return 1
+
+    seconds = max( cycles, 1 ) / hz
+
+    print( 'NIC activity on %d cycles (%.6f simulated seconds at %.0f MHz)' % (cycles, seconds, freq) )
+    print( '%-12s %3s %10s %10s %8s %12s %10s %12s %12s %12s' %
+           ('NIC', 'ch', 'rx_offered', 'rx_packets', 'dropped', 'rx_pkts/s', 'tx_packets',
+            'tx_pkts/s', 'rx_irqs/s', 'tx_irqs/s') )
+    for key in sorted( channels ):
+        stats = channels[key]
+        print( '%-12s %3d %10d %10d %8d %12.0f %10d %12.0f %12.0f %12.0f' %
+               (key[0], key[1], stats.get( 'offered', 0 ), stats.get( 'rx', 0 ),
+                stats.get( 'dropped', 0 ), stats.get( 'rx', 0 ) / seconds,
+                stats.get( 'tx', 0 ), stats.get( 'tx', 0 ) / seconds,
+                stats.get( 'rx_irqs', 0 ) / seconds, stats.get( 'tx_irqs', 0 ) / seconds) )
+    print( '' )
+
+    ### NIC DMA and registers access rates
+
+    if dma or regs:
+        print( '%-16s %12s %14s %12s %14s' % ('NIC', 'dma_bursts', 'bursts/sim_s',
+                                              'reg_access', 'access/sim_s') )
+        for name in sorted( set( list( dma ) + list( regs ) ) ):
+            print( '%-16s %12d %14.0f %12d %14.0f' % (name, dma.get( name, 0 ),
+                                                      dma.get( name, 0 ) / seconds,
+                                                      regs.get( name, 0 ),
+                                                      regs.get( name, 0 ) / seconds) )
+        print( '' )
+
+    return 0
+
+########################## network benchmark #########################################
+
+if __name__ == '__main__':
+
+    sys.exit( main( sys.argv ) )
+
+
+# Local Variables:
+# tab-width: 4;
+# c-basic-offset: 4;
+# c-file-offsets:((innamespace . 0)(inline-open . 0));
+# indent-tabs-mode: nil;
+# End:
+#
+# vim: filetype=python:expandtab:shiftwidth=4:tabstop=4:softtabstop=4
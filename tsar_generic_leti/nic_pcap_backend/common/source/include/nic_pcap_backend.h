@@ -0,0 +1,180 @@
+//////////////////////////////////////////////////////////////////////////////
+// File: nic_pcap_backend.h
+// Copyright: UPMC/LIP6
+// Date : october 2026
+// This program is released under the GNU public license
+//////////////////////////////////////////////////////////////////////////////
+// These objects implement the host side of one channel of a simulated
+// ethernet controller, using pcap files (libpcap format, LINKTYPE_ETHERNET)
+// instead of the text files of the NIC "file" mode:
+//
+// - NicPcapRx replays the packets of a pcap file, as a GMII byte stream
+//   (one byte per cycle, with dv / er / data signals). The packets are
+//   released in the simulated time domain:
+//   . with rate == 0, the packets are released with the inter-packet
+//     delays found in the pcap file (timestamps),
+//   . with rate != 0, the packets are released by bursts of <burst>
+//     packets, at an average rate of <rate> packets per simulated second.
+//   The released packets are stored in a FIFO of <queue> packets, and
+//   the packets that cannot be stored are dropped (the offered load is
+//   larger than the GMII bandwidth). The file is replayed <loops> times
+//   (0 for an infinite replay). The packets shorter than 60 bytes are
+//   padded, the packets larger than 1514 bytes are skipped, and the FCS
+//   (CRC32) is appended to each packet.
+//
+// - NicPcapTx captures the GMII byte stream generated by the NIC, and
+//   writes one pcap record per packet, with a timestamp computed from the
+//   cycle of the first byte. The FCS is checked and removed. The packets
+//   with er asserted, or with a bad FCS, are counted and not written.
+//
+// Both objects must be called once per cycle (get() / put()), and use
+// <clock_hz> to convert cycles in simulated time. The counters displayed
+// by print_stats() are used by the nic_bench.py script.
+//
+// These objects are the channel backends of the NIC in NIC_MODE_PCAP:
+// the platform builds the backends of each channel, and attaches them to
+// the NIC name (attach()) before building the NIC. The NIC gets the
+// backends of its channels with attached(), and calls get() / put()
+// instead of the backends of the other modes.
+//////////////////////////////////////////////////////////////////////////////
+
+#ifndef SOCLIB_COMMON_NIC_PCAP_BACKEND_H
+#define SOCLIB_COMMON_NIC_PCAP_BACKEND_H
+
+#include <stdint.h>
+#include <cstdio>
+#include <string>
+#include <vector>
+#include <deque>
+#include <map>
+
+namespace soclib { namespace common {
+
+// NIC modes 0 / 1 / 2 are FILE / SYNTHESIS / TAP
+#define NIC_MODE_PCAP   3
+
+class NicPcapRx
+{
+    const std::string           m_name;
+    const std::string           m_pathname;
+    const uint64_t              m_clock_hz;
+    const uint32_t              m_rate;         // packets per second (0 : pcap timing)
+    const uint32_t              m_burst;        // packets per burst
+    const uint32_t              m_gap;          // inter frame gap (cycles)
+    const uint32_t              m_queue;        // FIFO depth (packets)
+    const uint32_t              m_loops;        // number of replays (0 : infinite)
+
+    FILE*                       m_file;
+    bool                        m_swap;         // byte-swapped pcap file
+    bool                        m_nsec;         // nanosecond timestamps
+    long                        m_first;        // offset of the first record
+    uint32_t                    m_loop;         // current replay
+    bool                        m_eof;          // all replays done
+
+    // next packet read from the file, and its release cycle
+    std::vector<uint8_t>        m_next;
+    bool                        m_next_valid;
+    uint64_t                    m_next_cycle;
+    uint64_t                    m_ts_origin;    // first timestamp of the current replay (ns)
+    uint64_t                    m_cycle_origin; // release cycle of this first packet
+    uint64_t                    m_bursts;       // number of released bursts
+
+    std::deque<std::vector<uint8_t> > m_fifo;   // released packets, with FCS
+    size_t                      m_byte;         // next byte in the first packet
+    uint32_t                    m_gap_count;    // remaining IFG cycles
+    uint64_t                    m_cycle;
+
+    // statistics
+    uint64_t                    m_released;
+    uint64_t                    m_sent;
+    uint64_t                    m_dropped;
+    uint64_t                    m_skipped;      // packets larger than 1514 bytes
+    uint64_t                    m_bytes;
+
+    bool    read_packet( std::vector<uint8_t> &frame, uint64_t &ts );
+    bool    next_packet();
+    void    release();
+
+public:
+
+    NicPcapRx( const std::string  &name,
+               const std::string  &pathname,
+               uint64_t           clock_hz,
+               uint32_t           rate,
+               uint32_t           burst,
+               uint32_t           gap,
+               uint32_t           queue,
+               uint32_t           loops );
+
+    ~NicPcapRx();
+
+    // returns false if the pcap file cannot be used
+    bool ok() const { return m_file != NULL; }
+
+    void reset();
+
+    // GMII interface : one call per cycle
+    void get( bool* dv, bool* er, uint8_t* dt );
+
+    void print_stats() const;
+
+    // backend of channel <channel> of the NIC <nic> (NULL if none)
+    static void       attach( const std::string &nic, size_t channel, NicPcapRx* rx );
+    static NicPcapRx* attached( const std::string &nic, size_t channel );
+};
+
+class NicPcapTx
+{
+    const std::string           m_name;
+    const std::string           m_pathname;
+    const uint64_t              m_clock_hz;
+
+    FILE*                       m_file;
+    std::vector<uint8_t>        m_frame;        // current packet, with FCS
+    bool                        m_active;       // packet in progress
+    bool                        m_error;        // er asserted in the packet
+    uint64_t                    m_start;        // cycle of the first byte
+    uint64_t                    m_cycle;
+
+    // statistics
+    uint64_t                    m_packets;
+    uint64_t                    m_bytes;
+    uint64_t                    m_errors;       // er asserted, bad FCS, or runt
+
+    void    end_packet();
+
+public:
+
+    NicPcapTx( const std::string  &name,
+               const std::string  &pathname,
+               uint64_t           clock_hz );
+
+    ~NicPcapTx();
+
+    // returns false if the pcap file cannot be created
+    bool ok() const { return m_file != NULL; }
+
+    void reset();
+
+    // GMII interface : one call per cycle
+    void put( bool dv, bool er, uint8_t dt );
+
+    void print_stats() const;
+
+    // backend of channel <channel> of the NIC <nic> (NULL if none)
+    static void       attach( const std::string &nic, size_t channel, NicPcapTx* tx );
+    static NicPcapTx* attached( const std::string &nic, size_t channel );
+};
+
+}}
+
+#endif
+
+// Local Variables:
+// tab-width: 4
+// c-basic-offset: 4
+// c-file-offsets:((innamespace . 0)(inline-open . 0))
+// indent-tabs-mode: nil
+// End:
+
+// vim: filetype=cpp:expandtab:shiftwidth=4:tabstop=4:softtabstop=4
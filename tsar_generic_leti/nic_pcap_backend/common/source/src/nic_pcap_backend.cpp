@@ -0,0 +1,461 @@
+//////////////////////////////////////////////////////////////////////////////
+// File: nic_pcap_backend.cpp
+// Copyright: UPMC/LIP6
+// Date : october 2026
+// This program is released under the GNU public license
+//////////////////////////////////////////////////////////////////////////////
+
+#include <iostream>
+#include <cstring>
+
+#include "../include/nic_pcap_backend.h"
+
+namespace soclib { namespace common {
+
+#define PCAP_MAGIC_USEC     0xA1B2C3D4
+#define PCAP_MAGIC_NSEC     0xA1B23C4D
+#define PCAP_LINKTYPE_ETH   1
+
+#define ETH_MIN_SIZE        60          // without FCS
+#define ETH_MAX_SIZE        1514        // without FCS
+#define ETH_FCS_SIZE        4
+
+// attached backends, indexed by (NIC name, channel)
+// (function statics, built on first use)
+typedef std::pair<std::string, size_t> channel_t;
+
+static std::map<channel_t, NicPcapRx*> &rx_channels()
+{
+    static std::map<channel_t, NicPcapRx*> channels;
+    return channels;
+}
+
+static std::map<channel_t, NicPcapTx*> &tx_channels()
+{
+    static std::map<channel_t, NicPcapTx*> channels;
+    return channels;
+}
+
+static uint32_t swap32( uint32_t x )
+{
+    return ((x & 0xFF) << 24) | ((x & 0xFF00) << 8) |
+           ((x >> 8) & 0xFF00) | ((x >> 24) & 0xFF);
+}
+
+// ethernet CRC32 (reflected, polynomial 0x04C11DB7)
+static uint32_t crc32( const uint8_t* buf, size_t length )
+{
+    static uint32_t table[256];
+    static bool     init = false;
+
+    if ( not init )
+    {
+        for ( uint32_t i = 0 ; i < 256 ; i++ )
+        {
+            uint32_t c = i;
+            for ( size_t k = 0 ; k < 8 ; k++ ) c = (c & 1) ? (0xEDB88320 ^ (c >> 1)) : (c >> 1);
+            table[i] = c;
+        }
+        init = true;
+    }
+
+    uint32_t crc = 0xFFFFFFFF;
+    for ( size_t i = 0 ; i < length ; i++ ) crc = table[(crc ^ buf[i]) & 0xFF] ^ (crc >> 8);
+    return crc ^ 0xFFFFFFFF;
+}
+
+// conversions between cycles and nanoseconds, without overflow
+static uint64_t ns_to_cycles( uint64_t ns, uint64_t clock_hz )
+{
+    return (ns / 1000000000ULL) * clock_hz + ((ns % 1000000000ULL) * clock_hz) / 1000000000ULL;
+}
+
+static uint64_t cycles_to_ns( uint64_t cycles, uint64_t clock_hz )
+{
+    return (cycles / clock_hz) * 1000000000ULL + ((cycles % clock_hz) * 1000000000ULL) / clock_hz;
+}
+
+//////////////////////////////////////////////////////////////
+NicPcapRx::NicPcapRx( const std::string  &name,
+                      const std::string  &pathname,
+                      uint64_t           clock_hz,
+                      uint32_t           rate,
+                      uint32_t           burst,
+                      uint32_t           gap,
+                      uint32_t           queue,
+                      uint32_t           loops )
+//////////////////////////////////////////////////////////////
+    : m_name( name ),
+      m_pathname( pathname ),
+      m_clock_hz( clock_hz ? clock_hz : 1 ),
+      m_rate( rate ),
+      m_burst( burst ? burst : 1 ),
+      m_gap( gap ),
+      m_queue( queue ? queue : 1 ),
+      m_loops( loops ),
+      m_file( NULL ),
+      m_swap( false ),
+      m_nsec( false ),
+      m_first( 0 )
+{
+    uint32_t header[6];
+
+    m_file = fopen( pathname.c_str(), "rb" );
+    if ( m_file and (fread( header, sizeof(uint32_t), 6, m_file ) == 6) )
+    {
+        uint32_t magic    = header[0];
+        uint32_t linktype = header[5];
+
+        m_swap = ( magic == swap32( PCAP_MAGIC_USEC ) ) or ( magic == swap32( PCAP_MAGIC_NSEC ) );
+        if ( m_swap )
+        {
+            magic    = swap32( magic );
+            linktype = swap32( linktype );
+        }
+        m_nsec  = ( magic == PCAP_MAGIC_NSEC );
+        m_first = ftell( m_file );
+
+        if ( ((magic == PCAP_MAGIC_USEC) or (magic == PCAP_MAGIC_NSEC)) and
+             (linktype == PCAP_LINKTYPE_ETH) )
+        {
+            reset();
+            return;
+        }
+    }
+
+    std::cout << "[NIC_PCAP_RX] " << m_name << " : cannot use pcap file "
+              << pathname << " (ethernet pcap file required)" << std::endl;
+    if ( m_file ) fclose( m_file );
+    m_file = NULL;
+    reset();
+}
+
+///////////////////////
+NicPcapRx::~NicPcapRx()
+///////////////////////
+{
+    if ( m_file ) fclose( m_file );
+}
+
+//////////////////////
+void NicPcapRx::reset()
+//////////////////////
+{
+    if ( m_file ) fseek( m_file, m_first, SEEK_SET );
+
+    m_loop         = 0;
+    m_eof          = ( m_file == NULL );
+    m_next_valid   = false;
+    m_next_cycle   = 0;
+    m_ts_origin    = 0;
+    m_cycle_origin = 0;
+    m_byte         = 0;
+    m_gap_count    = 0;
+    m_cycle        = 0;
+    m_released     = 0;
+    m_sent         = 0;
+    m_dropped      = 0;
+    m_skipped      = 0;
+    m_bytes        = 0;
+    m_fifo.clear();
+
+    next_packet();
+}
+
+//////////////////////////////////////////////////////////////////////////
+bool NicPcapRx::read_packet( std::vector<uint8_t> &frame, uint64_t &ts )
+//////////////////////////////////////////////////////////////////////////
+// reads the next ethernet packet of the file, and returns false at the
+// end of the file. The packet is padded and the FCS is appended.
+{
+    uint32_t record[4];     // ts_sec, ts_frac, incl_len, orig_len
+
+    while ( fread( record, sizeof(uint32_t), 4, m_file ) == 4 )
+    {
+        if ( m_swap ) for ( size_t i = 0 ; i < 4 ; i++ ) record[i] = swap32( record[i] );
+
+        uint32_t length = record[2];
+        if ( length > 0x40000 ) break;              // corrupted file
+
+        frame.resize( length );
+        if ( length and (fread( &frame[0], 1, length, m_file ) != length) ) break;
+
+        if ( length > ETH_MAX_SIZE )
+        {
+            m_skipped++;
+            continue;
+        }
+        if ( length < ETH_MIN_SIZE ) frame.resize( ETH_MIN_SIZE, 0 );
+
+        uint32_t fcs = crc32( &frame[0], frame.size() );
+        for ( size_t i = 0 ; i < ETH_FCS_SIZE ; i++ ) frame.push_back( (fcs >> (8 * i)) & 0xFF );
+
+        ts = (uint64_t)record[0] * 1000000000ULL +
+             (uint64_t)record[1] * ( m_nsec ? 1 : 1000 );
+        return true;
+    }
+    return false;
+}
+
+//////////////////////////////
+bool NicPcapRx::next_packet()
+//////////////////////////////
+// loads the next packet, and computes its release cycle
+{
+    uint64_t ts;
+    bool     first = ( m_released == 0 );
+
+    m_next_valid = false;
+    if ( m_eof ) return false;
+
+    if ( not read_packet( m_next, ts ) )
+    {
+        // end of file : next replay
+        m_loop++;
+        fseek( m_file, m_first, SEEK_SET );
+        if ( ((m_loops != 0) and (m_loop >= m_loops)) or not read_packet( m_next, ts ) )
+        {
+            m_eof = true;
+            return false;
+        }
+        first = true;
+    }
+
+    if ( m_rate == 0 )
+    {
+        // pcap timing : the first packet of a replay follows the last packet
+        if ( first )
+        {
+            m_ts_origin    = ts;
+            m_cycle_origin = ( m_released == 0 ) ? 0 : m_next_cycle + 1;
+        }
+        uint64_t delay = ( ts > m_ts_origin ) ? ts - m_ts_origin : 0;
+        m_next_cycle   = m_cycle_origin + ns_to_cycles( delay, m_clock_hz );
+    }
+    else
+    {
+        // bursts of m_burst packets, at m_rate packets per second
+        uint64_t burst = m_released / m_burst;
+        m_next_cycle   = ( burst * m_burst * m_clock_hz ) / m_rate;
+    }
+
+    m_next_valid = true;
+    return true;
+}
+
+////////////////////////
+void NicPcapRx::release()
+////////////////////////
+{
+    while ( m_next_valid and (m_next_cycle <= m_cycle) )
+    {
+        if ( m_fifo.size() < m_queue ) m_fifo.push_back( m_next );
+        else                           m_dropped++;
+        m_released++;
+        next_packet();
+    }
+}
+
+//////////////////////////////////////////////////////////
+void NicPcapRx::get( bool* dv, bool* er, uint8_t* dt )
+//////////////////////////////////////////////////////////
+{
+    release();
+
+    *dv = false;
+    *er = false;
+    *dt = 0;
+
+    if ( m_gap_count )
+    {
+        m_gap_count--;
+    }
+    else if ( not m_fifo.empty() )
+    {
+        const std::vector<uint8_t> &frame = m_fifo.front();
+
+        *dv = true;
+        *dt = frame[m_byte];
+        m_byte++;
+
+        if ( m_byte == frame.size() )
+        {
+            m_sent++;
+            m_bytes    += frame.size() - ETH_FCS_SIZE;
+            m_byte      = 0;
+            m_gap_count = m_gap;
+            m_fifo.pop_front();
+        }
+    }
+    m_cycle++;
+}
+
+///////////////////////////////////
+void NicPcapRx::print_stats() const
+///////////////////////////////////
+{
+    std::cout << "[NIC_PCAP_RX] " << m_name << " : " << m_pathname << std::endl
+              << "  cycles          = " << m_cycle << std::endl
+              << "  packets offered = " << m_released << std::endl
+              << "  packets sent    = " << m_sent << std::endl
+              << "  packets dropped = " << m_dropped << std::endl
+              << "  packets skipped = " << m_skipped << std::endl
+              << "  bytes sent      = " << m_bytes << std::endl;
+}
+
+/////////////////////////////////////////////////////////////////////////
+void NicPcapRx::attach( const std::string &nic, size_t channel, NicPcapRx* rx )
+/////////////////////////////////////////////////////////////////////////
+{
+    rx_channels()[std::make_pair( nic, channel )] = rx;
+}
+
+/////////////////////////////////////////////////////////////////////
+NicPcapRx* NicPcapRx::attached( const std::string &nic, size_t channel )
+/////////////////////////////////////////////////////////////////////
+{
+    std::map<channel_t, NicPcapRx*>::iterator it = rx_channels().find( std::make_pair( nic, channel ) );
+    return ( it == rx_channels().end() ) ? NULL : it->second;
+}
+
+//////////////////////////////////////////////////////////////
+NicPcapTx::NicPcapTx( const std::string  &name,
+                      const std::string  &pathname,
+                      uint64_t           clock_hz )
+//////////////////////////////////////////////////////////////
+    : m_name( name ),
+      m_pathname( pathname ),
+      m_clock_hz( clock_hz ? clock_hz : 1 )
+{
+    // magic, version 2.4, thiszone, sigfigs, snaplen, linktype
+    uint32_t header[6] = { PCAP_MAGIC_NSEC, 0x00040002, 0, 0, 65535, PCAP_LINKTYPE_ETH };
+
+    m_file = fopen( pathname.c_str(), "wb" );
+    if ( m_file == NULL )
+    {
+        std::cout << "[NIC_PCAP_TX] " << m_name << " : cannot create pcap file "
+                  << pathname << std::endl;
+    }
+    else
+    {
+        fwrite( header, sizeof(uint32_t), 6, m_file );
+    }
+    reset();
+}
+
+///////////////////////
+NicPcapTx::~NicPcapTx()
+///////////////////////
+{
+    if ( m_file ) fclose( m_file );
+}
+
+//////////////////////
+void NicPcapTx::reset()
+//////////////////////
+{
+    m_frame.clear();
+    m_active  = false;
+    m_error   = false;
+    m_start   = 0;
+    m_cycle   = 0;
+    m_packets = 0;
+    m_bytes   = 0;
+    m_errors  = 0;
+}
+
+///////////////////////////
+void NicPcapTx::end_packet()
+///////////////////////////
+{
+    size_t length = m_frame.size();
+
+    if ( m_error or (length < ETH_MIN_SIZE + ETH_FCS_SIZE) )
+    {
+        m_errors++;
+        return;
+    }
+
+    length = length - ETH_FCS_SIZE;
+
+    uint32_t fcs = 0;
+    for ( size_t i = 0 ; i < ETH_FCS_SIZE ; i++ ) fcs |= (uint32_t)m_frame[length + i] << (8 * i);
+    if ( fcs != crc32( &m_frame[0], length ) )
+    {
+        m_errors++;
+        return;
+    }
+
+    m_packets++;
+    m_bytes += length;
+
+    if ( m_file )
+    {
+        uint64_t ns        = cycles_to_ns( m_start, m_clock_hz );
+        uint32_t record[4] = { (uint32_t)(ns / 1000000000ULL), (uint32_t)(ns % 1000000000ULL),
+                               (uint32_t)length, (uint32_t)length };
+        fwrite( record, sizeof(uint32_t), 4, m_file );
+        fwrite( &m_frame[0], 1, length, m_file );
+    }
+}
+
+///////////////////////////////////////////////////////
+void NicPcapTx::put( bool dv, bool er, uint8_t dt )
+///////////////////////////////////////////////////////
+{
+    if ( dv )
+    {
+        if ( not m_active )
+        {
+            m_active = true;
+            m_error  = false;
+            m_start  = m_cycle;
+            m_frame.clear();
+        }
+        m_frame.push_back( dt );
+        m_error = m_error or er;
+    }
+    else if ( m_active )
+    {
+        end_packet();
+        m_active = false;
+    }
+    m_cycle++;
+}
+
+///////////////////////////////////
+void NicPcapTx::print_stats() const
+///////////////////////////////////
+{
+    std::cout << "[NIC_PCAP_TX] " << m_name << " : " << m_pathname << std::endl
+              << "  cycles          = " << m_cycle << std::endl
+              << "  packets         = " << m_packets << std::endl
+              << "  bytes           = " << m_bytes << std::endl
+              << "  errors          = " << m_errors << std::endl;
+}
+
+/////////////////////////////////////////////////////////////////////////
+void NicPcapTx::attach( const std::string &nic, size_t channel, NicPcapTx* tx )
+/////////////////////////////////////////////////////////////////////////
+{
+    tx_channels()[std::make_pair( nic, channel )] = tx;
+}
+
+/////////////////////////////////////////////////////////////////////
+NicPcapTx* NicPcapTx::attached( const std::string &nic, size_t channel )
+/////////////////////////////////////////////////////////////////////
+{
+    std::map<channel_t, NicPcapTx*>::iterator it = tx_channels().find( std::make_pair( nic, channel ) );
+    return ( it == tx_channels().end() ) ? NULL : it->second;
+}
+
+}}
+
+// Local Variables:
+// tab-width: 4
+// c-basic-offset: 4
+// c-file-offsets:((innamespace . 0)(inline-open . 0))
+// indent-tabs-mode: nil
+// End:
+
+// vim: filetype=cpp:expandtab:shiftwidth=4:tabstop=4:softtabstop=4
@@ -0,0 +1,222 @@
+#!/usr/bin/env python
+
+import sys
+import struct
+
+from arch_info import arch, io_clusters
+from cluster_stats import heatmap, HEADER_FORMAT, HEADER_SIZE, STATS_VERSION
+
+#######################################################################################
+#   file   : router_stats.py
+#   date   : october 2026
+#
+#  This file decodes the routers counters dump generated by the simul.x simulator
+#  (-NOCSTATS and -NOCSTATSFILE arguments of top.cpp), and reports the links
+#  utilization of the five DSPIN networks (CMD, RSP, M2P, P2M, CLA).
+#######################################################################################
+#  The dump file contains one 32 bytes header (stats_header_t in top.cpp), followed
+#  by one 216 bytes record (TsarLetiRouterStats in tsar_leti_cluster.h) per cluster
+#  and per sampling period. All counters are cumulative since reset.
+#
+#  For each router output port (NORTH/SOUTH/EAST/WEST/LOCAL):
+#  - the utilization is the ratio of cycles where a flit is accepted,
+#  - the stall rate is the ratio of cycles where a flit is blocked.
+#  A link is reported as saturated when its utilization or its stall rate
+#  is larger than the threshold (default 0.5).
+#
+#  The IO bus of each IO cluster is connected to the NORTH port of the CMD/RSP
+#  routers in the cluster below it (row y_size-2). The IO clusters are obtained
+#  from arch_info.io_clusters() with the number of IO clusters found in the dump
+#  header, and these links are always reported.
+#
+#  Usage : python router_stats.py [-threshold t] [-top n] [stats_file]
+#  - the default stats_file is "router_stats.bin".
+#######################################################################################
+
+NOC_MAGIC     = 0x524E4C54     # "TLNR"
+
+RECORD_FORMAT = '<QII' + '25I' * 2
+RECORD_SIZE   = struct.calcsize( RECORD_FORMAT )
+
+NETWORKS      = [ 'CMD', 'RSP', 'M2P', 'P2M', 'CLA' ]
+PORTS         = [ 'NORTH', 'SOUTH', 'EAST', 'WEST', 'LOCAL' ]
+
+NORTH         = 0
+
+########################
+def read_router_stats( pathname ):
+    '''
+    Returns a (archi, gates, samples) tuple, where gates is the list of the
+    clusters connected to an IO cluster, samples is a list of (cycle, records)
+    tuples, and records a dictionary indexed by cxy. Each record is a
+    (flits, stalls) tuple of 5 * 5 lists indexed by [network][port].
+    '''
+
+    f    = open( pathname, 'rb' )
+    data = f.read()
+    f.close()
+
+    assert len( data ) >= HEADER_SIZE, 'truncated stats file'
+
+    ( magic, version, x_size, y_size, nb_procs,
+      period, record_size, nb_ios ) = struct.unpack_from( HEADER_FORMAT, data, 0 )
+
+    assert magic == NOC_MAGIC, 'not a routers stats file : %s' % pathname
+    assert version == STATS_VERSION, 'unsupported stats version %d' % version
+    assert record_size == RECORD_SIZE, 'illegal record size %d' % record_size
+
+    nb_ios = max( nb_ios, 1 )        # 0 in dumps without IO clusters count
+    archi  = arch( x_size = x_size, y_size = y_size, nb_cores = nb_procs, nb_ios = nb_ios )
+    gates  = [ cxy - 1 for cxy in io_clusters( x_size, y_size, archi.y_width, nb_ios ) ]
+
+    nb_clusters = x_size * (y_size - 1)
+    samples     = []
+    offset      = HEADER_SIZE
+
+    while offset + (nb_clusters * RECORD_SIZE) <= len( data ):
+        records = {}
+        cycle   = 0
+        for c in range( nb_clusters ):
+            values = struct.unpack_from( RECORD_FORMAT, data, offset )
+            offset = offset + RECORD_SIZE
+
+            cycle  = values[0]
+            cxy    = values[1]
+            flits  = [ list( values[3 + 5*n : 8 + 5*n] ) for n in range( 5 ) ]
+            stalls = [ list( values[28 + 5*n : 33 + 5*n] ) for n in range( 5 ) ]
+
+            records[cxy] = ( flits, stalls )
+
+        samples.append( (cycle, records) )
+
+    return ( archi, gates, samples )
+
+########################
+def links( records, previous, cycles ):
+    '''
+    Returns the list of (utilization, stall_rate, cxy, network, port) tuples
+    for all router output ports, on the <cycles> cycles between the <previous>
+    records (can be empty) and the <records>.
+    '''
+
+    result = []
+    for cxy in records:
+        ( flits, stalls ) = records[cxy]
+        if cxy in previous: ( old_flits, old_stalls ) = previous[cxy]
+        else:               ( old_flits, old_stalls ) = ( None, None )
+
+        for n in range( 5 ):
+            for p in range( 5 ):
+                f = flits[n][p]
+                s = stalls[n][p]
+                if old_flits != None:
+                    f = (f - old_flits[n][p]) & 0xFFFFFFFF
+                    s = (s - old_stalls[n][p]) & 0xFFFFFFFF
+                result.append( ( float( f ) / max( cycles, 1 ),
+                                 float( s ) / max( cycles, 1 ),
+                                 cxy, n, p ) )
+    return result
+
+########################
+def link_name( archi, cxy, network, port ):
+
+    x = cxy >> archi.y_width
+    y = cxy & ((1 << archi.y_width) - 1)
+    return '%s[%d][%d].%s' % (NETWORKS[network], x, y, PORTS[port])
+
+########################
+def main( argv ):
+
+    pathname  = 'router_stats.bin'
+    threshold = 0.5
+    top       = 10
+
+    n = 1
+    while n < len( argv ):
+        if argv[n] == '-threshold' and (n + 1) < len( argv ):
+            threshold = float( argv[n + 1] )
+            n = n + 2
+        elif argv[n] == '-top' and (n + 1) < len( argv ):
+            top = int( argv[n + 1] )
+            n = n + 2
+        else:
+            pathname = argv[n]
+            n = n + 1
+
+    ( archi, gates, samples ) = read_router_stats( pathname )
+
+    if len( samples ) == 0:
+        print( 'no sample in %s' % pathname )
+        return 1
+
+    ### time series : busiest link for each sampling period
+
+    print( '%12s %8s %8s  %s' % ('cycle', 'MAX_UTIL', 'MAX_STALL', 'busiest link') )
+
+    previous  = {}
+    last_cyc  = 0
+    saturated = {}
+    for ( cycle, records ) in samples:
+        l = links( records, previous, cycle - last_cyc )
+        busiest = max( l )
+        stalled = max( [ (s, u, c, n, p) for (u, s, c, n, p) in l ] )
+        print( '%12d %8.3f %8.3f  %s' % (cycle, busiest[0], stalled[0],
+                                          link_name( archi, busiest[2], busiest[3], busiest[4] )) )
+
+        for ( u, s, c, n, p ) in l:
+            if ( u >= threshold ) or ( s >= threshold ):
+                saturated[(c, n, p)] = saturated.get( (c, n, p), 0 ) + 1
+
+        previous = records
+        last_cyc = cycle
+
+    ### whole run : most loaded links
+
+    ( cycle, records ) = samples[-1]
+    l = links( records, {}, cycle )
+    l.sort( reverse = True )
+
+    print( '' )
+    print( 'Most loaded links (cycle %d)' % cycle )
+    print( '%-24s %8s %8s %10s' % ('link', 'UTIL', 'STALL', 'SATURATED') )
+    for ( u, s, c, n, p ) in l[:top]:
+        print( '%-24s %8.3f %8.3f %10d' % (link_name( archi, c, n, p ), u, s,
+                                            saturated.get( (c, n, p), 0 )) )
+
+    print( '' )
+    print( 'IO bus links' )
+    for ( u, s, c, n, p ) in l:
+        if ( c in gates ) and ( p == NORTH ) and ( n < 2 ):
+            print( '%-24s %8.3f %8.3f %10d' % (link_name( archi, c, n, p ), u, s,
+                                                saturated.get( (c, n, p), 0 )) )
+
+    ### whole run : congestion hot spots (max stall rate per router)
+
+    for n in range( 5 ):
+        values = {}
+        for ( u, s, c, net, p ) in l:
+            if net == n: values[c] = max( values.get( c, 0.0 ), s )
+        print( '' )
+        print( heatmap( archi, values, '%s network : max output stall rate' % NETWORKS[n],
+                        '%.3f' ) )
+
+    print( '' )
+    print( 'Saturated links (utilization or stall rate >= %.2f) : %d' % (threshold,
+                                                                          len( saturated )) )
+    return 0
+
+########################## stats display #############################################
+
+if __name__ == '__main__':
+
+    sys.exit( main( sys.argv ) )
+
+
+# Local Variables:
+# tab-width: 4;
+# c-basic-offset: 4;
+# c-file-offsets:((innamespace . 0)(inline-open . 0));
+# indent-tabs-mode: nil;
+# End:
+#
+# vim: filetype=python:expandtab:shiftwidth=4:tabstop=4:softtabstop=4
@@ -0,0 +1,236 @@
+#!/usr/bin/env python
+
+import os
+import re
+import sys
+import time
+import inspect
+import itertools
+import subprocess
+
+from arch_info import arch
+from cluster_stats import read_stats, metrics
+
+#######################################################################################
+#   file   : sweep.py
+#   date   : october 2026
+#
+#  This file runs one workload on the "tsar_generic_leti" simulator for all points
+#  of a cache and memory geometry grid, and tabulates the number of simulated cycles
+#  needed to complete the workload, and the L1/L2 miss rates for each point.
+#######################################################################################
+#  For each point of the grid:
+#  - the sweep/<point>/hard_config.h file is generated by the arch_info.arch()
+#    constructor, where <point> contains all the swept parameters and values,
+#  - the simulator is built by soclib-cc in the same directory, with this directory
+#    in front of the include path (the "hard_config.h" file of the current
+#    directory is never modified),
+#  - the simulator is executed in the sweep/<point> directory, with the activity
+#    counters enabled (-STATS argument), and stops at the end of the workload:
+#    when the L1 misses stay below <mpkc> misses per 1000 cycles during <idle>
+#    consecutive sampling periods (-ENDIDLE / -ENDMPKC arguments),
+#  - the workload end cycle is the last active sampling cycle reported by the
+#    simulator, and the metrics are computed on the [0, end cycle] interval by
+#    the cluster_stats.py functions.
+#  A point that does not complete the workload in <ncycles> cycles is reported
+#  as "timeout".
+#
+#  Usage : python sweep.py [-param value[,value...]]... [-ncycles n] [-stats period]
+#                          [-idle n] [-mpkc n] [-soft pathname] [-disk pathname]
+#                          [-threads n]
+#  - param can be any arch_info.arch() parameter. A comma separated list of values
+#    defines one axis of the grid. The other parameters have the default values.
+#  - ncycles is the max number of simulated cycles for each point (default 100000000).
+#  - stats is the activity counters sampling period (default 100000).
+#  - idle is the number of idle sampling periods ending the workload (default 3),
+#    and mpkc the max L1 misses per 1000 cycles of an idle period (default 1).
+#  - the default disk image is "virt_hdd.dmg" in the current directory.
+#
+#  Example : python sweep.py -memc_sets 64,128,256 -l1_dsets 32,64 -ncycles 50000000
+#######################################################################################
+
+STRING_PARAMS = [ 'ioc_type' ]
+
+SWEEP_OPTIONS = [ 'ncycles', 'stats', 'idle', 'mpkc', 'soft', 'disk', 'threads' ]
+
+USAGE = ( 'Usage : python sweep.py [-param value[,value...]]... [-ncycles n] [-stats period]\n'
+          '                        [-idle n] [-mpkc n] [-soft pathname] [-disk pathname]\n'
+          '                        [-threads n]' )
+
+########################
+def arch_params():
+    '''
+    Returns the list of the arch_info.arch() parameters names.
+    '''
+
+    try:    return inspect.getfullargspec( arch ).args
+    except AttributeError: return inspect.getargspec( arch ).args
+
+########################
+def point_name( names, params ):
+    '''
+    Returns the run directory name of one grid point, built from all the
+    swept parameters (the platform name does not contain all of them).
+    '''
+
+    if not names: return 'default'
+    return '_'.join( [ '%s%s' % (name, params[name]) for name in names ] )
+
+########################
+def build( archi, rundir ):
+    '''
+    Generates the <rundir>/hard_config.h file and builds <rundir>/simul.x.
+    '''
+
+    f = open( os.path.join( rundir, 'hard_config.h' ), 'w' )
+    f.write( archi.hard_config() )
+    f.close()
+
+    command = [ 'soclib-cc', '-P', '-p', 'top.desc', '-I' + os.path.abspath( rundir ),
+                '-I.', '-o', os.path.join( rundir, 'simul.x' ) ]
+    return subprocess.call( command ) == 0
+
+########################
+def end_cycle( pathname ):
+    '''
+    Returns the workload end cycle reported in the simulator log, or None.
+    '''
+
+    for line in open( pathname ):
+        m = re.match( r'\[END\] workload completed at cycle (\d+)', line )
+        if m: return int( m.group( 1 ) )
+    return None
+
+########################
+def run( rundir, ncycles, period, idle, mpkc, options ):
+    '''
+    Executes the simulator in the <rundir> directory, and returns the
+    (cycle, totals, wall_time) tuple, where cycle is the workload end cycle
+    (None if the workload is not completed), and totals are the derived
+    metrics (cluster_stats.metrics) summed on all clusters, up to this cycle.
+    '''
+
+    command = [ './simul.x', '-NCYCLES', str( ncycles ), '-STATS', str( period ),
+                '-STATSFILE', 'cluster_stats.bin', '-ENDIDLE', str( idle ),
+                '-ENDMPKC', str( mpkc ) ] + options
+
+    log_name = os.path.join( rundir, 'simul.log' )
+    log      = open( log_name, 'w' )
+    start    = time.time()
+    subprocess.call( command, cwd = rundir, stdout = log, stderr = subprocess.STDOUT )
+    wall     = time.time() - start
+    log.close()
+
+    pathname = os.path.join( rundir, 'cluster_stats.bin' )
+    if not os.path.exists( pathname ): return ( None, None, wall )
+
+    ( header, archi, samples ) = read_stats( pathname )
+    if len( samples ) == 0: return ( None, None, wall )
+
+    # the sample of the workload end cycle (the last one on timeout)
+    end = end_cycle( log_name )
+    ( cycle, records ) = samples[-1]
+    for sample in samples:
+        if end != None and sample[0] <= end: ( cycle, records ) = sample
+
+    total = None
+    for cxy in records:
+        if total == None: total = dict( records[cxy] )
+        else:
+            for name in total: total[name] = total[name] + records[cxy][name]
+
+    return ( end, metrics( total, cycle ), wall )
+
+########################
+def main( argv ):
+
+    grid    = []          # list of (param, [values]) tuples
+    ncycles = 100000000
+    period  = 100000
+    idle    = 3
+    mpkc    = 1
+    disk    = os.path.abspath( 'virt_hdd.dmg' )
+    options = []
+    params  = arch_params()
+
+    n = 1
+    while n < len( argv ):
+        key = argv[n][1:]
+
+        if ( not argv[n].startswith( '-' ) or (n + 1) >= len( argv ) or
+             (key not in SWEEP_OPTIONS and key not in params) ):
+            print( '[SWEEP] illegal argument : %s' % argv[n] )
+            print( USAGE )
+            return 1
+
+        value = argv[n + 1]
+        n     = n + 2
+
+        if   key == 'ncycles': ncycles = int( value, 0 )
+        elif key == 'stats':   period  = int( value, 0 )
+        elif key == 'idle':    idle    = int( value, 0 )
+        elif key == 'mpkc':    mpkc    = int( value, 0 )
+        elif key == 'soft':    options += [ '-SOFT', os.path.abspath( value ) ]
+        elif key == 'disk':    disk    = os.path.abspath( value )
+        elif key == 'threads': options += [ '-THREADS', value ]
+        elif key in STRING_PARAMS:
+            grid.append( (key, value.split( ',' )) )
+        else:
+            grid.append( (key, [ int( v, 0 ) for v in value.split( ',' ) ]) )
+
+    options += [ '-DISK', disk ]
+    names    = [ g[0] for g in grid ]
+    results  = []
+
+    for values in itertools.product( *[ g[1] for g in grid ] ):
+        params = dict( zip( names, values ) )
+        archi  = arch( **params )
+        rundir = os.path.join( 'sweep', point_name( names, params ) )
+
+        if not os.path.isdir( rundir ): os.makedirs( rundir )
+
+        if not build( archi, rundir ):
+            print( '[SWEEP] build failed for %s' % rundir )
+            results.append( (params, None, None, 0.0) )
+            continue
+
+        ( cycle, totals, wall ) = run( rundir, ncycles, period, idle, mpkc, options )
+        results.append( (params, cycle, totals, wall) )
+
+        print( '[SWEEP] %s done in %.1f s' % (rundir, wall) )
+
+    ### results table
+
+    line = ''
+    for name in names: line += '%14s' % name
+    print( line + '%12s %10s %10s %10s %10s' % ('cycles', 'L1_MPKC', 'L2_MISS',
+                                                 'COH_PKC', 'WALL(s)') )
+
+    for ( params, cycle, totals, wall ) in results:
+        line = ''
+        for name in names: line += '%14s' % params[name]
+        if totals == None:
+            print( line + '%12s' % 'failed' )
+        else:
+            if cycle == None: cycles = 'timeout'
+            else:             cycles = '%d' % cycle
+            print( line + '%12s %10.2f %10.3f %10.2f %10.1f' % (cycles, totals['l1_mpkc'],
+                                                                 totals['l2_miss'],
+                                                                 totals['coh_pkc'], wall) )
+    return 0
+
+########################## geometry sweep ############################################
+
+if __name__ == '__main__':
+
+    sys.exit( main( sys.argv ) )
+
+
+# Local Variables:
+# tab-width: 4;
+# c-basic-offset: 4;
+# c-file-offsets:((innamespace . 0)(inline-open . 0));
+# indent-tabs-mode: nil;
+# End:
+#
+# vim: filetype=python:expandtab:shiftwidth=4:tabstop=4:softtabstop=4
@@ -30,6 +30,14 @@
 //
 // This IO bus is directly connected to the north ports of the CMD/RSP
 // routers in cluster[X_SIZE-1][y_SIZE-2] through VCI/DSPIN wrappers.
+//
+// When NB_IO_CLUSTERS > 1, secondary IO clusters are located in the upper
+// row, at x = IO_X(k) (see below), and connected to the north ports of the
+// CMD/RSP routers in cluster[IO_X(k)][Y_SIZE-2]. Each secondary IO cluster
+// contains one DISK, one MNIC (NB_NIC_CHANNELS channels) and one IOPI,
+// with the same IOPI HWI ports as the main IO cluster. The DISK in IO
+// cluster k uses the "<disk_image>.k" image file.
+//
 // All other clusters in the upper row are empty: no processors,
 // no ram, no routers. 
 // The X_SIZE parameter must be larger than 0, but no larger than 16.
@@ -77,7 +85,7 @@
 // - NB_PROCS_MAX     : number of processors per cluster (1, 2 or 4)
 // - NB_CMA_CHANNELS  : number of CMA channels in I/0 cluster (4 max)
 // - NB_TTY_CHANNELS  : number of TTY channels in I/O cluster (8 max)
-// - NB_NIC_CHANNELS  : number of NIC channels in I/O cluster (2 max)
+// - NB_NIC_CHANNELS  : number of NIC channels per I/O cluster (2 max)
 // - FBUF_X_SIZE      : number of pixels per line for frame buffer
 // - FBUF_Y_SIZE      : number of lines for frame buffer
 // - XCU_NB_HWI       : number of XCU HWIs (must be 16)
@@ -86,14 +94,39 @@
 // - XCU_NB_OUT       : number of XCU output (must be 16)
 // - USE_IOC_XYZ      : IOC type (XYZ in HBA / BDV / SDC / RDK)
 //
-// Some other hardware parameters are not used when compiling the OS,
-// and are only defined in this top.cpp file:
+// Some other hardware parameters are not used when compiling the OS.
+// They are defined in the hard_config.h file by the arch_info.py generator
+// (cache and memory geometry), and default values are defined in this
+// top.cpp file when they are missing:
 // - XRAM_LATENCY     : external ram latency
+// - MEMC_WAYS        : L2 cache number of ways
+// - MEMC_SETS        : L2 cache number of sets
 // - L1_IWAYS         : L1 cache instruction number of ways
 // - L1_ISETS         : L1 cache instruction number of sets
 // - L1_DWAYS         : L1 cache data number of ways
 // - L1_DSETS         : L1 cache data number of sets
+// - MAX_FROZEN_CYCLES: default max frozen cycles (-FROZEN argument)
+// - NB_IO_CLUSTERS   : number of IO clusters (XMAX max)
+// - USE_BDV_ASYNC    : use the VciBlockDeviceAsync component for the BDV
+//                      disk controllers of the IO clusters
+//
+// The other parameters are only defined in this top.cpp file:
 // - DISK_IMAGE_NAME  : pathname for block device disk image
+// - STATS_FILE_NAME  : pathname for the activity counters dump
+// - NOC_FILE_NAME    : pathname for the routers counters dump
+// - TRACE_FILE_NAME  : pathname for the binary trace (see tsar_leti_trace.h)
+// - END_IDLE_MPKC    : L1 misses per 1000 cycles below which a sampling period
+//                      is idle, for the end of workload detection (-ENDIDLE)
+// - DISK_THREADS     : default number of disk backend worker threads
+// - DISK_CACHE       : default disk backend cache size (blocks)
+// - DISK_PREFETCH    : default disk backend read-ahead (blocks)
+// - NIC_MODE         : default NIC mode (0 : FILE / 1 : SYNTHESIS / 2 : TAP /
+//                      3 : PCAP)
+// - NIC_GAP          : default NIC inter frame gap (cycles)
+// - NIC_CLOCK_MHZ    : default simulated clock frequency, used by the pcap
+//                      NIC backends to convert cycles in simulated time
+// - NIC_PCAP_QUEUE   : pcap RX backend FIFO depth (packets)
+// - NIC_TX_PCAP_NAME : prefix of the pcap TX captures
 /////////////////////////////////////////////////////////////////////////
 // General policy for 40 bits physical address decoding:
 // All physical segments base addresses are multiple of 1 Mbytes
@@ -115,20 +148,27 @@
 #include <sstream>
 #include <cstdlib>
 #include <cstdarg>
+#include <cstdio>
+#include <cerrno>
 #include <stdint.h>
+#include <fcntl.h>
+#include <unistd.h>
 
 #include "gdbserver.h"
 #include "mapping_table.h"
 
 #include "tsar_leti_cluster.h"
+#include "tsar_leti_trace.h"
 #include "vci_local_crossbar.h"
 #include "vci_dspin_initiator_wrapper.h"
 #include "vci_dspin_target_wrapper.h"
 //#include "vci_multi_tty.h"
 #include "vci_tty_tsar.h"
 #include "vci_master_nic.h"
+#include "nic_pcap_backend.h"
 #include "vci_chbuf_dma.h"
 #include "vci_block_device_tsar.h"
+#include "vci_block_device_async.h"
 #include "vci_multi_ahci.h"
 #include "vci_framebuffer.h"
 #include "vci_iopic.h"
@@ -139,7 +179,7 @@
 // Main hardware parameters values
 ///////////////////////////////////////////////////
 
-#include "hard_config.h"
+#include <hard_config.h>          // from the include path (see sweep.py)
 
 ///////////////////////////////////////////////////////////////////////////////////////
 // EDIT : Nicolas Phan / June 2018
@@ -171,19 +211,56 @@
 #define XMAX                  X_SIZE         // actual number of columns in 2D mesh
 #define YMAX                  (Y_SIZE - 1)   // actual number of rows in 2D mesh
 
+#ifndef NB_IO_CLUSTERS
+#define NB_IO_CLUSTERS        1
+#endif
+
+// x coordinate of IO cluster k (must be consistent with io_clusters() in arch_info.py)
+#define IO_X(k)               ((XMAX - 1) - ((k) * (XMAX / NB_IO_CLUSTERS)))
+
+#ifndef XRAM_LATENCY
 #define XRAM_LATENCY          0
+#endif
 
+#ifndef MEMC_WAYS
 #define MEMC_WAYS             16
 #define MEMC_SETS             256
+#endif
 
+#ifndef L1_IWAYS
 #define L1_IWAYS              4
 #define L1_ISETS              64
+#endif
 
+#ifndef L1_DWAYS
 #define L1_DWAYS              4
 #define L1_DSETS              64
+#endif
+
+#ifndef USE_BDV_ASYNC
+#define USE_BDV_ASYNC         0
+#endif
 
 #define DISK_IMAGE_NAME       "virt_hdd.dmg"
 
+#define DISK_THREADS          2
+#define DISK_CACHE            4096
+#define DISK_PREFETCH         16
+
+#define NIC_MODE              1              // NIC_MODE_SYNTHESIS
+#define NIC_GAP               12
+#define NIC_CLOCK_MHZ         1000
+#define NIC_PCAP_QUEUE        64
+#define NIC_TX_PCAP_NAME      "nic_tx"
+
+#define STATS_FILE_NAME       "cluster_stats.bin"
+
+#define NOC_FILE_NAME         "router_stats.bin"
+
+#define TRACE_FILE_NAME       "trace.bin"
+
+#define END_IDLE_MPKC         1
+
 #define ROM_SOFT_NAME         "/home/nicolas/almos/tsar/softs/tsar_boot/preloader.elf"
 
 #define NORTH                 0
@@ -236,7 +313,48 @@
 //     DEBUG Parameters default values
 ///////////////////////////////////////////////////////////////////////////////////////
 
+#ifndef MAX_FROZEN_CYCLES
 #define MAX_FROZEN_CYCLES     500000
+#endif
+
+///////////////////////////////////////////////////////////////////////////////////////
+//     Activity counters dump (binary format decoded by cluster_stats.py)
+// The file starts with one header, followed by one TsarLetiClusterStats record
+// per cluster for each sampling period (clusters in increasing (x,y) order).
+// The records are stored in a buffer of STATS_BUFFER_RECORDS entries, that is
+// written to disk when full, and on the same exit / signal paths as the
+// routers counters dump below.
+///////////////////////////////////////////////////////////////////////////////////////
+
+#define STATS_MAGIC           0x54534C54     // "TLST"
+#define STATS_VERSION         1
+#define STATS_BUFFER_RECORDS  8192
+
+///////////////////////////////////////////////////////////////////////////////////////
+//     Routers counters dump (binary format decoded by router_stats.py)
+// Same header as the activity counters dump, followed by one TsarLetiRouterStats
+// record per cluster for each sampling period. The records are stored in a
+// buffer of NOC_BUFFER_RECORDS entries, that is written to disk when full.
+// The buffer is also written on the exit() paths (frozen processor detection)
+// and on the abort / crash signals, so that the samples are not lost: the file
+// is written with write(2) on a file descriptor opened at startup, as only
+// async-signal-safe functions can be used in the signals handler.
+///////////////////////////////////////////////////////////////////////////////////////
+
+#define NOC_MAGIC             0x524E4C54     // "TLNR"
+#define NOC_BUFFER_RECORDS    8192
+
+struct stats_header_t
+{
+    uint32_t    magic;          // STATS_MAGIC
+    uint32_t    version;        // STATS_VERSION
+    uint32_t    x_size;         // X_SIZE
+    uint32_t    y_size;         // Y_SIZE (including the IO row)
+    uint32_t    nb_procs;       // NB_PROCS_MAX
+    uint32_t    period;         // sampling period (cycles)
+    uint32_t    record_size;    // sizeof(TsarLetiClusterStats)
+    uint32_t    nb_ios;         // NB_IO_CLUSTERS
+};
 
 ///////////////////////////////////////////////////////////////////////////////////////
 //     LOCAL TGTID & SRCID definition
@@ -260,6 +378,79 @@
 
 bool stop_called = false;
 
+// activity counters dump, routers counters dump and binary trace
+// (file scope, as they are flushed by dump_flush())
+int                                 stats_fd     = -1;
+size_t                              stats_count  = 0;    // records in stats_buffer
+soclib::caba::TsarLetiClusterStats* stats_buffer = NULL;
+int                                 noc_fd       = -1;
+size_t                              noc_count    = 0;    // records in noc_buffer
+soclib::caba::TsarLetiRouterStats*  noc_buffer   = NULL;
+soclib::caba::TraceWriter*          btrace       = NULL;
+
+///////////////////////////////////////////////////////////////////
+// This function writes <size> bytes to a file descriptor, and is
+// async-signal-safe (no stdio, no memory allocation).
+///////////////////////////////////////////////////////////////////
+void write_all( int fd, const void* buf, size_t size )
+{
+   const char* p = (const char*)buf;
+   while ( size )
+   {
+      ssize_t n = write( fd, p, size );
+      if ( (n < 0) and (errno == EINTR) ) continue;
+      if ( n <= 0 ) return;
+      p    += n;
+      size -= n;
+   }
+}
+
+///////////////////////////////////////////////////////////////////
+// These functions write the buffered records and close the dump
+// files. They are called at the end of the simulation, by exit()
+// (atexit), and by the abort / crash signals handler.
+///////////////////////////////////////////////////////////////////
+void stats_flush()
+{
+   if ( stats_fd < 0 ) return;
+   write_all( stats_fd, stats_buffer, stats_count * sizeof(soclib::caba::TsarLetiClusterStats) );
+   close( stats_fd );
+   stats_fd    = -1;
+   stats_count = 0;
+}
+
+void noc_flush()
+{
+   if ( noc_fd < 0 ) return;
+   write_all( noc_fd, noc_buffer, noc_count * sizeof(soclib::caba::TsarLetiRouterStats) );
+   close( noc_fd );
+   noc_fd    = -1;
+   noc_count = 0;
+}
+
+void dump_flush()
+{
+   stats_flush();
+   noc_flush();
+   if ( btrace ) btrace->close();
+}
+
+///////////////////////////////////////////////////////////////////
+// This function splits a comma separated list of per NIC channel
+// values (-NICPCAP / -NICRATE / -NICBURST arguments): the last
+// value of the list is used for the remaining channels.
+///////////////////////////////////////////////////////////////////
+void nic_channel_args( const char* arg, std::string values[NB_NIC_CHANNELS] )
+{
+   std::istringstream list( arg );
+   std::string        value;
+   for ( size_t i = 0 ; i < NB_NIC_CHANNELS ; i++ )
+   {
+      if ( std::getline( list, value, ',' ) ) values[i] = value;
+      else if ( i > 0 )                       values[i] = values[i - 1];
+   }
+}
+
 /////////////////////////////////
 int _main(int argc, char *argv[])
 {
@@ -277,7 +468,29 @@ int _main(int argc, char *argv[])
    size_t   trace_proc_id     = 0;                  // index of proc to be traced
    char     soft_name[256]    = ROM_SOFT_NAME;      // pathname for ROM binary code
    char     disk_name[256]    = DISK_IMAGE_NAME;    // pathname for DISK image
+   size_t   disk_threads      = DISK_THREADS;       // disk backend worker threads
+   size_t   disk_cache        = DISK_CACHE;         // disk backend cache (blocks)
+   size_t   disk_prefetch     = DISK_PREFETCH;      // disk backend read-ahead (blocks)
+   bool     disk_mmap         = false;              // disk image mapped in memory
+   uint32_t nic_mode          = NIC_MODE;           // NIC mode (FILE/SYNTHESIS/TAP)
+   uint32_t nic_gap           = NIC_GAP;            // NIC inter frame gap (cycles)
+   uint32_t nic_clock_mhz     = NIC_CLOCK_MHZ;      // simulated clock (pcap backends)
+   std::string nic_pcap[NB_NIC_CHANNELS];           // pcap RX files (per channel)
+   std::string nic_rate[NB_NIC_CHANNELS];           // pcap RX packets/s (per channel)
+   std::string nic_burst[NB_NIC_CHANNELS];          // pcap RX burst (per channel)
    uint32_t frozen_cycles     = MAX_FROZEN_CYCLES;  // for debug
+   bool     stats_ok          = false;              // activity counters dump
+   uint32_t stats_period      = 0;                  // activity counters period
+   uint32_t end_idle          = 0;                  // idle periods ending the workload
+   uint32_t end_mpkc          = END_IDLE_MPKC;      // idle period max L1 misses per kcycle
+   char     stats_name[256]   = STATS_FILE_NAME;    // pathname for counters dump
+   bool     noc_ok            = false;              // routers counters dump
+   uint32_t noc_period        = 0;                  // routers counters period
+   char     noc_name[256]     = NOC_FILE_NAME;      // pathname for routers dump
+   bool     btrace_ok         = false;              // binary trace activated
+   char     btrace_name[256]  = TRACE_FILE_NAME;    // pathname for binary trace
+   std::string btrace_spec;                         // binary trace filter
+   uint64_t btrace_last       = 0;                  // last traced cycle
    struct   timeval t1,t2;
    uint64_t ms1,ms2;
 
@@ -298,6 +511,46 @@ int _main(int argc, char *argv[])
          {
             strcpy(disk_name, argv[n + 1]);
          }
+         else if ((strcmp(argv[n],"-DISKTHREADS") == 0) && (n + 1 < argc))
+         {
+            disk_threads = (size_t) strtol(argv[n + 1], NULL, 0);
+         }
+         else if ((strcmp(argv[n],"-DISKCACHE") == 0) && (n + 1 < argc))
+         {
+            disk_cache = (size_t) strtol(argv[n + 1], NULL, 0);
+         }
+         else if ((strcmp(argv[n],"-DISKPREFETCH") == 0) && (n + 1 < argc))
+         {
+            disk_prefetch = (size_t) strtol(argv[n + 1], NULL, 0);
+         }
+         else if ((strcmp(argv[n],"-DISKMMAP") == 0) && (n + 1 < argc))
+         {
+            disk_mmap = (strtol(argv[n + 1], NULL, 0) != 0);
+         }
+         else if ((strcmp(argv[n],"-NICMODE") == 0) && (n + 1 < argc))
+         {
+            nic_mode = (uint32_t) strtol(argv[n + 1], NULL, 0);
+         }
+         else if ((strcmp(argv[n],"-NICGAP") == 0) && (n + 1 < argc))
+         {
+            nic_gap = (uint32_t) strtol(argv[n + 1], NULL, 0);
+         }
+         else if ((strcmp(argv[n],"-NICPCAP") == 0) && (n + 1 < argc))
+         {
+            nic_channel_args(argv[n + 1], nic_pcap);
+         }
+         else if ((strcmp(argv[n],"-NICRATE") == 0) && (n + 1 < argc))
+         {
+            nic_channel_args(argv[n + 1], nic_rate);
+         }
+         else if ((strcmp(argv[n],"-NICBURST") == 0) && (n + 1 < argc))
+         {
+            nic_channel_args(argv[n + 1], nic_burst);
+         }
+         else if ((strcmp(argv[n],"-NICFREQ") == 0) && (n + 1 < argc))
+         {
+            nic_clock_mhz = (uint32_t) strtol(argv[n + 1], NULL, 0);
+         }
          else if ((strcmp(argv[n],"-DEBUG") == 0) && (n + 1 < argc))
          {
             trace_ok = true;
@@ -334,6 +587,41 @@ int _main(int argc, char *argv[])
          {
             frozen_cycles = (uint32_t) strtol(argv[n + 1], NULL, 0);
          }
+         else if ((strcmp(argv[n], "-STATS") == 0) && (n + 1 < argc))
+         {
+            stats_period = (uint32_t) strtol(argv[n + 1], NULL, 0);
+            stats_ok     = (stats_period > 0);
+         }
+         else if ((strcmp(argv[n], "-STATSFILE") == 0) && (n + 1 < argc))
+         {
+            strcpy(stats_name, argv[n + 1]);
+         }
+         else if ((strcmp(argv[n], "-ENDIDLE") == 0) && (n + 1 < argc))
+         {
+            end_idle = (uint32_t) strtol(argv[n + 1], NULL, 0);
+         }
+         else if ((strcmp(argv[n], "-ENDMPKC") == 0) && (n + 1 < argc))
+         {
+            end_mpkc = (uint32_t) strtol(argv[n + 1], NULL, 0);
+         }
+         else if ((strcmp(argv[n], "-NOCSTATS") == 0) && (n + 1 < argc))
+         {
+            noc_period = (uint32_t) strtol(argv[n + 1], NULL, 0);
+            noc_ok     = (noc_period > 0);
+         }
+         else if ((strcmp(argv[n], "-NOCSTATSFILE") == 0) && (n + 1 < argc))
+         {
+            strcpy(noc_name, argv[n + 1]);
+         }
+         else if ((strcmp(argv[n], "-TRACE") == 0) && (n + 1 < argc))
+         {
+            btrace_ok = true;
+            strcpy(btrace_name, argv[n + 1]);
+         }
+         else if ((strcmp(argv[n], "-TRACEFILTER") == 0) && (n + 1 < argc))
+         {
+            btrace_spec = argv[n + 1];
+         }
          else
          {
             std::cout << "   Arguments are (key,value) couples." << std::endl;
@@ -345,6 +633,39 @@ int _main(int argc, char *argv[])
             std::cout << "     - FROZEN max_number_of_lines" << std::endl;
             std::cout << "     - MEMCID index_memc_to_be_traced" << std::endl;
             std::cout << "     - PROCID index_proc_to_be_traced" << std::endl;
+            std::cout << "     - STATS counters_sampling_period" << std::endl;
+            std::cout << "     - STATSFILE counters_dump_pathname" << std::endl;
+            std::cout << "     - ENDIDLE number_of_idle_sampling_periods (with STATS)" << std::endl;
+            std::cout << "     - ENDMPKC idle_max_l1_misses_per_kcycle" << std::endl;
+            std::cout << "     - NOCSTATS routers_sampling_period" << std::endl;
+            std::cout << "     - NOCSTATSFILE routers_dump_pathname" << std::endl;
+            std::cout << "     - TRACE binary_trace_pathname" << std::endl;
+            std::cout << "     - TRACEFILTER binary_trace_filter" << std::endl;
+            std::cout << "     - DISK disk_image_pathname" << std::endl;
+            std::cout << "     - DISKTHREADS disk_backend_threads (USE_BDV_ASYNC)" << std::endl;
+            std::cout << "     - DISKCACHE disk_backend_cache_blocks (USE_BDV_ASYNC)" << std::endl;
+            std::cout << "     - DISKPREFETCH disk_backend_prefetch_blocks (USE_BDV_ASYNC)" << std::endl;
+            std::cout << "     - DISKMMAP 0/1 (USE_BDV_ASYNC)" << std::endl;
+            std::cout << "     - NICMODE 0/1/2/3 (FILE/SYNTHESIS/TAP/PCAP)" << std::endl;
+            std::cout << "     - NICGAP nic_inter_frame_gap" << std::endl;
+            std::cout << "     - NICPCAP rx_pcap_pathname[,rx_pcap_pathname] (PCAP)" << std::endl;
+            std::cout << "     - NICRATE packets_per_second[,packets_per_second] (PCAP)" << std::endl;
+            std::cout << "     - NICBURST packets_per_burst[,packets_per_burst] (PCAP)" << std::endl;
+            std::cout << "     - NICFREQ simulated_clock_MHz (PCAP)" << std::endl;
+            std::cout << std::endl;
+            std::cout << "   When NB_IO_CLUSTERS > 1, each IO cluster k > 0 contains" << std::endl;
+            std::cout << "   one DISK, one NIC and one IOPIC. The DISK in IO cluster k" << std::endl;
+            std::cout << "   uses the <disk_image_pathname>.k file, that must exist." << std::endl;
+            std::cout << std::endl;
+            std::cout << "   With ENDIDLE n, the simulation stops when the L1 misses" << std::endl;
+            std::cout << "   of all processors stay below ENDMPKC per 1000 cycles during" << std::endl;
+            std::cout << "   n consecutive STATS periods, and the workload end cycle" << std::endl;
+            std::cout << "   (last active sampling cycle) is displayed." << std::endl;
+            std::cout << std::endl;
+            std::cout << "   With NICMODE 3, NIC channel i replays the i-th NICPCAP file," << std::endl;
+            std::cout << "   by bursts of NICBURST packets at NICRATE packets per simulated" << std::endl;
+            std::cout << "   second (0 : pcap timestamps), and the transmitted packets are" << std::endl;
+            std::cout << "   captured in " NIC_TX_PCAP_NAME "_<x>_<y>_<i>.pcap files." << std::endl;
             exit(0);
          }
       }
@@ -384,6 +705,12 @@ int _main(int argc, char *argv[])
     assert( (NB_NIC_CHANNELS <= 2) and
             "The NB_NIC_CHANNELS parameter cannot be larger than 2" );
 
+    assert( (nic_mode <= NIC_MODE_PCAP) and
+            "The NICMODE argument must be 0 (FILE), 1 (SYNTHESIS), 2 (TAP) or 3 (PCAP)" );
+
+    assert( (NB_IO_CLUSTERS >= 1) and (NB_IO_CLUSTERS <= XMAX) and
+            "The NB_IO_CLUSTERS parameter must be in [1,XMAX]" );
+
     assert( (vci_address_width == 40) and
             "VCI address width with the GIET must be 40 bits" );
 
@@ -397,18 +724,74 @@ int _main(int argc, char *argv[])
               << " - NB_PROCS_MAX     = " << NB_PROCS_MAX <<  std::endl
               << " - NB_TTY_CHANNELS  = " << NB_TTY_CHANNELS <<  std::endl
               << " - NB_NIC_CHANNELS  = " << NB_NIC_CHANNELS <<  std::endl
+              << " - NB_IO_CLUSTERS   = " << NB_IO_CLUSTERS <<  std::endl
               << " - NB_CMA_CHANNELS  = " << NB_CMA_CHANNELS <<  std::endl
               << " - MEMC_WAYS        = " << MEMC_WAYS << std::endl
               << " - MEMC_SETS        = " << MEMC_SETS << std::endl
+              << " - L1_IWAYS         = " << L1_IWAYS << std::endl
+              << " - L1_ISETS         = " << L1_ISETS << std::endl
+              << " - L1_DWAYS         = " << L1_DWAYS << std::endl
+              << " - L1_DSETS         = " << L1_DSETS << std::endl
               << " - RAM_LATENCY      = " << XRAM_LATENCY << std::endl
               << " - MAX_FROZEN       = " << frozen_cycles << std::endl
               << " - MAX_CYCLES       = " << ncycles << std::endl
               << " - RESET_ADDRESS    = " << RESET_ADDRESS << std::endl
               << " - SOFT_FILENAME    = " << soft_name << std::endl
               << " - DISK_IMAGENAME   = " << disk_name << std::endl
+              << " - USE_BDV_ASYNC    = " << USE_BDV_ASYNC << std::endl
+              << " - DISK_THREADS     = " << disk_threads << std::endl
+              << " - DISK_CACHE       = " << disk_cache << std::endl
+              << " - DISK_PREFETCH    = " << disk_prefetch << std::endl
+              << " - DISK_MMAP        = " << disk_mmap << std::endl
+              << " - NIC_MODE         = " << nic_mode << std::endl
+              << " - NIC_GAP          = " << nic_gap << std::endl
+              << " - NIC_CLOCK_MHZ    = " << nic_clock_mhz << std::endl
+              << " - NIC_PCAP         = " << nic_pcap[0] << std::endl
+              << " - NIC_RATE         = " << nic_rate[0] << std::endl
+              << " - NIC_BURST        = " << nic_burst[0] << std::endl
               << " - OPENMP THREADS   = " << threads << std::endl
               << " - DEBUG_PROCID     = " << trace_proc_id << std::endl
-              << " - DEBUG_MEMCID     = " << trace_memc_id << std::endl;
+              << " - DEBUG_MEMCID     = " << trace_memc_id << std::endl
+              << " - STATS_PERIOD     = " << stats_period << std::endl
+              << " - STATS_FILENAME   = " << stats_name << std::endl
+              << " - END_IDLE         = " << end_idle << std::endl
+              << " - END_MPKC         = " << end_mpkc << std::endl
+              << " - NOC_PERIOD       = " << noc_period << std::endl
+              << " - NOC_FILENAME     = " << noc_name << std::endl
+              << " - TRACE_FILENAME   = " << (btrace_ok ? btrace_name : "none") << std::endl
+              << " - TRACE_FILTER     = " << btrace_spec << std::endl;
+
+    if ( end_idle and not stats_ok )
+    {
+        std::cerr << "[ERROR] the ENDIDLE argument requires the STATS argument" << std::endl;
+        return EXIT_FAILURE;
+    }
+
+    if ( (nic_mode == NIC_MODE_PCAP) and nic_pcap[0].empty() )
+    {
+        std::cerr << "[ERROR] the NICMODE 3 (PCAP) requires the NICPCAP argument" << std::endl;
+        return EXIT_FAILURE;
+    }
+
+#if USE_PIC
+    // the secondary IO clusters use the <disk_name>.k disk images
+    for (size_t k = 1; k < NB_IO_CLUSTERS; k++)
+    {
+        std::ostringstream io_disk_name;
+        io_disk_name << disk_name << "." << k;
+        std::cout << " - DISK_IMAGENAME_" << k << " = " << io_disk_name.str() << std::endl;
+
+        FILE* io_disk = fopen( io_disk_name.str().c_str(), "rb" );
+        if ( io_disk == NULL )
+        {
+            std::cerr << "[ERROR] disk image " << io_disk_name.str()
+                      << " not found for the DISK of IO cluster " << k
+                      << " (NB_IO_CLUSTERS = " << NB_IO_CLUSTERS << ")" << std::endl;
+            return EXIT_FAILURE;
+        }
+        fclose( io_disk );
+    }
+#endif
 
     std::cout << std::endl;
 
@@ -483,7 +866,7 @@ int _main(int argc, char *argv[])
    maptabd.add(Segment("seg_ioc0", SEG_IOC_BASE, SEG_IOC_SIZE,
                IntTab(cluster(0,0),DISK_TGTID), false));
 
-   // segments for peripherals in cluster_io (XMAX-1,YMAX)
+   // segments for peripherals in main cluster_io (XMAX-1,YMAX)
    sc_uint<vci_address_width> offset;
    offset = ((sc_uint<vci_address_width>)cluster(XMAX-1,YMAX)) << 32;
 
@@ -493,20 +876,37 @@ int _main(int argc, char *argv[])
    maptabd.add(Segment("seg_fbuf", SEG_FBF_BASE + offset, SEG_FBF_SIZE,
                IntTab(cluster(XMAX-1, YMAX),FBUF_TGTID), false));
 
-   maptabd.add(Segment("seg_disk", SEG_IOC_BASE + offset, SEG_IOC_SIZE,
-               IntTab(cluster(XMAX-1, YMAX),DISK_TGTID), false));
-
-   maptabd.add(Segment("seg_mnic", SEG_NIC_BASE + offset, SEG_NIC_SIZE,
-               IntTab(cluster(XMAX-1, YMAX),MNIC_TGTID), false));
-
    maptabd.add(Segment("seg_cdma", SEG_CMA_BASE + offset, SEG_CMA_SIZE,
                IntTab(cluster(XMAX-1, YMAX),CDMA_TGTID), false));
 
-   maptabd.add(Segment("seg_iopi", SEG_PIC_BASE + offset, SEG_PIC_SIZE,
-               IntTab(cluster(XMAX-1, YMAX),IOPI_TGTID), false));
+   // segments for peripherals replicated in all cluster_io (IO_X(k),YMAX)
+   for (size_t k = 0; k < NB_IO_CLUSTERS; k++)
+   {
+      size_t cluster_io = cluster(IO_X(k), YMAX);
+      offset = ((sc_uint<vci_address_width>)cluster_io) << 32;
+
+      std::ostringstream    sdisk;
+      sdisk << "seg_disk_" << k;
+      maptabd.add(Segment(sdisk.str(), SEG_IOC_BASE + offset, SEG_IOC_SIZE,
+                  IntTab(cluster_io,DISK_TGTID), false));
+
+      std::ostringstream    smnic;
+      smnic << "seg_mnic_" << k;
+      maptabd.add(Segment(smnic.str(), SEG_NIC_BASE + offset, SEG_NIC_SIZE,
+                  IntTab(cluster_io,MNIC_TGTID), false));
+
+      std::ostringstream    siopi;
+      siopi << "seg_iopi_" << k;
+      maptabd.add(Segment(siopi.str(), SEG_PIC_BASE + offset, SEG_PIC_SIZE,
+                  IntTab(cluster_io,IOPI_TGTID), false));
+   }
 
    std::cout << maptabd << std::endl;
 
+   // binary trace filter (address ranges resolved against maptabd)
+   TraceFilter btrace_filter;
+   if ( btrace_ok and not btrace_filter.parse( btrace_spec, maptabd ) ) return EXIT_FAILURE;
+
     /////////////////////////////////////////////////
     // Ram network mapping table
     /////////////////////////////////////////////////
@@ -540,10 +940,10 @@ int _main(int argc, char *argv[])
     sc_clock                          signal_clk("clk");
     sc_signal<bool>                   signal_resetn("resetn");
 
-    // IRQs from external peripherals
-    sc_signal<bool>                   signal_irq_disk;
-    sc_signal<bool>                   signal_irq_mnic_rx[NB_NIC_CHANNELS];
-    sc_signal<bool>                   signal_irq_mnic_tx[NB_NIC_CHANNELS];
+    // IRQs from external peripherals (DISK & MNIC replicated in all IO clusters)
+    sc_signal<bool>                   signal_irq_disk[NB_IO_CLUSTERS];
+    sc_signal<bool>                   signal_irq_mnic_rx[NB_IO_CLUSTERS][NB_NIC_CHANNELS];
+    sc_signal<bool>                   signal_irq_mnic_tx[NB_IO_CLUSTERS][NB_NIC_CHANNELS];
     sc_signal<bool>                   signal_irq_mtty_rx[NB_TTY_CHANNELS];
     sc_signal<bool>                   signal_irq_mtty_tx[NB_TTY_CHANNELS];
     sc_signal<bool>                   signal_irq_cdma[NB_CMA_CHANNELS];
@@ -627,26 +1027,41 @@ int _main(int argc, char *argv[])
    DspinSignals<dspin_cmd_width>*** signal_dspin_bound_cla_out =
       alloc_elems<DspinSignals<dspin_cmd_width> >("signal_dspin_bound_cla_out", XMAX, YMAX, 4);
 
-   // VCI signals for iobus and peripherals
-   VciSignals<vci_param_int>    signal_vci_ini_disk("signal_vci_ini_disk");
-   VciSignals<vci_param_int>    signal_vci_ini_cdma("signal_vci_ini_cdma");
-   VciSignals<vci_param_int>    signal_vci_ini_iopi("signal_vci_ini_iopi");
-   VciSignals<vci_param_int>    signal_vci_ini_mnic("signal_vci_ini_mnic");
-
-   VciSignals<vci_param_int>*   signal_vci_ini_proc =
-       alloc_elems<VciSignals<vci_param_int> >("signal_vci_ini_proc", NB_PROCS_MAX );
-
-   VciSignals<vci_param_int>    signal_vci_tgt_memc("signal_vci_tgt_memc");
-   VciSignals<vci_param_int>    signal_vci_tgt_xicu("signal_vci_tgt_xicu");
-   VciSignals<vci_param_int>    signal_vci_tgt_disk("signal_vci_tgt_disk");
-   VciSignals<vci_param_int>    signal_vci_tgt_mtty("signal_vci_tgt_mtty");
-   VciSignals<vci_param_int>    signal_vci_tgt_fbuf("signal_vci_tgt_fbuf");
-   VciSignals<vci_param_int>    signal_vci_tgt_mnic("signal_vci_tgt_mnic");
-   VciSignals<vci_param_int>    signal_vci_tgt_cdma("signal_vci_tgt_cdma");
-   VciSignals<vci_param_int>    signal_vci_tgt_iopi("signal_vci_tgt_iopi");
-
-   VciSignals<vci_param_int>    signal_vci_cmd_to_noc("signal_vci_cmd_to_noc");
-   VciSignals<vci_param_int>    signal_vci_cmd_from_noc("signal_vci_cmd_from_noc");
+   // VCI signals for iobus and peripherals (one iobus per IO cluster)
+   // MTTY, FBUF and CDMA are only in the main IO cluster (k == 0)
+   VciSignals<vci_param_int>*   signal_vci_ini_disk =
+       alloc_elems<VciSignals<vci_param_int> >("signal_vci_ini_disk", NB_IO_CLUSTERS);
+   VciSignals<vci_param_int>*   signal_vci_ini_cdma =
+       alloc_elems<VciSignals<vci_param_int> >("signal_vci_ini_cdma", NB_IO_CLUSTERS);
+   VciSignals<vci_param_int>*   signal_vci_ini_iopi =
+       alloc_elems<VciSignals<vci_param_int> >("signal_vci_ini_iopi", NB_IO_CLUSTERS);
+   VciSignals<vci_param_int>*   signal_vci_ini_mnic =
+       alloc_elems<VciSignals<vci_param_int> >("signal_vci_ini_mnic", NB_IO_CLUSTERS);
+
+   VciSignals<vci_param_int>**  signal_vci_ini_proc =
+       alloc_elems<VciSignals<vci_param_int> >("signal_vci_ini_proc", NB_IO_CLUSTERS, NB_PROCS_MAX );
+
+   VciSignals<vci_param_int>*   signal_vci_tgt_memc =
+       alloc_elems<VciSignals<vci_param_int> >("signal_vci_tgt_memc", NB_IO_CLUSTERS);
+   VciSignals<vci_param_int>*   signal_vci_tgt_xicu =
+       alloc_elems<VciSignals<vci_param_int> >("signal_vci_tgt_xicu", NB_IO_CLUSTERS);
+   VciSignals<vci_param_int>*   signal_vci_tgt_disk =
+       alloc_elems<VciSignals<vci_param_int> >("signal_vci_tgt_disk", NB_IO_CLUSTERS);
+   VciSignals<vci_param_int>*   signal_vci_tgt_mtty =
+       alloc_elems<VciSignals<vci_param_int> >("signal_vci_tgt_mtty", NB_IO_CLUSTERS);
+   VciSignals<vci_param_int>*   signal_vci_tgt_fbuf =
+       alloc_elems<VciSignals<vci_param_int> >("signal_vci_tgt_fbuf", NB_IO_CLUSTERS);
+   VciSignals<vci_param_int>*   signal_vci_tgt_mnic =
+       alloc_elems<VciSignals<vci_param_int> >("signal_vci_tgt_mnic", NB_IO_CLUSTERS);
+   VciSignals<vci_param_int>*   signal_vci_tgt_cdma =
+       alloc_elems<VciSignals<vci_param_int> >("signal_vci_tgt_cdma", NB_IO_CLUSTERS);
+   VciSignals<vci_param_int>*   signal_vci_tgt_iopi =
+       alloc_elems<VciSignals<vci_param_int> >("signal_vci_tgt_iopi", NB_IO_CLUSTERS);
+
+   VciSignals<vci_param_int>*   signal_vci_cmd_to_noc =
+       alloc_elems<VciSignals<vci_param_int> >("signal_vci_cmd_to_noc", NB_IO_CLUSTERS);
+   VciSignals<vci_param_int>*   signal_vci_cmd_from_noc =
+       alloc_elems<VciSignals<vci_param_int> >("signal_vci_cmd_from_noc", NB_IO_CLUSTERS);
 
    ////////////////////////////
    //      Loader
@@ -732,7 +1147,9 @@ int _main(int argc, char *argv[])
                 trace_proc_ok,
                 trace_proc_id,
                 trace_memc_ok,
-                trace_memc_id
+                trace_memc_id,
+                stats_ok,
+                noc_ok
             );
 
 #if USE_OPENMP
@@ -754,76 +1171,196 @@ int _main(int argc, char *argv[])
     // 8 targets, in order to use the same SRCID and TGTID space
     // (same mapping table for the internal components,
     //  and for the external peripherals)
+    //
+    // The secondary IO clusters in cluster[IO_X(k)][Y_SIZE-1]
+    // have the same IO bus, but only contain NIC, PIC and IOC.
+    // The FBF, TTY and CMA ports are unused in these IO buses.
     //////////////////////////////////////////////////////////////////
 
-    std::cout << std::endl;
-    std::cout << " Building IO cluster (external peripherals)" << std::endl;
-    std::cout << std::endl;
+    VciLocalCrossbar<vci_param_int>*     iobus[NB_IO_CLUSTERS];
+    VciMasterNic<vci_param_int>*         mnic[NB_IO_CLUSTERS];
+    NicPcapRx*                           nic_rx[NB_IO_CLUSTERS][NB_NIC_CHANNELS] = {};
+    NicPcapTx*                           nic_tx[NB_IO_CLUSTERS][NB_NIC_CHANNELS] = {};
+    VciIopic<vci_param_int>*             iopic[NB_IO_CLUSTERS];
 
-    size_t cluster_io = cluster(XMAX-1, YMAX);
+#if ( USE_IOC_HBA )
+    VciMultiAhci<vci_param_int>*         disk[NB_IO_CLUSTERS];
+#elif ( USE_IOC_BDV and USE_BDV_ASYNC )
+    VciBlockDeviceAsync<vci_param_int>*  disk[NB_IO_CLUSTERS];
+#elif ( USE_IOC_BDV or USE_IOC_SDC )
+    VciBlockDeviceTsar<vci_param_int>*   disk[NB_IO_CLUSTERS];
+#endif
 
-    //////////// vci_local_crossbar
-    VciLocalCrossbar<vci_param_int>*
-    iobus = new VciLocalCrossbar<vci_param_int>(
-                "iobus",
-                maptabd,                      // mapping table
-                cluster_io,                   // cluster_xy
-                NB_PROCS_MAX + 4,             // number of local initiators
-                8,                            // number of local targets
-                DISK_TGTID );                 // default target index
+    VciDspinTargetWrapper<vci_param_int, dspin_cmd_width, dspin_rsp_width>*
+                                         wt_iobus[NB_IO_CLUSTERS];
+    VciDspinInitiatorWrapper<vci_param_int, dspin_cmd_width, dspin_rsp_width>*
+                                         wi_iobus[NB_IO_CLUSTERS];
 
-    //////////// vci_framebuffer
-    VciFrameBuffer<vci_param_int>*
-    fbuf = new VciFrameBuffer<vci_param_int>(
-                "fbuf",
-                IntTab(cluster_io, FBUF_TGTID),
-                maptabd,
-                FBUF_X_SIZE, FBUF_Y_SIZE );
+    for (size_t k = 0; k < NB_IO_CLUSTERS; k++)
+    {
+        std::cout << std::endl;
+        std::cout << " Building IO cluster " << k << " (external peripherals)" << std::endl;
+        std::cout << std::endl;
+
+        size_t cluster_io = cluster(IO_X(k), YMAX);
+
+        // disk image : <disk_name> for the main IO cluster / <disk_name>.k otherwise
+        std::ostringstream io_disk_name;
+        io_disk_name << disk_name;
+        if ( k > 0 ) io_disk_name << "." << k;
+
+        //////////// vci_local_crossbar
+        std::ostringstream s_iobus;
+        s_iobus << "iobus_" << k;
+        iobus[k] = new VciLocalCrossbar<vci_param_int>(
+                    s_iobus.str().c_str(),
+                    maptabd,                      // mapping table
+                    cluster_io,                   // cluster_xy
+                    NB_PROCS_MAX + 4,             // number of local initiators
+                    8,                            // number of local targets
+                    DISK_TGTID );                 // default target index
 
 #if ( USE_IOC_HBA )
 
-    ////////////  vci_multi_ahci
-    std::vector<std::string> filenames;
-    filenames.push_back(disk_name);           // one single disk
-    VciMultiAhci<vci_param_int>*  
-    disk = new VciMultiAhci<vci_param_int>( 
-                "disk",
-                maptabd,
-                IntTab(cluster_io, DISK_SRCID),
-                IntTab(cluster_io, DISK_TGTID),
-                filenames,
-                512,                          // block size
-                64,                           // burst size (bytes)
-                0 );                          // disk latency
+        ////////////  vci_multi_ahci
+        std::vector<std::string> filenames;
+        filenames.push_back(io_disk_name.str());  // one single disk
+        std::ostringstream s_disk;
+        s_disk << "disk_" << k;
+        disk[k] = new VciMultiAhci<vci_param_int>( 
+                    s_disk.str().c_str(),
+                    maptabd,
+                    IntTab(cluster_io, DISK_SRCID),
+                    IntTab(cluster_io, DISK_TGTID),
+                    filenames,
+                    512,                          // block size
+                    64,                           // burst size (bytes)
+                    0 );                          // disk latency
+
+#elif ( USE_IOC_BDV and USE_BDV_ASYNC )
+
+        ////////////  vci_block_device_async
+        std::ostringstream s_disk;
+        s_disk << "disk_" << k;
+
+        // the backup BDV of cluster[0][0] accesses the same disk image as
+        // disk_0 : disk_0 has no backend cache, to avoid stale blocks
+        size_t io_disk_threads = disk_threads;
+        if ( (k == 0) and (USE_IOC_RDK != 1) and (disk_threads != 0) )
+        {
+            std::cout << "[WARNING] the disk image " << io_disk_name.str()
+                      << " is shared with the backup BDV : synchronous accesses for "
+                      << s_disk.str() << std::endl;
+            io_disk_threads = 0;
+        }
+
+        disk[k] = new VciBlockDeviceAsync<vci_param_int>(
+                    s_disk.str().c_str(),
+                    maptabd,
+                    IntTab(cluster_io, DISK_SRCID),
+                    IntTab(cluster_io, DISK_TGTID),
+                    io_disk_name.str(),
+                    512,                          // block size
+                    64,                           // burst size (bytes)
+                    0,                            // disk latency
+                    io_disk_threads,              // backend worker threads
+                    disk_cache,                   // backend cache (blocks)
+                    disk_prefetch,                // backend read-ahead (blocks)
+                    disk_mmap );                  // disk image mapped in memory
 
 #elif ( USE_IOC_BDV or USE_IOC_SDC )
 
-    ////////////  vci_block_device
-    VciBlockDeviceTsar<vci_param_int>*
-    disk = new VciBlockDeviceTsar<vci_param_int>(
-                "disk",
-                maptabd,
-                IntTab(cluster_io, DISK_SRCID),
-                IntTab(cluster_io, DISK_TGTID),
-                disk_name,
-                512,                          // block size
-                64,                           // burst size (bytes)
-                0 );                          // disk latency
+        ////////////  vci_block_device
+        std::ostringstream s_disk;
+        s_disk << "disk_" << k;
+        disk[k] = new VciBlockDeviceTsar<vci_param_int>(
+                    s_disk.str().c_str(),
+                    maptabd,
+                    IntTab(cluster_io, DISK_SRCID),
+                    IntTab(cluster_io, DISK_TGTID),
+                    io_disk_name.str(),
+                    512,                          // block size
+                    64,                           // burst size (bytes)
+                    0 );                          // disk latency
 #endif
 
-    //////////// vci_multi_nic
-    VciMasterNic<vci_param_int>*  mnic;
-    mnic = new VciMasterNic<vci_param_int>( "mnic",
-                                            maptabd,
-                                            IntTab(cluster_io, MNIC_RX_SRCID), 
-                                            IntTab(cluster_io, MNIC_TX_SRCID), 
-                                            IntTab(cluster_io, MNIC_TGTID),
-                                            NB_NIC_CHANNELS,
-                                            64,               // burst length
-                                            0,       // default MAC address (LSB)
-                                            0,       // default MAC address (MSB)
-                                            1,                // NIC_MODE_SYNTHESIS
-                                            12);              // INTER_FRAME_GAP
+        //////////// vci_multi_nic
+        std::ostringstream s_mnic;
+        s_mnic << "mnic_" << k;
+
+        // pcap backends, attached to the NIC channels before building the NIC
+        // (named as the NIC IRQs in nic_bench.py : NIC_<x>_<y>_RX<i> / TX<i>)
+        for (size_t i = 0; (nic_mode == NIC_MODE_PCAP) and (i < NB_NIC_CHANNELS); i++)
+        {
+            std::ostringstream s_rx;
+            std::ostringstream s_tx;
+            std::ostringstream s_tx_file;
+            s_rx << "NIC_" << IO_X(k) << "_" << YMAX << "_RX" << i;
+            s_tx << "NIC_" << IO_X(k) << "_" << YMAX << "_TX" << i;
+            s_tx_file << NIC_TX_PCAP_NAME << "_" << IO_X(k) << "_" << YMAX << "_" << i << ".pcap";
+
+            nic_rx[k][i] = new NicPcapRx( s_rx.str(),
+                                          nic_pcap[i],
+                                          (uint64_t)nic_clock_mhz * 1000000,
+                                          (uint32_t)strtol(nic_rate[i].c_str(), NULL, 0),
+                                          (uint32_t)strtol(nic_burst[i].c_str(), NULL, 0),
+                                          nic_gap,
+                                          NIC_PCAP_QUEUE,
+                                          0 );                  // infinite replay
+            nic_tx[k][i] = new NicPcapTx( s_tx.str(),
+                                          s_tx_file.str(),
+                                          (uint64_t)nic_clock_mhz * 1000000 );
+
+            NicPcapRx::attach( s_mnic.str(), i, nic_rx[k][i] );
+            NicPcapTx::attach( s_mnic.str(), i, nic_tx[k][i] );
+        }
+
+        mnic[k] = new VciMasterNic<vci_param_int>( s_mnic.str().c_str(),
+                                                   maptabd,
+                                                   IntTab(cluster_io, MNIC_RX_SRCID), 
+                                                   IntTab(cluster_io, MNIC_TX_SRCID), 
+                                                   IntTab(cluster_io, MNIC_TGTID),
+                                                   NB_NIC_CHANNELS,
+                                                   64,               // burst length
+                                                   k,                // default MAC address (LSB)
+                                                   0,                // default MAC address (MSB)
+                                                   nic_mode,         // NIC_MODE
+                                                   nic_gap);         // INTER_FRAME_GAP
+
+        ///////////// vci_iopic
+        std::ostringstream s_iopic;
+        s_iopic << "iopic_" << k;
+        iopic[k] = new VciIopic<vci_param_int>(
+                    s_iopic.str().c_str(),
+                    maptabd,
+                    IntTab(cluster_io, IOPI_SRCID),
+                    IntTab(cluster_io, IOPI_TGTID),
+                    32 );
+
+        ////////////// vci_dspin wrappers
+        std::ostringstream s_wt_iobus;
+        s_wt_iobus << "wt_iobus_" << k;
+        wt_iobus[k] = new VciDspinTargetWrapper<vci_param_int, dspin_cmd_width, dspin_rsp_width>(
+                    s_wt_iobus.str().c_str(),
+                    vci_srcid_width );
+
+        std::ostringstream s_wi_iobus;
+        s_wi_iobus << "wi_iobus_" << k;
+        wi_iobus[k] = new VciDspinInitiatorWrapper<vci_param_int, dspin_cmd_width, dspin_rsp_width>(
+                    s_wi_iobus.str().c_str(),
+                    vci_srcid_width );
+    }
+
+    // main IO cluster only peripherals
+    size_t cluster_io = cluster(IO_X(0), YMAX);
+
+    //////////// vci_framebuffer
+    VciFrameBuffer<vci_param_int>*
+    fbuf = new VciFrameBuffer<vci_param_int>(
+                "fbuf",
+                IntTab(cluster_io, FBUF_TGTID),
+                maptabd,
+                FBUF_X_SIZE, FBUF_Y_SIZE );
 
     ///////////// vci_chbuf_dma
     VciChbufDma<vci_param_int>*
@@ -852,97 +1389,123 @@ int _main(int argc, char *argv[])
                 maptabd,
                 vect_names );
 
-    ///////////// vci_iopic
-    VciIopic<vci_param_int>*
-    iopic = new VciIopic<vci_param_int>(
-                "iopic",
-                maptabd,
-                IntTab(cluster_io, IOPI_SRCID),
-                IntTab(cluster_io, IOPI_TGTID),
-                32 );
-
-    ////////////// vci_dspin wrappers
-    VciDspinTargetWrapper<vci_param_int, dspin_cmd_width, dspin_rsp_width>*
-    wt_iobus = new VciDspinTargetWrapper<vci_param_int, dspin_cmd_width, dspin_rsp_width>(
-                "wt_iobus",
-                vci_srcid_width );
-
-    VciDspinInitiatorWrapper<vci_param_int, dspin_cmd_width, dspin_rsp_width>*
-    wi_iobus = new VciDspinInitiatorWrapper<vci_param_int, dspin_cmd_width, dspin_rsp_width>(
-                "wi_iobus",
-                vci_srcid_width );
-
     ///////////////////////////////////////////////////////////////
     //     IObus  Net-list
     ///////////////////////////////////////////////////////////////
 
-    // iobus
-    iobus->p_clk                       (signal_clk);
-    iobus->p_resetn                    (signal_resetn);
-
-    iobus->p_target_to_up              (signal_vci_cmd_from_noc);
-    iobus->p_initiator_to_up           (signal_vci_cmd_to_noc);
-
-    iobus->p_to_target[MEMC_TGTID]     (signal_vci_tgt_memc);
-    iobus->p_to_target[XICU_TGTID]     (signal_vci_tgt_xicu);
-    iobus->p_to_target[MTTY_TGTID]     (signal_vci_tgt_mtty);
-    iobus->p_to_target[FBUF_TGTID]     (signal_vci_tgt_fbuf);
-    iobus->p_to_target[MNIC_TGTID]     (signal_vci_tgt_mnic);
-    iobus->p_to_target[DISK_TGTID]     (signal_vci_tgt_disk);
-    iobus->p_to_target[CDMA_TGTID]     (signal_vci_tgt_cdma);
-    iobus->p_to_target[IOPI_TGTID]     (signal_vci_tgt_iopi);
-
-    for( size_t p=0 ; p<NB_PROCS_MAX ; p++ )
+    for (size_t k = 0; k < NB_IO_CLUSTERS; k++)
     {
-        iobus->p_to_initiator[p]       (signal_vci_ini_proc[p]);
-    }
-    iobus->p_to_initiator[DISK_SRCID]  (signal_vci_ini_disk);
-    iobus->p_to_initiator[CDMA_SRCID]  (signal_vci_ini_cdma);
-    iobus->p_to_initiator[IOPI_SRCID]  (signal_vci_ini_iopi);
-    iobus->p_to_initiator[MNIC_RX_SRCID]  (signal_vci_ini_mnic);
+        // iobus
+        iobus[k]->p_clk                       (signal_clk);
+        iobus[k]->p_resetn                    (signal_resetn);
+
+        iobus[k]->p_target_to_up              (signal_vci_cmd_from_noc[k]);
+        iobus[k]->p_initiator_to_up           (signal_vci_cmd_to_noc[k]);
+
+        iobus[k]->p_to_target[MEMC_TGTID]     (signal_vci_tgt_memc[k]);
+        iobus[k]->p_to_target[XICU_TGTID]     (signal_vci_tgt_xicu[k]);
+        iobus[k]->p_to_target[MTTY_TGTID]     (signal_vci_tgt_mtty[k]);
+        iobus[k]->p_to_target[FBUF_TGTID]     (signal_vci_tgt_fbuf[k]);
+        iobus[k]->p_to_target[MNIC_TGTID]     (signal_vci_tgt_mnic[k]);
+        iobus[k]->p_to_target[DISK_TGTID]     (signal_vci_tgt_disk[k]);
+        iobus[k]->p_to_target[CDMA_TGTID]     (signal_vci_tgt_cdma[k]);
+        iobus[k]->p_to_target[IOPI_TGTID]     (signal_vci_tgt_iopi[k]);
+
+        for( size_t p=0 ; p<NB_PROCS_MAX ; p++ )
+        {
+            iobus[k]->p_to_initiator[p]       (signal_vci_ini_proc[k][p]);
+        }
+        iobus[k]->p_to_initiator[DISK_SRCID]  (signal_vci_ini_disk[k]);
+        iobus[k]->p_to_initiator[CDMA_SRCID]  (signal_vci_ini_cdma[k]);
+        iobus[k]->p_to_initiator[IOPI_SRCID]  (signal_vci_ini_iopi[k]);
+        iobus[k]->p_to_initiator[MNIC_RX_SRCID]  (signal_vci_ini_mnic[k]);
 
-    std::cout << "  - IOBUS connected" << std::endl;
+        std::cout << "  - IOBUS_" << k << " connected" << std::endl;
 
-    // disk
+        // disk
 #if ( USE_IOC_HBA or USE_IOC_BDV or USE_IOC_SDC )
-    disk->p_clk                        (signal_clk);
-    disk->p_resetn                     (signal_resetn);
-    disk->p_vci_target                 (signal_vci_tgt_disk);
-    disk->p_vci_initiator              (signal_vci_ini_disk);
+        disk[k]->p_clk                        (signal_clk);
+        disk[k]->p_resetn                     (signal_resetn);
+        disk[k]->p_vci_target                 (signal_vci_tgt_disk[k]);
+        disk[k]->p_vci_initiator              (signal_vci_ini_disk[k]);
 #if USE_IOC_HBA
-    disk->p_channel_irq[0]             (signal_irq_disk);
+        disk[k]->p_channel_irq[0]             (signal_irq_disk[k]);
 #else
-    disk->p_irq                        (signal_irq_disk);
+        disk[k]->p_irq                        (signal_irq_disk[k]);
 #endif
 
-    std::cout << "  - DISK connected" << std::endl;
+        std::cout << "  - DISK_" << k << " connected" << std::endl;
 #endif
 
+        // multi_nic
+        mnic[k]->p_clk                        (signal_clk);
+        mnic[k]->p_resetn                     (signal_resetn);
+        mnic[k]->p_vci_tgt                    (signal_vci_tgt_mnic[k]);
+        mnic[k]->p_vci_ini                    (signal_vci_ini_mnic[k]);
+        for ( size_t i=0 ; i<NB_NIC_CHANNELS ; i++ )
+        {
+             mnic[k]->p_rx_irq[i]             (signal_irq_mnic_rx[k][i]);
+             mnic[k]->p_tx_irq[i]             (signal_irq_mnic_tx[k][i]);
+        }
+
+        std::cout << "  - MNIC_" << k << " connected" << std::endl;
+
+        // iopic
+        // NB_NIC_CHANNELS <= 2
+        // NB_CMA_CHANNELS <= 4 (main IO cluster only)
+        // NB_TTY_CHANNELS <= 16 (main IO cluster only)
+        size_t nb_cma = (k == 0) ? NB_CMA_CHANNELS : 0;
+        size_t nb_tty = (k == 0) ? NB_TTY_CHANNELS : 0;
+
+        iopic[k]->p_clk                       (signal_clk);
+        iopic[k]->p_resetn                    (signal_resetn);
+        iopic[k]->p_vci_target                (signal_vci_tgt_iopi[k]);
+        iopic[k]->p_vci_initiator             (signal_vci_ini_iopi[k]);
+        for ( size_t i=0 ; i<32 ; i++)
+        {
+           if     (i < NB_NIC_CHANNELS)    iopic[k]->p_hwi[i] (signal_irq_mnic_rx[k][i]);
+           else if(i < 2 )                 iopic[k]->p_hwi[i] (signal_irq_false);
+           else if(i < 2+NB_NIC_CHANNELS)  iopic[k]->p_hwi[i] (signal_irq_mnic_tx[k][i-2]);
+           else if(i < 4 )                 iopic[k]->p_hwi[i] (signal_irq_false);
+           else if(i < 4+nb_cma)           iopic[k]->p_hwi[i] (signal_irq_cdma[i-4]);
+           else if(i < 8)                  iopic[k]->p_hwi[i] (signal_irq_false);
+           else if(i == 8)                 iopic[k]->p_hwi[i] (signal_irq_disk[k]);
+           else if(i < 16)                 iopic[k]->p_hwi[i] (signal_irq_false);
+           else if(i < 16+nb_tty)          iopic[k]->p_hwi[i] (signal_irq_mtty_rx[i-16]);
+           else if(i < 24)                 iopic[k]->p_hwi[i] (signal_irq_false);
+           else if(i < 24+nb_tty)          iopic[k]->p_hwi[i] (signal_irq_mtty_tx[i-24]);
+           else                            iopic[k]->p_hwi[i] (signal_irq_false);
+        }
+
+        std::cout << "  - IOPIC_" << k << " connected" << std::endl;
+
+        // vci/dspin wrappers
+        wi_iobus[k]->p_clk                    (signal_clk);
+        wi_iobus[k]->p_resetn                 (signal_resetn);
+        wi_iobus[k]->p_vci                    (signal_vci_cmd_to_noc[k]);
+        wi_iobus[k]->p_dspin_cmd              (signal_dspin_bound_cmd_in[IO_X(k)][YMAX-1][NORTH]);
+        wi_iobus[k]->p_dspin_rsp              (signal_dspin_bound_rsp_out[IO_X(k)][YMAX-1][NORTH]);
+
+        // vci/dspin wrappers
+        wt_iobus[k]->p_clk                    (signal_clk);
+        wt_iobus[k]->p_resetn                 (signal_resetn);
+        wt_iobus[k]->p_vci                    (signal_vci_cmd_from_noc[k]);
+        wt_iobus[k]->p_dspin_cmd              (signal_dspin_bound_cmd_out[IO_X(k)][YMAX-1][NORTH]);
+        wt_iobus[k]->p_dspin_rsp              (signal_dspin_bound_rsp_in[IO_X(k)][YMAX-1][NORTH]);
+    }
+
     // frame_buffer
     fbuf->p_clk                        (signal_clk);
     fbuf->p_resetn                     (signal_resetn);
-    fbuf->p_vci                        (signal_vci_tgt_fbuf);
+    fbuf->p_vci                        (signal_vci_tgt_fbuf[0]);
 
     std::cout << "  - FBUF connected" << std::endl;
 
-    // multi_nic
-    mnic->p_clk                        (signal_clk);
-    mnic->p_resetn                     (signal_resetn);
-    mnic->p_vci_tgt                    (signal_vci_tgt_mnic);
-    mnic->p_vci_ini                    (signal_vci_ini_mnic);
-    for ( size_t i=0 ; i<NB_NIC_CHANNELS ; i++ )
-    {
-         mnic->p_rx_irq[i]             (signal_irq_mnic_rx[i]);
-         mnic->p_tx_irq[i]             (signal_irq_mnic_tx[i]);
-    }
-
-    std::cout << "  - MNIC connected" << std::endl;
-
     // chbuf_dma
     cdma->p_clk                        (signal_clk);
     cdma->p_resetn                     (signal_resetn);
-    cdma->p_vci_target                 (signal_vci_tgt_cdma);
-    cdma->p_vci_initiator              (signal_vci_ini_cdma);
+    cdma->p_vci_target                 (signal_vci_tgt_cdma[0]);
+    cdma->p_vci_initiator              (signal_vci_ini_cdma[0]);
     for ( size_t i=0 ; i<NB_CMA_CHANNELS ; i++)
     {
         cdma->p_irq[i]                 (signal_irq_cdma[i]);
@@ -953,7 +1516,7 @@ int _main(int argc, char *argv[])
     // multi_tty
     mtty->p_clk                        (signal_clk);
     mtty->p_resetn                     (signal_resetn);
-    mtty->p_vci                        (signal_vci_tgt_mtty);
+    mtty->p_vci                        (signal_vci_tgt_mtty[0]);
     for ( size_t i=0 ; i<NB_TTY_CHANNELS ; i++ )
     {
         mtty->p_irq_rx[i]              (signal_irq_mtty_rx[i]);
@@ -962,46 +1525,6 @@ int _main(int argc, char *argv[])
 
     std::cout << "  - MTTY connected" << std::endl;
 
-    // iopic
-    // NB_NIC_CHANNELS <= 2
-    // NB_CMA_CHANNELS <= 4
-    // NB_TTY_CHANNELS <= 16
-    iopic->p_clk                       (signal_clk);
-    iopic->p_resetn                    (signal_resetn);
-    iopic->p_vci_target                (signal_vci_tgt_iopi);
-    iopic->p_vci_initiator             (signal_vci_ini_iopi);
-    for ( size_t i=0 ; i<32 ; i++)
-    {
-       if     (i < NB_NIC_CHANNELS)    iopic->p_hwi[i] (signal_irq_mnic_rx[i]);
-       else if(i < 2 )                 iopic->p_hwi[i] (signal_irq_false);
-       else if(i < 2+NB_NIC_CHANNELS)  iopic->p_hwi[i] (signal_irq_mnic_tx[i-2]);
-       else if(i < 4 )                 iopic->p_hwi[i] (signal_irq_false);
-       else if(i < 4+NB_CMA_CHANNELS)  iopic->p_hwi[i] (signal_irq_cdma[i-4]);
-       else if(i < 8)                  iopic->p_hwi[i] (signal_irq_false);
-       else if(i == 8)                 iopic->p_hwi[i] (signal_irq_disk);
-       else if(i < 16)                 iopic->p_hwi[i] (signal_irq_false);
-       else if(i < 16+NB_TTY_CHANNELS) iopic->p_hwi[i] (signal_irq_mtty_rx[i-16]);
-       else if(i < 24)                 iopic->p_hwi[i] (signal_irq_false);
-       else if(i < 24+NB_TXT_CHANNELS) iopic->p_hwi[i] (signal_irq_mtty_tx[i-24]);
-       else                            iopic->p_hwi[i] (signal_irq_false);
-    }
-
-    std::cout << "  - IOPIC connected" << std::endl;
-
-    // vci/dspin wrappers
-    wi_iobus->p_clk                    (signal_clk);
-    wi_iobus->p_resetn                 (signal_resetn);
-    wi_iobus->p_vci                    (signal_vci_cmd_to_noc);
-    wi_iobus->p_dspin_cmd              (signal_dspin_bound_cmd_in[XMAX-1][YMAX-1][NORTH]);
-    wi_iobus->p_dspin_rsp              (signal_dspin_bound_rsp_out[XMAX-1][YMAX-1][NORTH]);
-
-    // vci/dspin wrappers
-    wt_iobus->p_clk                    (signal_clk);
-    wt_iobus->p_resetn                 (signal_resetn);
-    wt_iobus->p_vci                    (signal_vci_cmd_from_noc);
-    wt_iobus->p_dspin_cmd              (signal_dspin_bound_cmd_out[XMAX-1][YMAX-1][NORTH]);
-    wt_iobus->p_dspin_rsp              (signal_dspin_bound_rsp_in[XMAX-1][YMAX-1][NORTH]);
-
 #endif  // USE_PIC
 
     // Clock & RESET for clusters
@@ -1159,14 +1682,17 @@ int _main(int argc, char *argv[])
     signal_irq_false = false;
 
     // set network boundaries signals default values
-    // for all boundary clusters but the IO cluster
+    // for all boundary clusters but the IO clusters
     for (size_t x = 0; x < XMAX ; x++)
     {
+        bool io_gate = false;
+        for (size_t k = 0; k < NB_IO_CLUSTERS; k++) if ( x == IO_X(k) ) io_gate = true;
+
         for (size_t y = 0; y < YMAX ; y++)
         {
             for (size_t face = 0; face < 4; face++)
             {
-                if ( (x != XMAX-1) or (y != YMAX-1) or (face != NORTH) )
+                if ( (not io_gate) or (y != YMAX-1) or (face != NORTH) )
                 {
                     signal_dspin_bound_cmd_in [x][y][face].write = false;
                     signal_dspin_bound_cmd_in [x][y][face].read  = true;
@@ -1198,26 +1724,104 @@ int _main(int argc, char *argv[])
     }
 
 #if USE_PIC == 0
-    signal_dspin_bound_cmd_in[XMAX-1][YMAX-1][NORTH].write = false;
-    signal_dspin_bound_rsp_out[XMAX-1][YMAX-1][NORTH].read = true;
-    signal_dspin_bound_cmd_out[XMAX-1][YMAX-1][NORTH].read = true;
-    signal_dspin_bound_rsp_in[XMAX-1][YMAX-1][NORTH].write = false;
+    for (size_t k = 0; k < NB_IO_CLUSTERS; k++)
+    {
+        signal_dspin_bound_cmd_in[IO_X(k)][YMAX-1][NORTH].write = false;
+        signal_dspin_bound_rsp_out[IO_X(k)][YMAX-1][NORTH].read = true;
+        signal_dspin_bound_cmd_out[IO_X(k)][YMAX-1][NORTH].read = true;
+        signal_dspin_bound_rsp_in[IO_X(k)][YMAX-1][NORTH].write = false;
+    }
 #endif
 
     // set default values for VCI signals connected to unused ports on iobus
-    signal_vci_tgt_memc.rspval = false;
-    signal_vci_tgt_xicu.rspval = false;
-    for ( size_t p = 0 ; p < NB_PROCS_MAX ; p++ ) signal_vci_ini_proc[p].cmdval = false;
+    // (FBF, TTY and CMA ports are unused in the secondary IO clusters)
+    for (size_t k = 0; k < NB_IO_CLUSTERS; k++)
+    {
+        signal_vci_tgt_memc[k].rspval = false;
+        signal_vci_tgt_xicu[k].rspval = false;
+        for ( size_t p = 0 ; p < NB_PROCS_MAX ; p++ ) signal_vci_ini_proc[k][p].cmdval = false;
+
+        if ( k > 0 )
+        {
+            signal_vci_tgt_mtty[k].rspval = false;
+            signal_vci_tgt_fbuf[k].rspval = false;
+            signal_vci_tgt_cdma[k].rspval = false;
+            signal_vci_ini_cdma[k].cmdval = false;
+        }
+    }
 
     sc_start(sc_core::sc_time(1, SC_NS));
     signal_resetn = true;
 
+    // open the activity counters dump file
+    if ( stats_ok )
+    {
+        stats_fd = open( stats_name, O_WRONLY | O_CREAT | O_TRUNC, 0644 );
+        if ( stats_fd < 0 )
+        {
+            perror("open");
+            return EXIT_FAILURE;
+        }
+        stats_buffer = new TsarLetiClusterStats[STATS_BUFFER_RECORDS];
+
+        stats_header_t header;
+        header.magic       = STATS_MAGIC;
+        header.version     = STATS_VERSION;
+        header.x_size      = X_SIZE;
+        header.y_size      = Y_SIZE;
+        header.nb_procs    = NB_PROCS_MAX;
+        header.period      = stats_period;
+        header.record_size = sizeof(TsarLetiClusterStats);
+        header.nb_ios      = NB_IO_CLUSTERS;
+        write_all( stats_fd, &header, sizeof(stats_header_t) );
+    }
+
+    // open the routers counters dump file
+    if ( noc_ok )
+    {
+        noc_fd = open( noc_name, O_WRONLY | O_CREAT | O_TRUNC, 0644 );
+        if ( noc_fd < 0 )
+        {
+            perror("open");
+            return EXIT_FAILURE;
+        }
+        noc_buffer = new TsarLetiRouterStats[NOC_BUFFER_RECORDS];
+
+        stats_header_t header;
+        header.magic       = NOC_MAGIC;
+        header.version     = STATS_VERSION;
+        header.x_size      = X_SIZE;
+        header.y_size      = Y_SIZE;
+        header.nb_procs    = NB_PROCS_MAX;
+        header.period      = noc_period;
+        header.record_size = sizeof(TsarLetiRouterStats);
+        header.nb_ios      = NB_IO_CLUSTERS;
+        write_all( noc_fd, &header, sizeof(stats_header_t) );
+    }
+
+    // open the binary trace file
+    if ( btrace_ok )
+    {
+        btrace = new TraceWriter( btrace_filter );
+        if ( not btrace->open( btrace_name, maptabd, X_SIZE, Y_SIZE, NB_PROCS_MAX, Y_WIDTH ) )
+        {
+            perror("fopen");
+            return EXIT_FAILURE;
+        }
+        btrace_last = btrace_filter.last_cycle();
+    }
+
     if (gettimeofday(&t1, NULL) != 0)
     {
         perror("gettimeofday");
         return EXIT_FAILURE;
     }
 
+    // end of workload detection state
+    uint32_t end_misses = 0;     // L1 misses at the previous sampling cycle
+    uint32_t end_count  = 0;     // consecutive idle sampling periods
+    uint64_t end_cycle  = 0;     // last active sampling cycle
+
     // simulation loop
     for (uint64_t n = 1; n < ncycles && !stop_called; n++)
     {
@@ -1252,6 +1856,125 @@ int _main(int argc, char *argv[])
             }
         }
 
+        // activity counters dump
+        if ( stats_ok and ((n % stats_period) == 0) )
+        {
+            // flush the buffer when it cannot contain a full sample
+            if ( (stats_count + XMAX * YMAX) > STATS_BUFFER_RECORDS )
+            {
+                write_all( stats_fd, stats_buffer, stats_count * sizeof(TsarLetiClusterStats) );
+                stats_count = 0;
+            }
+
+            // L1 misses of all processors (modulo 2^32, as the counters)
+            uint32_t misses = 0;
+            for (size_t x = 0; x < XMAX; x++)
+            {
+                for (size_t y = 0; y < YMAX; y++)
+                {
+                    TsarLetiClusterStats* record = &stats_buffer[stats_count];
+                    clusters[x][y]->get_stats( record, n );
+                    for (size_t p = 0; p < record->nprocs; p++)
+                    {
+                        misses += record->l1_imiss[p] + record->l1_dmiss[p];
+                    }
+                    stats_count++;
+                }
+            }
+
+            // end of workload detection
+            if ( end_idle )
+            {
+                if ( (uint64_t)(misses - end_misses) * 1000 <= (uint64_t)end_mpkc * stats_period )
+                {
+                    end_count++;
+                }
+                else
+                {
+                    end_count = 0;
+                    end_cycle = n;
+                }
+                end_misses = misses;
+
+                if ( end_count == end_idle )
+                {
+                    std::cout << "[END] workload completed at cycle " << end_cycle
+                              << " (stopped at cycle " << n << ")" << std::endl;
+                    break;
+                }
+            }
+        }
+
+        // routers counters sampling
+        if ( noc_ok and ((n % noc_period) == 0) )
+        {
+            // flush the buffer when it cannot contain a full sample
+            if ( (noc_count + XMAX * YMAX) > NOC_BUFFER_RECORDS )
+            {
+                write_all( noc_fd, noc_buffer, noc_count * sizeof(TsarLetiRouterStats) );
+                noc_count = 0;
+            }
+
+            for (size_t x = 0; x < XMAX; x++)
+            {
+                for (size_t y = 0; y < YMAX; y++)
+                {
+                    clusters[x][y]->get_router_stats( &noc_buffer[noc_count], n );
+                    noc_count++;
+                }
+            }
+        }
+
+        // binary trace : the filtered events are recorded in the trace buffer
+        if ( btrace and (n <= btrace_last) and btrace->cycle(n) )
+        {
+            for (size_t x = 0; x < XMAX; x++)
+            {
+                for (size_t y = 0; y < YMAX; y++)
+                {
+                    size_t cxy = cluster(x,y);
+
+                    for (size_t p = 0; p < NB_PROCS_MAX; p++)
+                    {
+                        btrace->vci( TRACE_PROC, cxy, p, 0,
+                                     clusters[x][y]->signal_vci_ini_proc[p] );
+                    }
+                    btrace->vci( TRACE_XICU, cxy, 0, 0, clusters[x][y]->signal_vci_tgt_xicu );
+                    btrace->vci( TRACE_MEMC, cxy, 0, 0, clusters[x][y]->signal_vci_tgt_memc );
+                    btrace->vci( TRACE_XRAM, cxy, 0, 0, clusters[x][y]->signal_vci_xram );
+
+                    for (size_t i = 0; i < XCU_NB_OUT; i++)
+                    {
+                        btrace->irq( cxy, i, i / IRQ_PER_PROCESSOR,
+                                     clusters[x][y]->signal_proc_irq[i].read() );
+                    }
+                }
+            }
+
+#if USE_PIC
+            for (size_t k = 0; k < NB_IO_CLUSTERS; k++)
+            {
+                size_t cxy = cluster(IO_X(k), YMAX);
+
+#if ( USE_IOC_HBA or USE_IOC_BDV or USE_IOC_SDC )
+                btrace->vci( TRACE_DISK, cxy, k, 0, signal_vci_tgt_disk[k] );
+                btrace->vci( TRACE_DISK, cxy, k, TRACE_FLAG_INITIATOR, signal_vci_ini_disk[k] );
+#endif
+                btrace->vci( TRACE_IOPI, cxy, k, 0, signal_vci_tgt_iopi[k] );
+                btrace->vci( TRACE_IOPI, cxy, k, TRACE_FLAG_INITIATOR, signal_vci_ini_iopi[k] );
+                btrace->vci( TRACE_NIC,  cxy, k, 0, signal_vci_tgt_mnic[k] );
+                btrace->vci( TRACE_NIC,  cxy, k, TRACE_FLAG_INITIATOR, signal_vci_ini_mnic[k] );
+
+                // NIC IRQs : same line index as the IOPIC inputs
+                for (size_t i = 0; i < NB_NIC_CHANNELS; i++)
+                {
+                    btrace->irq( cxy, i, 0, signal_irq_mnic_rx[k][i].read(), TRACE_NIC );
+                    btrace->irq( cxy, 2 + i, 0, signal_irq_mnic_tx[k][i].read(), TRACE_NIC );
+                }
+            }
+#endif
+        }
+
         // trace display
         if ( trace_ok and (n > trace_from) )
         {
@@ -1328,18 +2051,24 @@ int _main(int argc, char *argv[])
 
 #if ( USE_IOC_HBA or USE_IOC_BDV or USE_IOC_SDC )
 #if USE_PIC
-            // trace external ioc
-            disk->print_trace();
-            signal_vci_tgt_disk.print_trace("[SIG]DISK_TGT");
-            signal_vci_ini_disk.print_trace("[SIG]DISK_INI");
-
-            // trace external iopic
-            iopic->print_trace();
-            signal_vci_tgt_iopi.print_trace("[SIG]IOPI_TGT");
-            signal_vci_ini_iopi.print_trace("[SIG]IOPI_INI");
-
-            // trace external interrupts
-            if (signal_irq_disk)   std::cout << "### IRQ_DISK" << std::endl;
+            for (size_t k = 0; k < NB_IO_CLUSTERS; k++)
+            {
+                std::ostringstream sk;
+                sk << "_" << k;
+
+                // trace external ioc
+                disk[k]->print_trace();
+                signal_vci_tgt_disk[k].print_trace("[SIG]DISK_TGT" + sk.str());
+                signal_vci_ini_disk[k].print_trace("[SIG]DISK_INI" + sk.str());
+
+                // trace external iopic
+                iopic[k]->print_trace();
+                signal_vci_tgt_iopi[k].print_trace("[SIG]IOPI_TGT" + sk.str());
+                signal_vci_ini_iopi[k].print_trace("[SIG]IOPI_INI" + sk.str());
+
+                // trace external interrupts
+                if (signal_irq_disk[k])   std::cout << "### IRQ_DISK" << sk.str() << std::endl;
+            }
 #else
             clusters[0][0]->disk->print_trace();
             clusters[0][0]->signal_vci_tgt_disk.print_trace("[SIG]DISK_0_0");
@@ -1351,6 +2080,47 @@ int _main(int argc, char *argv[])
 
         sc_start(sc_core::sc_time(1, SC_NS));
     }
+
+    if ( stats_buffer )
+    {
+        stats_flush();
+        delete [] stats_buffer;
+        stats_buffer = NULL;
+    }
+
+    if ( btrace )
+    {
+        std::cout << "[TRACE] " << btrace->events() << " events recorded in "
+                  << btrace_name << std::endl;
+        delete btrace;
+        btrace = NULL;
+    }
+
+#if ( USE_PIC and USE_IOC_BDV and USE_BDV_ASYNC )
+    for (size_t k = 0; k < NB_IO_CLUSTERS; k++) disk[k]->print_stats();
+#endif
+
+    if ( noc_buffer )
+    {
+        noc_flush();
+        delete [] noc_buffer;
+        noc_buffer = NULL;
+    }
+
+#if USE_PIC
+    // pcap NIC backends statistics (used by nic_bench.py)
+    for (size_t k = 0; k < NB_IO_CLUSTERS; k++)
+    {
+        for (size_t i = 0; i < NB_NIC_CHANNELS; i++)
+        {
+            if ( nic_rx[k][i] ) nic_rx[k][i]->print_stats();
+            if ( nic_tx[k][i] ) nic_tx[k][i]->print_stats();
+            delete nic_rx[k][i];
+            delete nic_tx[k][i];
+        }
+    }
+#endif
+
     // Free memory
     for (size_t i = 0 ; i  < (XMAX * YMAX) ; i++)
     {
@@ -1370,10 +2140,22 @@ void handler(int dummy = 0)
 
 void voidhandler(int dummy = 0) {}
 
+// only async-signal-safe functions are used : the default action is
+// restored first, and the signal is raised again to terminate the process
+void abort_handler(int sig)
+{
+   signal(sig, SIG_DFL);
+   dump_flush();
+   raise(sig);
+}
+
 int sc_main (int argc, char *argv[])
 {
    signal(SIGINT, handler);
    signal(SIGPIPE, voidhandler);
+   signal(SIGABRT, abort_handler);
+   signal(SIGSEGV, abort_handler);
+   atexit(dump_flush);
 
    try {
       return _main(argc, argv);
@@ -0,0 +1,229 @@
+#!/usr/bin/env python
+
+import sys
+import struct
+
+#######################################################################################
+#   file   : trace_decode.py
+#   date   : october 2026
+#
+#  This file decodes the binary trace generated by the simul.x simulator
+#  (-TRACE and -TRACEFILTER arguments of top.cpp), and displays one text line
+#  per recorded event.
+#######################################################################################
+#  The trace file contains one 32 bytes header (trace_header_t in tsar_leti_trace.h),
+#  followed by the mapping table segments (48 bytes trace_segment_t descriptors),
+#  and by one 32 bytes record (TsarLetiTraceRecord) per event.
+#  The command addresses are displayed with the segment name and offset.
+#
+#  Usage : python trace_decode.py [-from cycle] [-to cycle] [-type name]
+#                                 [-count] [trace_file]
+#  - the default trace_file is "trace.bin".
+#  - the -type option can be repeated (proc,xicu,memc,xram,disk,iopi,irq,nic).
+#  - with the -count option, only the number of events per component type
+#    and per event type is displayed.
+#######################################################################################
+
+TRACE_MAGIC    = 0x52544C54     # "TLTR"
+TRACE_VERSION  = 1
+
+HEADER_FORMAT  = '<8I'
+SEGMENT_FORMAT = '<QQ32s'
+RECORD_FORMAT  = '<QQQHBBBBBB'
+
+HEADER_SIZE    = struct.calcsize( HEADER_FORMAT )
+SEGMENT_SIZE   = struct.calcsize( SEGMENT_FORMAT )
+RECORD_SIZE    = struct.calcsize( RECORD_FORMAT )
+
+TYPE_NAMES     = [ 'proc', 'xicu', 'memc', 'xram', 'disk', 'iopi', 'irq', 'nic' ]
+EVENT_NAMES    = [ 'NOP', 'READ', 'WRITE', 'LL', 'RSP', 'IRQ_RISE', 'IRQ_FALL' ]
+
+FLAG_EOP       = 0x01
+FLAG_ERROR     = 0x02
+FLAG_INITIATOR = 0x04
+
+########################
+def read_trace( pathname ):
+    '''
+    Returns a (header, segments, data, offset) tuple, where segments is a list
+    of (base, size, name) tuples sorted by base address, and offset the position
+    of the first record in data.
+    '''
+
+    f    = open( pathname, 'rb' )
+    data = f.read()
+    f.close()
+
+    assert len( data ) >= HEADER_SIZE, 'truncated trace file'
+
+    ( magic, version, x_size, y_size, nb_procs,
+      y_width, record_size, nb_segments ) = struct.unpack_from( HEADER_FORMAT, data, 0 )
+
+    assert magic == TRACE_MAGIC, 'not a trace file : %s' % pathname
+    assert version == TRACE_VERSION, 'unsupported trace version %d' % version
+    assert record_size == RECORD_SIZE, 'illegal record size %d' % record_size
+
+    header = { 'x_size'   : x_size,
+               'y_size'   : y_size,
+               'nb_procs' : nb_procs,
+               'y_width'  : y_width }
+
+    segments = []
+    offset   = HEADER_SIZE
+    for n in range( nb_segments ):
+        ( base, size, name ) = struct.unpack_from( SEGMENT_FORMAT, data, offset )
+        name = name.split( b'\0' )[0].decode( 'ascii', 'replace' )
+        segments.append( (base, size, name) )
+        offset = offset + SEGMENT_SIZE
+
+    segments.sort()
+    return ( header, segments, data, offset )
+
+########################
+def records( data, offset ):
+    '''
+    Yields the records as dictionaries (an incomplete last record is discarded).
+    '''
+
+    while offset + RECORD_SIZE <= len( data ):
+        ( cycle, address, value, srcid, rtype, cxy,
+          index, event, flags, trdid ) = struct.unpack_from( RECORD_FORMAT, data, offset )
+        yield { 'cycle'   : cycle,
+                'address' : address,
+                'data'    : value,
+                'srcid'   : srcid,
+                'type'    : rtype,
+                'cxy'     : cxy,
+                'index'   : index,
+                'event'   : event,
+                'flags'   : flags & 0xF,
+                'pktid'   : flags >> 4,
+                'trdid'   : trdid }
+        offset = offset + RECORD_SIZE
+
+########################
+def segment( segments, address ):
+    '''
+    Returns the "name+offset" string for a physical address.
+    '''
+
+    for ( base, size, name ) in segments:
+        if base <= address < base + size:
+            return '%s+0x%x' % (name, address - base)
+    return '?'
+
+########################
+def is_irq( record ):
+    '''
+    Returns True for the IRQ_RISE / IRQ_FALL events.
+    '''
+
+    return EVENT_NAMES[record['event']] in [ 'IRQ_RISE', 'IRQ_FALL' ]
+
+########################
+def component( header, record ):
+    '''
+    Returns the component name of a record (same names as the -DEBUG trace).
+    '''
+
+    cxy  = record['cxy']
+    x    = cxy >> header['y_width']
+    y    = cxy & ((1 << header['y_width']) - 1)
+    name = TYPE_NAMES[record['type']].upper()
+
+    if   name == 'PROC': return 'PROC_%d_%d_%d' % (x, y, record['index'])
+    elif name == 'IRQ':  return 'IRQ_%d_%d[%d]' % (x, y, record['index'])
+    elif name == 'NIC' and is_irq( record ):
+        # NIC IRQ line : RX channels first, then TX channels
+        if record['index'] < 2: return 'NIC_%d_%d_RX%d' % (x, y, record['index'])
+        else:                   return 'NIC_%d_%d_TX%d' % (x, y, record['index'] - 2)
+    elif name in [ 'DISK', 'IOPI', 'NIC' ]:
+        if record['flags'] & FLAG_INITIATOR: return '%s_%d_INI' % (name, record['index'])
+        else:                                 return '%s_%d_TGT' % (name, record['index'])
+    else: return '%s_%d_%d' % (name, x, y)
+
+########################
+def decode( header, segments, record ):
+    '''
+    Returns the text line for one record.
+    '''
+
+    event = EVENT_NAMES[record['event']]
+    line  = '%12d  %-14s %-8s' % (record['cycle'], component( header, record ), event)
+
+    if is_irq( record ): return line
+
+    if record['event'] != EVENT_NAMES.index( 'RSP' ):
+        line = line + ' @0x%010x %-28s' % (record['address'],
+                                            segment( segments, record['address'] ))
+    line = line + ' data=0x%08x srcid=0x%04x trdid=%d pktid=%d' % (record['data'], record['srcid'],
+                                                                    record['trdid'], record['pktid'])
+    if record['flags'] & FLAG_EOP:   line = line + ' eop'
+    if record['flags'] & FLAG_ERROR: line = line + ' ERROR'
+    return line
+
+########################
+def main( argv ):
+
+    pathname = 'trace.bin'
+    first    = 0
+    last     = None
+    types    = []
+    count    = False
+
+    n = 1
+    while n < len( argv ):
+        if argv[n] == '-from' and (n + 1) < len( argv ):
+            first = int( argv[n + 1], 0 )
+            n = n + 2
+        elif argv[n] == '-to' and (n + 1) < len( argv ):
+            last = int( argv[n + 1], 0 )
+            n = n + 2
+        elif argv[n] == '-type' and (n + 1) < len( argv ):
+            for name in argv[n + 1].split( ',' ):
+                assert name in TYPE_NAMES, 'illegal component type : %s' % name
+                types.append( TYPE_NAMES.index( name ) )
+            n = n + 2
+        elif argv[n] == '-count':
+            count = True
+            n = n + 1
+        else:
+            pathname = argv[n]
+            n = n + 1
+
+    ( header, segments, data, offset ) = read_trace( pathname )
+
+    counters = {}
+    for record in records( data, offset ):
+        if record['cycle'] < first: continue
+        if last != None and record['cycle'] > last: break
+        if types and record['type'] not in types: continue
+
+        if count:
+            key = ( record['type'], record['event'] )
+            counters[key] = counters.get( key, 0 ) + 1
+        else:
+            print( decode( header, segments, record ) )
+
+    if count:
+        print( '%-8s %-10s %12s' % ('type', 'event', 'count') )
+        for key in sorted( counters ):
+            print( '%-8s %-10s %12d' % (TYPE_NAMES[key[0]], EVENT_NAMES[key[1]], counters[key]) )
+
+    return 0
+
+########################## trace decoding ############################################
+
+if __name__ == '__main__':
+
+    sys.exit( main( sys.argv ) )
+
+
+# Local Variables:
+# tab-width: 4;
+# c-basic-offset: 4;
+# c-file-offsets:((innamespace . 0)(inline-open . 0));
+# indent-tabs-mode: nil;
+# End:
+#
+# vim: filetype=python:expandtab:shiftwidth=4:tabstop=4:softtabstop=4
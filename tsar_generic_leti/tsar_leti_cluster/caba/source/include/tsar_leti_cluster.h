@@ -15,6 +15,8 @@
 #include <sstream>
 #include <cstdlib>
 #include <cstdarg>
+#include <cstring>
+#include <stdint.h>
 
 #include "gdbserver.h"
 #include "mapping_table.h"
@@ -34,6 +36,53 @@
 
 namespace soclib { namespace caba {
 
+///////////////////////////////////////////////////////////////////////////
+// Activity counters of one cluster, as dumped in the binary stats file
+// (see the -STATS option in top.cpp, and the cluster_stats.py decoder).
+// All counters are cumulative since reset, and are computed by observing
+// the VCI and DSPIN signals, so they do not depend on component internals.
+// The record size is 144 bytes, without padding.
+///////////////////////////////////////////////////////////////////////////
+struct TsarLetiClusterStats
+{
+    uint64_t    cycle;              // sampling cycle
+    uint32_t    cxy;                // cluster identifier
+    uint32_t    nprocs;             // number of valid entries in per-proc arrays
+    uint32_t    l1_imiss[4];        // L1 instruction miss transactions
+    uint32_t    l1_dmiss[4];        // L1 data miss transactions
+    uint32_t    l1_unc[4];          // L1 uncached read transactions
+    uint32_t    l1_write[4];        // L1 write transactions (write-through)
+    uint32_t    l1_m2p[4];          // coherence requests received (UPDT/INVAL/BC)
+    uint32_t    l1_p2m[4];          // coherence packets sent (CLEANUP/MULTI_ACK)
+    uint32_t    memc_read;          // read transactions received by MEMC
+    uint32_t    memc_write;         // write transactions received by MEMC
+    uint32_t    memc_xram_read;     // L2 miss : line read from XRAM
+    uint32_t    memc_xram_write;    // L2 eviction : line written to XRAM
+    uint32_t    memc_m2p;           // coherence requests sent by MEMC
+    uint32_t    memc_p2m;           // coherence packets received by MEMC
+    uint32_t    memc_clack;         // cleanup acknowledges sent by MEMC
+    uint32_t    xicu_irq;           // processors IRQ activations (rising edges)
+};
+
+///////////////////////////////////////////////////////////////////////////
+// Links activity counters of the five DSPIN routers of one cluster, as
+// dumped in the binary NoC stats file (see the -NOCSTATS option in top.cpp,
+// and the router_stats.py report). For each router output port, a flit is
+// counted when it is accepted (write & read), and a stall is counted when
+// it is blocked by the downstream component (write & not read).
+// Networks are indexed as CMD/RSP/M2P/P2M/CLA, and output ports as
+// NORTH/SOUTH/EAST/WEST/LOCAL (same index as the router ports).
+// All counters are cumulative since reset. The record size is 216 bytes.
+///////////////////////////////////////////////////////////////////////////
+struct TsarLetiRouterStats
+{
+    uint64_t    cycle;              // sampling cycle
+    uint32_t    cxy;                // cluster identifier
+    uint32_t    reserved;
+    uint32_t    flits[5][5];        // [network][port] accepted flits
+    uint32_t    stalls[5][5];       // [network][port] blocked cycles
+};
+
 ///////////////////////////////////////////////////////////////////////////
 template<size_t dspin_cmd_width,
          size_t dspin_rsp_width,
@@ -47,6 +96,15 @@ template<size_t dspin_cmd_width,
     // Used in destructor
     size_t m_nprocs;
 
+    // Activity counters (only updated when stats_ok is set)
+    bool                    m_stats_ok;
+    TsarLetiClusterStats    m_stats;
+    bool                    m_irq_prev[16];
+
+    // Routers links counters (only updated when router_stats_ok is set)
+    bool                    m_router_stats_ok;
+    TsarLetiRouterStats     m_router_stats;
+
     // Ports
     sc_in<bool>                                     p_clk;
     sc_in<bool>                                     p_resetn;
@@ -187,10 +245,24 @@ template<size_t dspin_cmd_width,
                      bool                               trace_proc_ok,
                      uint32_t                           trace_proc_id,
                      bool                               trace_memc_ok,
-                     uint32_t                           trace_memc_id );
+                     uint32_t                           trace_memc_id,
+                     bool                               stats_ok,
+                     bool                               router_stats_ok );
 
     ~TsarLetiCluster();
 
+    // copy the activity counters in the record pointed by <stats>
+    void get_stats( TsarLetiClusterStats* stats, uint64_t cycle );
+
+    // copy the routers links counters in the record pointed by <stats>
+    void get_router_stats( TsarLetiRouterStats* stats, uint64_t cycle );
+
+    protected:
+
+    SC_HAS_PROCESS(TsarLetiCluster);
+
+    void stats_transition();
+
 };
 }}
 
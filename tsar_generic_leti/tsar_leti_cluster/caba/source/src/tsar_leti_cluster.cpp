@@ -11,6 +11,16 @@
 namespace soclib {
 namespace caba  {
 
+// update the flits / stalls counters of one DSPIN link
+static inline void count_link( bool write, bool read, uint32_t &flits, uint32_t &stalls )
+{
+    if ( write )
+    {
+        if ( read ) flits++;
+        else        stalls++;
+    }
+}
+
 ////////////////////////////////////////////////////////////////////////////////////
 template<size_t dspin_cmd_width,
          size_t dspin_rsp_width,
@@ -51,9 +61,13 @@ template<size_t dspin_cmd_width,
          bool                               trace_proc_ok,
          uint32_t                           trace_proc_id,
          bool                               trace_memc_ok,
-         uint32_t                           trace_memc_id )
+         uint32_t                           trace_memc_id,
+         bool                               stats_ok,
+         bool                               router_stats_ok )
             : soclib::caba::BaseModule(insname),
             m_nprocs(nb_procs),
+            m_stats_ok(stats_ok),
+            m_router_stats_ok(router_stats_ok),
             p_clk("clk"),
             p_resetn("resetn")
 
@@ -540,8 +554,175 @@ template<size_t dspin_cmd_width,
 
         std::cout << "  - MTTY connected" << std::endl;
     }
+
+    /////////////////////////////// Activity counters
+
+    memset( &m_stats, 0, sizeof(TsarLetiClusterStats) );
+    m_stats.cxy    = cluster_xy;
+    m_stats.nprocs = nb_procs;
+    for (size_t i = 0; i < 16; i++) m_irq_prev[i] = false;
+
+    memset( &m_router_stats, 0, sizeof(TsarLetiRouterStats) );
+    m_router_stats.cxy = cluster_xy;
+
+    if ( stats_ok or router_stats_ok )
+    {
+        SC_METHOD(stats_transition);
+        dont_initialize();
+        sensitive << p_clk.pos();
+
+        if ( stats_ok )        std::cout << "  - Activity counters enabled" << std::endl;
+        if ( router_stats_ok ) std::cout << "  - Routers counters enabled" << std::endl;
+    }
 } // end constructor
 
+////////////////////////////////////////////////////////////////////////////////////
+// This method is executed at each cycle when the activity counters or the
+// routers counters are enabled.
+// A transaction is counted on the last flit of the VCI command, a DSPIN packet
+// is counted on its last flit (eop), and an IRQ on a rising edge.
+// For the routers, each output port is observed at each cycle.
+////////////////////////////////////////////////////////////////////////////////////
+template<size_t dspin_cmd_width,
+         size_t dspin_rsp_width,
+         typename vci_param_int,
+         typename vci_param_ext> void TsarLetiCluster<dspin_cmd_width,
+                                                      dspin_rsp_width,
+                                                      vci_param_int,
+                                                      vci_param_ext>::stats_transition()
+{
+    if ( not p_resetn.read() ) return;
+
+    if ( m_router_stats_ok )
+    {
+        uint32_t (&flits)[5][5]  = m_router_stats.flits;
+        uint32_t (&stalls)[5][5] = m_router_stats.stalls;
+
+        // N/S/E/W output ports
+        for (size_t i = 0; i < 4; i++)
+        {
+            count_link( p_cmd_out[i].write.read(), p_cmd_out[i].read.read(),
+                        flits[0][i], stalls[0][i] );
+            count_link( p_rsp_out[i].write.read(), p_rsp_out[i].read.read(),
+                        flits[1][i], stalls[1][i] );
+            count_link( p_m2p_out[i].write.read(), p_m2p_out[i].read.read(),
+                        flits[2][i], stalls[2][i] );
+            count_link( p_p2m_out[i].write.read(), p_p2m_out[i].read.read(),
+                        flits[3][i], stalls[3][i] );
+            count_link( p_cla_out[i].write.read(), p_cla_out[i].read.read(),
+                        flits[4][i], stalls[4][i] );
+        }
+
+        // LOCAL output ports
+        count_link( signal_dspin_cmd_g2l_d.write.read(), signal_dspin_cmd_g2l_d.read.read(),
+                    flits[0][4], stalls[0][4] );
+        count_link( signal_dspin_rsp_g2l_d.write.read(), signal_dspin_rsp_g2l_d.read.read(),
+                    flits[1][4], stalls[1][4] );
+        count_link( signal_dspin_m2p_g2l_c.write.read(), signal_dspin_m2p_g2l_c.read.read(),
+                    flits[2][4], stalls[2][4] );
+        count_link( signal_dspin_p2m_g2l_c.write.read(), signal_dspin_p2m_g2l_c.read.read(),
+                    flits[3][4], stalls[3][4] );
+        count_link( signal_dspin_clack_g2l_c.write.read(), signal_dspin_clack_g2l_c.read.read(),
+                    flits[4][4], stalls[4][4] );
+    }
+
+    if ( not m_stats_ok ) return;
+
+    for (size_t p = 0; p < m_nprocs; p++)
+    {
+        VciSignals<vci_param_int> &vci = signal_vci_ini_proc[p];
+
+        if ( vci.cmdval.read() and vci.cmdack.read() and vci.eop.read() )
+        {
+            // TRDID[1:0] encodes the read type : DATA_UNC / DATA_MISS / INS_UNC / INS_MISS
+            if ( vci.cmd.read() == vci_param_int::CMD_WRITE )
+            {
+                m_stats.l1_write[p]++;
+            }
+            else if ( vci.cmd.read() == vci_param_int::CMD_READ )
+            {
+                size_t type = vci.trdid.read() & 0x3;
+                if      ( type == 0x3 ) m_stats.l1_imiss[p]++;
+                else if ( type == 0x1 ) m_stats.l1_dmiss[p]++;
+                else                    m_stats.l1_unc[p]++;
+            }
+        }
+
+        if ( signal_dspin_m2p_proc[p].write.read() and
+             signal_dspin_m2p_proc[p].read.read() and
+             signal_dspin_m2p_proc[p].eop.read() )   m_stats.l1_m2p[p]++;
+
+        if ( signal_dspin_p2m_proc[p].write.read() and
+             signal_dspin_p2m_proc[p].read.read() and
+             signal_dspin_p2m_proc[p].eop.read() )   m_stats.l1_p2m[p]++;
+    }
+
+    if ( signal_vci_tgt_memc.cmdval.read() and
+         signal_vci_tgt_memc.cmdack.read() and
+         signal_vci_tgt_memc.eop.read() )
+    {
+        if ( signal_vci_tgt_memc.cmd.read() == vci_param_int::CMD_WRITE ) m_stats.memc_write++;
+        else                                                               m_stats.memc_read++;
+    }
+
+    if ( signal_vci_xram.cmdval.read() and
+         signal_vci_xram.cmdack.read() and
+         signal_vci_xram.eop.read() )
+    {
+        if ( signal_vci_xram.cmd.read() == vci_param_ext::CMD_WRITE ) m_stats.memc_xram_write++;
+        else                                                           m_stats.memc_xram_read++;
+    }
+
+    if ( signal_dspin_m2p_memc.write.read() and
+         signal_dspin_m2p_memc.read.read() and
+         signal_dspin_m2p_memc.eop.read() )          m_stats.memc_m2p++;
+
+    if ( signal_dspin_p2m_memc.write.read() and
+         signal_dspin_p2m_memc.read.read() and
+         signal_dspin_p2m_memc.eop.read() )          m_stats.memc_p2m++;
+
+    if ( signal_dspin_clack_memc.write.read() and
+         signal_dspin_clack_memc.read.read() and
+         signal_dspin_clack_memc.eop.read() )        m_stats.memc_clack++;
+
+    for (size_t i = 0; i < 16; i++)
+    {
+        bool irq = signal_proc_irq[i].read();
+        if ( irq and not m_irq_prev[i] ) m_stats.xicu_irq++;
+        m_irq_prev[i] = irq;
+    }
+} // end stats_transition()
+
+////////////////////////////////////////////////////////////////////////////////////
+template<size_t dspin_cmd_width,
+         size_t dspin_rsp_width,
+         typename vci_param_int,
+         typename vci_param_ext> void TsarLetiCluster<dspin_cmd_width,
+                                                      dspin_rsp_width,
+                                                      vci_param_int,
+                                                      vci_param_ext>::get_stats(
+                                                      TsarLetiClusterStats* stats,
+                                                      uint64_t              cycle )
+{
+    *stats       = m_stats;
+    stats->cycle = cycle;
+}
+
+////////////////////////////////////////////////////////////////////////////////////
+template<size_t dspin_cmd_width,
+         size_t dspin_rsp_width,
+         typename vci_param_int,
+         typename vci_param_ext> void TsarLetiCluster<dspin_cmd_width,
+                                                      dspin_rsp_width,
+                                                      vci_param_int,
+                                                      vci_param_ext>::get_router_stats(
+                                                      TsarLetiRouterStats*  stats,
+                                                      uint64_t              cycle )
+{
+    *stats       = m_router_stats;
+    stats->cycle = cycle;
+}
+
 
 
 template<size_t dspin_cmd_width,
@@ -0,0 +1,572 @@
+//////////////////////////////////////////////////////////////////////////////
+// File: tsar_leti_trace.h
+// Copyright: UPMC/LIP6
+// Date : october 2026
+// This program is released under the GNU public license
+//////////////////////////////////////////////////////////////////////////////
+// This file defines the binary trace used by the top.cpp file (-TRACE and
+// -TRACEFILTER arguments), as a compact alternative to the -DEBUG text trace.
+// The trace is built by observing the VCI signals and the IRQ signals, and
+// the events are filtered before being recorded:
+//
+// - The TraceFilter object is built from a filter specification string,
+//   containing ';' separated clauses, and ',' separated values:
+//     cycles=1000-2000,50000-    cycle windows (first-last, or first-)
+//     clusters=0x00,0x01         cluster identifiers (cxy)
+//     procs=0,2                  processors local indexes (PROC and IRQ)
+//     types=proc,memc,xram       component types
+//                                (proc,xicu,memc,xram,disk,iopi,irq,nic)
+//     addr=seg_memc_0_0,0xF0000000-0xF1000000,seg_xicu_*
+//                                physical address ranges (base-end, with
+//                                end excluded) or segment names of the
+//                                mapping table ('*' suffix for a prefix)
+//   A missing clause does not filter. The address ranges only apply to
+//   the commands, and a response is kept when the command was kept.
+//   The IRQ lines are only observed in the cycle windows: the first event
+//   of a window reports the IRQ changes since the previous window.
+//
+// - The TraceWriter object writes the events in a binary file: one header,
+//   the mapping table segments, and one 32 bytes record per event.
+//   The records are stored in a buffer, written to the file when full.
+//   The file is written with write(2), and flush() / close() are
+//   async-signal-safe: they can be called from a crash signal handler.
+//   This file is decoded by the trace_decode.py script.
+//////////////////////////////////////////////////////////////////////////////
+
+#ifndef TSAR_LETI_TRACE_H
+#define TSAR_LETI_TRACE_H
+
+#include <cstdio>
+#include <cstdlib>
+#include <cstring>
+#include <cerrno>
+#include <stdint.h>
+#include <fcntl.h>
+#include <unistd.h>
+#include <string>
+#include <vector>
+#include <list>
+#include <set>
+#include <map>
+#include <sstream>
+#include <iostream>
+
+#include "mapping_table.h"
+#include "vci_signals.h"
+
+#define TRACE_MAGIC           0x52544C54     // "TLTR"
+#define TRACE_VERSION         1
+#define TRACE_BUFFER_RECORDS  65536
+#define TRACE_NAME_SIZE       32             // segment name size in the file
+
+namespace soclib { namespace caba {
+
+// component types
+enum trace_type_e
+{
+    TRACE_PROC,             // L1 cache VCI initiator port
+    TRACE_XICU,             // XICU VCI target port
+    TRACE_MEMC,             // MEMC VCI target port
+    TRACE_XRAM,             // MEMC to XRAM VCI port
+    TRACE_DISK,             // external disk controller VCI ports
+    TRACE_IOPI,             // external IOPIC VCI ports
+    TRACE_IRQ,              // processors IRQs
+    TRACE_NIC,              // external NIC VCI ports and IRQs
+    TRACE_NB_TYPES,
+};
+
+// events (the commands are identified by the VCI cmd field)
+enum trace_event_e
+{
+    TRACE_CMD_NOP,          // VCI CMD_NOP (SC / CAS)
+    TRACE_CMD_READ,         // VCI CMD_READ
+    TRACE_CMD_WRITE,        // VCI CMD_WRITE
+    TRACE_CMD_LL,           // VCI CMD_LOCKED_READ
+    TRACE_RSP,              // VCI response flit
+    TRACE_IRQ_RISE,         // IRQ activation
+    TRACE_IRQ_FALL,         // IRQ deactivation
+};
+
+// flags
+#define TRACE_FLAG_EOP        0x01
+#define TRACE_FLAG_ERROR      0x02
+#define TRACE_FLAG_INITIATOR  0x04           // initiator port of DISK / IOPI / NIC
+
+///////////////////////////////////////////////////////////////////////////
+// One trace event, 32 bytes without padding.
+///////////////////////////////////////////////////////////////////////////
+struct TsarLetiTraceRecord
+{
+    uint64_t    cycle;
+    uint64_t    address;            // command address (0 for responses / IRQs)
+    uint64_t    data;               // wdata / rdata
+    uint16_t    srcid;              // srcid / rsrcid
+    uint8_t     type;               // trace_type_e
+    uint8_t     cxy;                // cluster identifier
+    uint8_t     index;              // proc local index / IRQ line / IO cluster
+    uint8_t     event;              // trace_event_e
+    uint8_t     flags;              // TRACE_FLAG_* | (pktid << 4)
+    uint8_t     trdid;
+};
+
+struct trace_header_t
+{
+    uint32_t    magic;              // TRACE_MAGIC
+    uint32_t    version;            // TRACE_VERSION
+    uint32_t    x_size;             // X_SIZE
+    uint32_t    y_size;             // Y_SIZE (including the IO row)
+    uint32_t    nb_procs;           // NB_PROCS_MAX
+    uint32_t    y_width;            // Y_WIDTH
+    uint32_t    record_size;        // sizeof(TsarLetiTraceRecord)
+    uint32_t    nb_segments;        // number of segment descriptors
+};
+
+struct trace_segment_t
+{
+    uint64_t    base;
+    uint64_t    size;
+    char        name[TRACE_NAME_SIZE];
+};
+
+///////////////////////////////////////////////////////////////////////////
+class TraceFilter
+///////////////////////////////////////////////////////////////////////////
+{
+    std::vector<std::pair<uint64_t, uint64_t> >  m_windows;   // [first, last]
+    std::vector<std::pair<uint64_t, uint64_t> >  m_ranges;    // [base, end[
+    std::set<uint32_t>                           m_clusters;
+    uint32_t                                     m_procs;     // bit vector
+    uint32_t                                     m_types;     // bit vector
+
+    static const char* type_name( size_t type )
+    {
+        static const char* names[] = { "proc", "xicu", "memc", "xram",
+                                       "disk", "iopi", "irq", "nic" };
+        return names[type];
+    }
+
+    static std::vector<std::string> split( const std::string &s, char sep )
+    {
+        std::vector<std::string> result;
+        std::istringstream       stream( s );
+        std::string              item;
+        while ( std::getline( stream, item, sep ) )
+        {
+            if ( item.size() ) result.push_back( item );
+        }
+        return result;
+    }
+
+    static bool number( const std::string &s, uint64_t &value )
+    {
+        char* end;
+        value = strtoull( s.c_str(), &end, 0 );
+        return ( s.size() > 0 ) and ( *end == 0 );
+    }
+
+    // "first-last" or "first-" (no upper bound) or "value"
+    static bool range( const std::string &s, uint64_t &first, uint64_t &last )
+    {
+        size_t dash = s.find( '-' );
+        if ( dash == std::string::npos )
+        {
+            if ( not number( s, first ) ) return false;
+            last = first;
+            return true;
+        }
+        if ( not number( s.substr( 0, dash ), first ) ) return false;
+        if ( dash == s.size() - 1 )
+        {
+            last = ~0ULL;
+            return true;
+        }
+        return number( s.substr( dash + 1 ), last );
+    }
+
+public:
+
+    TraceFilter()
+        : m_procs( ~0U ),
+          m_types( ~0U )
+    {}
+
+    // returns false (and displays the error) for an illegal specification
+    bool parse( const std::string                   &spec,
+                const soclib::common::MappingTable  &mt )
+    {
+        std::vector<std::string> clauses = split( spec, ';' );
+
+        for ( size_t c = 0 ; c < clauses.size() ; c++ )
+        {
+            size_t equal = clauses[c].find( '=' );
+            if ( equal == std::string::npos )
+            {
+                std::cout << "[TRACE] illegal filter clause : " << clauses[c] << std::endl;
+                return false;
+            }
+
+            std::string              key    = clauses[c].substr( 0, equal );
+            std::vector<std::string> values = split( clauses[c].substr( equal + 1 ), ',' );
+
+            if ( key == "procs" ) m_procs = 0;
+            if ( key == "types" ) m_types = 0;
+
+            for ( size_t v = 0 ; v < values.size() ; v++ )
+            {
+                const std::string &value = values[v];
+                uint64_t first, last;
+                bool     ok = true;
+
+                if ( key == "cycles" )
+                {
+                    ok = range( value, first, last );
+                    if ( ok ) m_windows.push_back( std::make_pair( first, last ) );
+                }
+                else if ( key == "clusters" )
+                {
+                    ok = number( value, first );
+                    if ( ok ) m_clusters.insert( (uint32_t)first );
+                }
+                else if ( key == "procs" )
+                {
+                    ok = number( value, first ) and ( first < 32 );
+                    if ( ok ) m_procs |= (1 << first);
+                }
+                else if ( key == "types" )
+                {
+                    ok = false;
+                    for ( size_t t = 0 ; t < TRACE_NB_TYPES ; t++ )
+                    {
+                        if ( value == type_name( t ) )
+                        {
+                            m_types |= (1 << t);
+                            ok = true;
+                        }
+                    }
+                }
+                else if ( key == "addr" )
+                {
+                    if ( (value[0] >= '0') and (value[0] <= '9') )
+                    {
+                        ok = range( value, first, last );
+                        if ( ok ) m_ranges.push_back( std::make_pair( first, last ) );
+                    }
+                    else
+                    {
+                        // segment name, or segment name prefix
+                        bool        prefix = ( value[value.size() - 1] == '*' );
+                        std::string name   = prefix ? value.substr( 0, value.size() - 1 ) : value;
+
+                        ok = false;
+                        std::list<soclib::common::Segment> segs = mt.getAllSegmentList();
+                        std::list<soclib::common::Segment>::iterator seg;
+                        for ( seg = segs.begin() ; seg != segs.end() ; seg++ )
+                        {
+                            if ( ( prefix and (seg->name().compare( 0, name.size(), name ) == 0) ) or
+                                 ( not prefix and (seg->name() == name) ) )
+                            {
+                                m_ranges.push_back( std::make_pair( (uint64_t)seg->baseAddress(),
+                                                                    (uint64_t)seg->baseAddress()
+                                                                    + seg->size() ) );
+                                ok = true;
+                            }
+                        }
+                    }
+                }
+                else
+                {
+                    std::cout << "[TRACE] unknown filter key : " << key << std::endl;
+                    return false;
+                }
+
+                if ( not ok )
+                {
+                    std::cout << "[TRACE] illegal filter value : " << key
+                              << "=" << value << std::endl;
+                    return false;
+                }
+            }
+        }
+        return true;
+    }
+
+    // the cycle windows are checked once per cycle
+    bool cycle( uint64_t cycle ) const
+    {
+        if ( m_windows.empty() ) return true;
+        for ( size_t i = 0 ; i < m_windows.size() ; i++ )
+        {
+            if ( (cycle >= m_windows[i].first) and (cycle <= m_windows[i].second) ) return true;
+        }
+        return false;
+    }
+
+    // the component filters are checked once per observed port / IRQ line
+    bool component( size_t type, uint32_t cxy, uint32_t proc ) const
+    {
+        if ( not (m_types & (1 << type)) ) return false;
+        if ( not m_clusters.empty() and not m_clusters.count( cxy ) ) return false;
+        if ( ((type == TRACE_PROC) or (type == TRACE_IRQ)) and
+             not (m_procs & (1 << proc)) ) return false;
+        return true;
+    }
+
+    bool has_ranges() const { return not m_ranges.empty(); }
+
+    bool address( uint64_t address ) const
+    {
+        if ( m_ranges.empty() ) return true;
+        for ( size_t i = 0 ; i < m_ranges.size() ; i++ )
+        {
+            if ( (address >= m_ranges[i].first) and (address < m_ranges[i].second) ) return true;
+        }
+        return false;
+    }
+
+    // last cycle of the last window (to stop the trace early)
+    uint64_t last_cycle() const
+    {
+        if ( m_windows.empty() ) return ~0ULL;
+        uint64_t last = 0;
+        for ( size_t i = 0 ; i < m_windows.size() ; i++ )
+        {
+            if ( m_windows[i].second > last ) last = m_windows[i].second;
+        }
+        return last;
+    }
+};
+
+///////////////////////////////////////////////////////////////////////////
+class TraceWriter
+///////////////////////////////////////////////////////////////////////////
+{
+    const TraceFilter                   &m_filter;
+    int                                 m_fd;
+    TsarLetiTraceRecord*                m_buffer;
+    size_t                              m_count;
+    uint64_t                            m_cycle;
+    uint64_t                            m_events;
+
+    // kept transactions (srcid/trdid/pktid), per observed port,
+    // only used when the filter contains address ranges
+    std::map<uint32_t, std::set<uint64_t> >  m_pending;
+
+    // transaction key, with non overlapping srcid / trdid / pktid fields
+    static uint64_t key( uint32_t srcid, uint32_t trdid, uint32_t pktid )
+    {
+        return ((uint64_t)srcid << 40) | ((uint64_t)trdid << 20) | (uint64_t)pktid;
+    }
+
+    // previous IRQ values, indexed by (cxy * 32 + line) and type
+    std::vector<bool>                   m_irq;
+
+    // async-signal-safe write of <size> bytes
+    void write_all( const void* buf, size_t size )
+    {
+        const char* p = (const char*)buf;
+        while ( size )
+        {
+            ssize_t n = ::write( m_fd, p, size );
+            if ( (n < 0) and (errno == EINTR) ) continue;
+            if ( n <= 0 ) return;
+            p    += n;
+            size -= n;
+        }
+    }
+
+    void push( const TsarLetiTraceRecord &record )
+    {
+        if ( m_count == TRACE_BUFFER_RECORDS ) flush();
+        m_buffer[m_count] = record;
+        m_count++;
+        m_events++;
+    }
+
+public:
+
+    TraceWriter( const TraceFilter &filter )
+        : m_filter( filter ),
+          m_fd( -1 ),
+          m_buffer( new TsarLetiTraceRecord[TRACE_BUFFER_RECORDS] ),
+          m_count( 0 ),
+          m_cycle( 0 ),
+          m_events( 0 ),
+          m_irq( 256 * 32 * 2, false )
+    {}
+
+    ~TraceWriter()
+    {
+        close();
+        delete [] m_buffer;
+    }
+
+    // creates the file, and writes the header and the segments table
+    bool open( const char*                          pathname,
+               const soclib::common::MappingTable   &mt,
+               size_t                               x_size,
+               size_t                               y_size,
+               size_t                               nb_procs,
+               size_t                               y_width )
+    {
+        m_fd = ::open( pathname, O_WRONLY | O_CREAT | O_TRUNC, 0644 );
+        if ( m_fd < 0 ) return false;
+
+        std::list<soclib::common::Segment> segs = mt.getAllSegmentList();
+
+        trace_header_t header;
+        header.magic       = TRACE_MAGIC;
+        header.version     = TRACE_VERSION;
+        header.x_size      = x_size;
+        header.y_size      = y_size;
+        header.nb_procs    = nb_procs;
+        header.y_width     = y_width;
+        header.record_size = sizeof(TsarLetiTraceRecord);
+        header.nb_segments = segs.size();
+        write_all( &header, sizeof(trace_header_t) );
+
+        std::list<soclib::common::Segment>::iterator seg;
+        for ( seg = segs.begin() ; seg != segs.end() ; seg++ )
+        {
+            trace_segment_t desc;
+            memset( &desc, 0, sizeof(trace_segment_t) );
+            desc.base = seg->baseAddress();
+            desc.size = seg->size();
+            strncpy( desc.name, seg->name().c_str(), TRACE_NAME_SIZE - 1 );
+            write_all( &desc, sizeof(trace_segment_t) );
+        }
+        return true;
+    }
+
+    void flush()
+    {
+        if ( (m_fd >= 0) and m_count ) write_all( m_buffer, m_count * sizeof(TsarLetiTraceRecord) );
+        m_count = 0;
+    }
+
+    void close()
+    {
+        flush();
+        if ( m_fd >= 0 ) ::close( m_fd );
+        m_fd = -1;
+    }
+
+    uint64_t events() const { return m_events; }
+
+    // must be called once per cycle : returns false when the cycle is filtered
+    bool cycle( uint64_t cycle )
+    {
+        m_cycle = cycle;
+        return m_filter.cycle( cycle );
+    }
+
+    // observes one VCI port : command and response flits
+    template<typename vci_param>
+    void vci( size_t                      type,
+              uint32_t                    cxy,
+              uint32_t                    index,
+              uint8_t                     flags,
+              const VciSignals<vci_param> &sig )
+    {
+        bool cmd = sig.cmdval.read() and sig.cmdack.read();
+        bool rsp = sig.rspval.read() and sig.rspack.read();
+
+        if ( not cmd and not rsp ) return;
+        if ( not m_filter.component( type, cxy, index ) ) return;
+
+        uint32_t port = (type << 24) | (cxy << 16) | (index << 8) | flags;
+
+        TsarLetiTraceRecord record;
+        memset( &record, 0, sizeof(TsarLetiTraceRecord) );
+        record.cycle = m_cycle;
+        record.type  = type;
+        record.cxy   = cxy;
+        record.index = index;
+
+        if ( cmd )
+        {
+            uint64_t address = (uint64_t)sig.address.read();
+            uint32_t pktid   = (uint32_t)sig.pktid.read();
+            uint32_t trdid   = (uint32_t)sig.trdid.read();
+            uint32_t srcid   = (uint32_t)sig.srcid.read();
+            bool     kept    = m_filter.address( address );
+
+            if ( m_filter.has_ranges() and sig.eop.read() )
+            {
+                if ( kept ) m_pending[port].insert( key( srcid, trdid, pktid ) );
+            }
+
+            if ( kept )
+            {
+                record.address = address;
+                record.data    = (uint64_t)sig.wdata.read();
+                record.srcid   = srcid;
+                record.event   = (uint8_t)sig.cmd.read();
+                record.flags   = flags | (sig.eop.read() ? TRACE_FLAG_EOP : 0) | ((pktid & 0xF) << 4);
+                record.trdid   = trdid;
+                push( record );
+            }
+        }
+
+        if ( rsp )
+        {
+            uint32_t pktid = (uint32_t)sig.rpktid.read();
+            uint32_t trdid = (uint32_t)sig.rtrdid.read();
+            uint32_t srcid = (uint32_t)sig.rsrcid.read();
+            bool     kept  = true;
+
+            if ( m_filter.has_ranges() )
+            {
+                std::set<uint64_t> &pending = m_pending[port];
+                kept = pending.count( key( srcid, trdid, pktid ) );
+                if ( kept and sig.reop.read() ) pending.erase( key( srcid, trdid, pktid ) );
+            }
+
+            if ( kept )
+            {
+                record.address = 0;
+                record.data    = (uint64_t)sig.rdata.read();
+                record.srcid   = srcid;
+                record.event   = TRACE_RSP;
+                record.flags   = flags | (sig.reop.read() ? TRACE_FLAG_EOP : 0)
+                                       | ((sig.rerror.read() & 0x1) ? TRACE_FLAG_ERROR : 0)
+                                       | ((pktid & 0xF) << 4);
+                record.trdid   = trdid;
+                push( record );
+            }
+        }
+    }
+
+    // observes one IRQ line (proc is the destination processor local index).
+    // For the NIC IRQs (type TRACE_NIC), the line is the IOPIC input index.
+    void irq( uint32_t cxy, uint32_t line, uint32_t proc, bool value,
+              size_t type = TRACE_IRQ )
+    {
+        size_t id = ((cxy * 32 + line) * 2 + (type == TRACE_NIC)) % m_irq.size();
+        if ( m_irq[id] == value ) return;
+        m_irq[id] = value;
+
+        if ( not m_filter.component( type, cxy, proc ) ) return;
+
+        TsarLetiTraceRecord record;
+        memset( &record, 0, sizeof(TsarLetiTraceRecord) );
+        record.cycle = m_cycle;
+        record.type  = type;
+        record.cxy   = cxy;
+        record.index = line;
+        record.event = value ? TRACE_IRQ_RISE : TRACE_IRQ_FALL;
+        push( record );
+    }
+};
+
+}}
+
+#endif
+
+// Local Variables:
+// tab-width: 4
+// c-basic-offset: 4
+// c-file-offsets:((innamespace . 0)(inline-open . 0))
+// indent-tabs-mode: nil
+// End:
+
+// vim: filetype=cpp:expandtab:shiftwidth=4:tabstop=4:softtabstop=4
@@ -0,0 +1,211 @@
+//////////////////////////////////////////////////////////////////////////////
+// File: vci_block_device_async.h
+// Copyright: UPMC/LIP6
+// Date : october 2026
+// This program is released under the GNU public license
+//////////////////////////////////////////////////////////////////////////////
+// This component is a simple block device controller with a DMA capability,
+// with the same addressable registers and the same behaviour as the
+// VciBlockDeviceTsar component, and can be used with the same software
+// driver (USE_IOC_BDV). The only difference is the host side access to the
+// disk image, that is delegated to a DiskImageBackend object:
+// - the blocks are read and written by a pool of worker threads,
+// - a LRU cache and a sequential read-ahead are used for the read accesses,
+// - the disk image can optionally be mapped in the host memory (mmap).
+//
+// The simulated timing is deterministic, and does not depend on the backend
+// configuration: the read request is posted to the backend when the command
+// is received, and each block is consumed in the same cycle as with a
+// synchronous file access. The simulation thread only waits when a block
+// is not yet available, or at the end of a write command.
+//
+// The addressable registers are :
+// - BUFFER      (RW) : memory buffer address (32 LSB bits)
+// - LBA         (RW) : first block index on the disk
+// - COUNT       (RW) : number of blocks to transfer
+// - OP          (W)  : NOOP / READ / WRITE (starts the transfer)
+// - STATUS      (R)  : IDLE / BUSY / SUCCESS / ERROR
+//                      (reading a final status acknowledges the IRQ)
+// - IRQ_ENABLE  (RW) : IRQ enable
+// - SIZE        (R)  : number of blocks on the disk
+// - BLOCK_SIZE  (R)  : block size (bytes)
+// - BUFFER_EXT  (RW) : memory buffer address (32 MSB bits)
+//
+// The block size and the burst size must be powers of 2, the burst size
+// must be a multiple of 4 bytes, and the block size a multiple of the
+// burst size. The memory buffer must be aligned on a burst boundary.
+//////////////////////////////////////////////////////////////////////////////
+
+#ifndef SOCLIB_VCI_BLOCK_DEVICE_ASYNC_H
+#define SOCLIB_VCI_BLOCK_DEVICE_ASYNC_H
+
+#include <stdint.h>
+#include <list>
+#include <systemc>
+#include "caba_base_module.h"
+#include "mapping_table.h"
+#include "vci_initiator.h"
+#include "vci_target.h"
+#include "disk_image_backend.h"
+
+namespace soclib {
+namespace caba {
+
+using namespace sc_core;
+
+template<typename vci_param>
+class VciBlockDeviceAsync
+    : public caba::BaseModule
+{
+private:
+
+    // Registers
+    sc_signal<int>                     r_target_fsm;       // target FSM state
+    sc_signal<typename vci_param::srcid_t>  r_srcid;       // save srcid
+    sc_signal<typename vci_param::trdid_t>  r_trdid;       // save trdid
+    sc_signal<typename vci_param::pktid_t>  r_pktid;       // save pktid
+    sc_signal<typename vci_param::data_t>   r_tdata;       // save read data
+
+    sc_signal<int>                     r_initiator_fsm;    // initiator FSM state
+    sc_signal<bool>                    r_irq_enable;       // IRQ enable
+    sc_signal<uint32_t>                r_nblocks;          // number of blocks
+    sc_signal<uint64_t>                r_buf_address;      // memory buffer address
+    sc_signal<uint32_t>                r_lba;              // first block index
+    sc_signal<bool>                    r_read;             // disk read / disk write
+    sc_signal<bool>                    r_go;               // transfer requested
+    sc_signal<uint32_t>                r_index;            // current block index
+    sc_signal<uint32_t>                r_burst_count;      // burst index in block
+    sc_signal<uint32_t>                r_words_count;      // word index in burst
+    sc_signal<uint32_t>                r_latency_count;    // latency counter
+    sc_signal<bool>                    r_vci_error;        // VCI error in burst
+
+    uint8_t*                           m_local_buffer;     // one block buffer
+    const uint8_t*                     m_block_data;       // current block data
+    soclib::common::DiskImageBackend*  m_backend;
+
+    const uint32_t                     m_srcid;
+    std::list<soclib::common::Segment> m_seglist;
+    const uint32_t                     m_block_size;
+    const uint32_t                     m_burst_size;
+    const uint32_t                     m_words_per_burst;
+    const uint32_t                     m_bursts_per_block;
+    const uint32_t                     m_latency;
+
+    // Activity counters
+    uint32_t                           m_cpt_cycles;
+    uint32_t                           m_cpt_read;         // blocks read
+    uint32_t                           m_cpt_write;        // blocks written
+
+protected:
+
+    SC_HAS_PROCESS(VciBlockDeviceAsync);
+
+public:
+
+    // FSM states
+    enum T_fsm_state_e
+    {
+        T_IDLE,
+        T_RSP_READ,
+        T_RSP_WRITE,
+        T_ERROR_READ,
+        T_ERROR_WRITE,
+    };
+
+    enum M_fsm_state_e
+    {
+        M_IDLE,
+        M_LATENCY,
+        M_READ_BLOCK,
+        M_READ_CMD,
+        M_READ_RSP,
+        M_READ_SUCCESS,
+        M_READ_ERROR,
+        M_WRITE_CMD,
+        M_WRITE_RSP,
+        M_WRITE_BLOCK,
+        M_WRITE_SYNC,
+        M_WRITE_SUCCESS,
+        M_WRITE_ERROR,
+    };
+
+    // addressable registers (same as VciBlockDeviceTsar)
+    enum register_e
+    {
+        BLOCK_DEVICE_BUFFER,
+        BLOCK_DEVICE_LBA,
+        BLOCK_DEVICE_COUNT,
+        BLOCK_DEVICE_OP,
+        BLOCK_DEVICE_STATUS,
+        BLOCK_DEVICE_IRQ_ENABLE,
+        BLOCK_DEVICE_SIZE,
+        BLOCK_DEVICE_BLOCK_SIZE,
+        BLOCK_DEVICE_BUFFER_EXT,
+    };
+
+    enum op_e
+    {
+        BLOCK_DEVICE_NOOP,
+        BLOCK_DEVICE_READ,
+        BLOCK_DEVICE_WRITE,
+    };
+
+    enum status_e
+    {
+        BLOCK_DEVICE_IDLE,
+        BLOCK_DEVICE_BUSY,
+        BLOCK_DEVICE_READ_SUCCESS,
+        BLOCK_DEVICE_WRITE_SUCCESS,
+        BLOCK_DEVICE_READ_ERROR,
+        BLOCK_DEVICE_WRITE_ERROR,
+        BLOCK_DEVICE_ERROR,
+    };
+
+    // ports
+    sc_in<bool>                                  p_clk;
+    sc_in<bool>                                  p_resetn;
+    soclib::caba::VciInitiator<vci_param>        p_vci_initiator;
+    soclib::caba::VciTarget<vci_param>           p_vci_target;
+    sc_out<bool>                                 p_irq;
+
+    void print_trace();
+
+    void print_stats();
+
+    // Constructor
+    VciBlockDeviceAsync(
+        sc_module_name                      name,
+        const soclib::common::MappingTable  &mt,
+        const soclib::common::IntTab        &srcid,
+        const soclib::common::IntTab        &tgtid,
+        const std::string                   &filename,
+        const uint32_t                      block_size      = 512,
+        const uint32_t                      burst_size      = 64,
+        const uint32_t                      latency         = 0,
+        const size_t                        nb_threads      = 2,
+        const size_t                        cache_blocks    = 4096,
+        const size_t                        prefetch_blocks = 16,
+        const bool                          use_mmap        = false );
+
+    ~VciBlockDeviceAsync();
+
+private:
+
+    void transition();
+    void genMoore();
+
+    uint32_t status();
+};
+
+}}
+
+#endif /* SOCLIB_VCI_BLOCK_DEVICE_ASYNC_H */
+
+// Local Variables:
+// tab-width: 4
+// c-basic-offset: 4
+// c-file-offsets:((innamespace . 0)(inline-open . 0))
+// indent-tabs-mode: nil
+// End:
+
+// vim: filetype=cpp:expandtab:shiftwidth=4:tabstop=4:softtabstop=4
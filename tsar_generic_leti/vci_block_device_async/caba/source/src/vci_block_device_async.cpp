@@ -0,0 +1,601 @@
+//////////////////////////////////////////////////////////////////////////////
+// File: vci_block_device_async.cpp
+// Copyright: UPMC/LIP6
+// Date : october 2026
+// This program is released under the GNU public license
+//////////////////////////////////////////////////////////////////////////////
+
+#include <cstring>
+#include <cstdlib>
+#include <cassert>
+#include <iostream>
+
+#include "../include/vci_block_device_async.h"
+
+namespace soclib { namespace caba {
+
+#define tmpl(t) template<typename vci_param> t VciBlockDeviceAsync<vci_param>
+
+using namespace soclib::caba;
+using namespace soclib::common;
+
+static const char* const SoclibBdaTargetFsmStr[] =
+{
+    "T_IDLE",
+    "T_RSP_READ",
+    "T_RSP_WRITE",
+    "T_ERROR_READ",
+    "T_ERROR_WRITE",
+};
+
+static const char* const SoclibBdaInitiatorFsmStr[] =
+{
+    "M_IDLE",
+    "M_LATENCY",
+    "M_READ_BLOCK",
+    "M_READ_CMD",
+    "M_READ_RSP",
+    "M_READ_SUCCESS",
+    "M_READ_ERROR",
+    "M_WRITE_CMD",
+    "M_WRITE_RSP",
+    "M_WRITE_BLOCK",
+    "M_WRITE_SYNC",
+    "M_WRITE_SUCCESS",
+    "M_WRITE_ERROR",
+};
+
+////////////////////////
+tmpl(uint32_t)::status()
+////////////////////////
+{
+    switch ( r_initiator_fsm.read() )
+    {
+        case M_IDLE:          return BLOCK_DEVICE_IDLE;
+        case M_READ_SUCCESS:  return BLOCK_DEVICE_READ_SUCCESS;
+        case M_READ_ERROR:    return BLOCK_DEVICE_READ_ERROR;
+        case M_WRITE_SUCCESS: return BLOCK_DEVICE_WRITE_SUCCESS;
+        case M_WRITE_ERROR:   return BLOCK_DEVICE_WRITE_ERROR;
+        default:              return BLOCK_DEVICE_BUSY;
+    }
+}
+
+////////////////////////
+tmpl(void)::transition()
+////////////////////////
+{
+    if ( not p_resetn.read() )
+    {
+        r_target_fsm    = T_IDLE;
+        r_initiator_fsm = M_IDLE;
+        r_irq_enable    = false;
+        r_go            = false;
+        r_read          = false;
+        r_nblocks       = 0;
+        r_lba           = 0;
+        r_buf_address   = 0;
+        r_vci_error     = false;
+
+        m_cpt_cycles    = 0;
+        m_cpt_read      = 0;
+        m_cpt_write     = 0;
+        return;
+    }
+
+    m_cpt_cycles++;
+
+    //////////////////////////////////////////////////////////////////////////////
+    // The Target FSM controls the following registers:
+    // r_target_fsm, r_irq_enable, r_nblocks, r_buf_address, r_lba, r_go, r_read
+    // All commands must be one flit commands. The configuration registers
+    // cannot be written when a transfer is running (error response).
+    // Reading the STATUS register when the transfer is completed resets r_go,
+    // and acknowledges the IRQ.
+    //////////////////////////////////////////////////////////////////////////////
+
+    switch ( r_target_fsm.read() )
+    {
+        ////////////
+        case T_IDLE:
+        {
+            if ( not p_vci_target.cmdval.read() ) break;
+
+            r_srcid = p_vci_target.srcid.read();
+            r_trdid = p_vci_target.trdid.read();
+            r_pktid = p_vci_target.pktid.read();
+
+            typename vci_param::addr_t address = p_vci_target.address.read();
+            bool     read  = ( p_vci_target.cmd.read() == vci_param::CMD_READ );
+            bool     found = false;
+            uint32_t cell  = 0;
+
+            std::list<Segment>::iterator seg;
+            for ( seg = m_seglist.begin() ; seg != m_seglist.end() ; seg++ )
+            {
+                if ( seg->contains( address ) )
+                {
+                    found = true;
+                    cell  = (uint32_t)((address - seg->baseAddress()) >> 2);
+                    break;
+                }
+            }
+
+            if ( not found or not p_vci_target.eop.read() )
+            {
+                if ( read ) r_target_fsm = T_ERROR_READ;
+                else        r_target_fsm = T_ERROR_WRITE;
+                break;
+            }
+
+            bool idle = ( r_initiator_fsm.read() == M_IDLE );
+
+            if ( read )
+            {
+                r_target_fsm = T_RSP_READ;
+
+                if      ( cell == BLOCK_DEVICE_BUFFER )
+                    r_tdata = (uint32_t)r_buf_address.read();
+                else if ( cell == BLOCK_DEVICE_BUFFER_EXT )
+                    r_tdata = (uint32_t)(r_buf_address.read() >> 32);
+                else if ( cell == BLOCK_DEVICE_LBA )
+                    r_tdata = r_lba.read();
+                else if ( cell == BLOCK_DEVICE_COUNT )
+                    r_tdata = r_nblocks.read();
+                else if ( cell == BLOCK_DEVICE_IRQ_ENABLE )
+                    r_tdata = r_irq_enable.read();
+                else if ( cell == BLOCK_DEVICE_SIZE )
+                    r_tdata = (uint32_t)m_backend->nb_blocks();
+                else if ( cell == BLOCK_DEVICE_BLOCK_SIZE )
+                    r_tdata = m_block_size;
+                else if ( cell == BLOCK_DEVICE_STATUS )
+                {
+                    uint32_t s = status();
+                    r_tdata = s;
+                    if ( (s != BLOCK_DEVICE_IDLE) and (s != BLOCK_DEVICE_BUSY) ) r_go = false;
+                }
+                else
+                    r_target_fsm = T_ERROR_READ;
+            }
+            else
+            {
+                typename vci_param::data_t wdata = p_vci_target.wdata.read();
+
+                r_target_fsm = T_RSP_WRITE;
+
+                if ( cell == BLOCK_DEVICE_IRQ_ENABLE )
+                    r_irq_enable = ( wdata != 0 );
+                else if ( not idle )
+                    r_target_fsm = T_ERROR_WRITE;
+                else if ( cell == BLOCK_DEVICE_BUFFER )
+                    r_buf_address = (r_buf_address.read() & 0xFFFFFFFF00000000ULL) | (uint32_t)wdata;
+                else if ( cell == BLOCK_DEVICE_BUFFER_EXT )
+                    r_buf_address = (r_buf_address.read() & 0xFFFFFFFFULL) | ((uint64_t)wdata << 32);
+                else if ( cell == BLOCK_DEVICE_LBA )
+                    r_lba = wdata;
+                else if ( cell == BLOCK_DEVICE_COUNT )
+                    r_nblocks = wdata;
+                else if ( (cell == BLOCK_DEVICE_OP) and (wdata == BLOCK_DEVICE_READ) )
+                {
+                    r_read = true;
+                    r_go   = true;
+                }
+                else if ( (cell == BLOCK_DEVICE_OP) and (wdata == BLOCK_DEVICE_WRITE) )
+                {
+                    r_read = false;
+                    r_go   = true;
+                }
+                else if ( (cell != BLOCK_DEVICE_OP) or (wdata != BLOCK_DEVICE_NOOP) )
+                    r_target_fsm = T_ERROR_WRITE;
+            }
+            break;
+        }
+        ////////////////
+        case T_RSP_READ:
+        case T_RSP_WRITE:
+        case T_ERROR_READ:
+        case T_ERROR_WRITE:
+        {
+            if ( p_vci_target.rspack.read() ) r_target_fsm = T_IDLE;
+            break;
+        }
+    } // end switch target fsm
+
+    //////////////////////////////////////////////////////////////////////////////
+    // The Initiator FSM executes the transfer, block per block, and burst per
+    // burst. For a disk read, each block is obtained from the backend, and
+    // written in memory by VCI write bursts. For a disk write, each block is
+    // read from memory by VCI read bursts, and posted to the backend.
+    // The read request is posted to the backend when the transfer starts,
+    // and all posted writes are completed before the final status.
+    // The final states are left when the STATUS register has been read.
+    //////////////////////////////////////////////////////////////////////////////
+
+    switch ( r_initiator_fsm.read() )
+    {
+        ////////////
+        case M_IDLE:
+        {
+            if ( not r_go.read() ) break;
+
+            r_index         = 0;
+            r_burst_count   = 0;
+            r_words_count   = 0;
+            r_vci_error     = false;
+            r_latency_count = m_latency;
+
+            // the range is checked before posting the read-ahead, so that an
+            // illegal command never reaches the backend
+            bool illegal = ( (uint64_t)r_lba.read() + r_nblocks.read() > m_backend->nb_blocks() );
+
+            if ( r_read.read() and not illegal and (r_nblocks.read() != 0) )
+                m_backend->read_request( r_lba.read(), r_nblocks.read() );
+
+            r_initiator_fsm = M_LATENCY;
+            break;
+        }
+        ///////////////
+        case M_LATENCY:
+        {
+            if ( r_latency_count.read() )
+            {
+                r_latency_count = r_latency_count.read() - 1;
+                break;
+            }
+
+            bool illegal = ( (uint64_t)r_lba.read() + r_nblocks.read() > m_backend->nb_blocks() );
+
+            if ( r_read.read() )
+            {
+                if      ( illegal )                 r_initiator_fsm = M_READ_ERROR;
+                else if ( r_nblocks.read() == 0 )   r_initiator_fsm = M_READ_SUCCESS;
+                else                                r_initiator_fsm = M_READ_BLOCK;
+            }
+            else
+            {
+                if      ( illegal )                 r_initiator_fsm = M_WRITE_ERROR;
+                else if ( r_nblocks.read() == 0 )   r_initiator_fsm = M_WRITE_SUCCESS;
+                else                                r_initiator_fsm = M_WRITE_CMD;
+            }
+            break;
+        }
+        //////////////////
+        case M_READ_BLOCK:  // get one block from the backend
+        {
+            m_block_data  = m_backend->read_block( r_lba.read() + r_index.read(),
+                                                   m_local_buffer );
+            r_burst_count = 0;
+            r_words_count = 0;
+
+            if ( m_block_data == NULL )
+            {
+                r_initiator_fsm = M_READ_ERROR;
+            }
+            else
+            {
+                m_cpt_read++;
+                r_initiator_fsm = M_READ_CMD;
+            }
+            break;
+        }
+        ////////////////
+        case M_READ_CMD:    // send one VCI write burst
+        {
+            if ( not p_vci_initiator.cmdack.read() ) break;
+
+            if ( r_words_count.read() == (m_words_per_burst - 1) )
+            {
+                r_words_count   = 0;
+                r_initiator_fsm = M_READ_RSP;
+            }
+            else
+            {
+                r_words_count = r_words_count.read() + 1;
+            }
+            break;
+        }
+        ////////////////
+        case M_READ_RSP:    // wait the VCI write response
+        {
+            if ( not p_vci_initiator.rspval.read() ) break;
+
+            if ( (p_vci_initiator.rerror.read() & 0x1) != 0 )
+            {
+                r_initiator_fsm = M_READ_ERROR;
+            }
+            else if ( r_burst_count.read() == (m_bursts_per_block - 1) )
+            {
+                if ( r_index.read() == (r_nblocks.read() - 1) )
+                {
+                    r_initiator_fsm = M_READ_SUCCESS;
+                }
+                else
+                {
+                    r_index         = r_index.read() + 1;
+                    r_initiator_fsm = M_READ_BLOCK;
+                }
+            }
+            else
+            {
+                r_burst_count   = r_burst_count.read() + 1;
+                r_initiator_fsm = M_READ_CMD;
+            }
+            break;
+        }
+        /////////////////
+        case M_WRITE_CMD:   // send one VCI read burst
+        {
+            if ( p_vci_initiator.cmdack.read() )
+            {
+                r_words_count   = 0;
+                r_initiator_fsm = M_WRITE_RSP;
+            }
+            break;
+        }
+        /////////////////
+        case M_WRITE_RSP:   // store the VCI read response in the local buffer
+        {
+            if ( not p_vci_initiator.rspval.read() ) break;
+
+            typename vci_param::data_t word = p_vci_initiator.rdata.read();
+            uint32_t offset = r_burst_count.read() * m_burst_size + r_words_count.read() * vci_param::B;
+            bool     error  = r_vci_error.read() or
+                              ((p_vci_initiator.rerror.read() & 0x1) != 0);
+
+            if ( offset < m_block_size ) memcpy( m_local_buffer + offset, &word, vci_param::B );
+
+            r_vci_error = error;
+
+            if ( not p_vci_initiator.reop.read() )
+            {
+                r_words_count = r_words_count.read() + 1;
+            }
+            else if ( error )
+            {
+                r_initiator_fsm = M_WRITE_SYNC;
+            }
+            else if ( r_burst_count.read() == (m_bursts_per_block - 1) )
+            {
+                r_initiator_fsm = M_WRITE_BLOCK;
+            }
+            else
+            {
+                r_burst_count   = r_burst_count.read() + 1;
+                r_initiator_fsm = M_WRITE_CMD;
+            }
+            break;
+        }
+        ///////////////////
+        case M_WRITE_BLOCK: // post one block to the backend
+        {
+            bool ok = m_backend->write_block( r_lba.read() + r_index.read(),
+                                              m_local_buffer );
+            m_cpt_write++;
+            r_burst_count = 0;
+
+            if ( not ok )
+            {
+                r_vci_error     = true;
+                r_initiator_fsm = M_WRITE_SYNC;
+            }
+            else if ( r_index.read() == (r_nblocks.read() - 1) )
+            {
+                r_initiator_fsm = M_WRITE_SYNC;
+            }
+            else
+            {
+                r_index         = r_index.read() + 1;
+                r_initiator_fsm = M_WRITE_CMD;
+            }
+            break;
+        }
+        //////////////////
+        case M_WRITE_SYNC:  // wait completion of the posted writes
+        {
+            if ( m_backend->write_sync() and not r_vci_error.read() )
+                r_initiator_fsm = M_WRITE_SUCCESS;
+            else
+                r_initiator_fsm = M_WRITE_ERROR;
+            break;
+        }
+        ////////////////////
+        case M_READ_SUCCESS:
+        case M_READ_ERROR:
+        case M_WRITE_SUCCESS:
+        case M_WRITE_ERROR:
+        {
+            if ( not r_go.read() ) r_initiator_fsm = M_IDLE;
+            break;
+        }
+    } // end switch initiator fsm
+} // end transition()
+
+//////////////////////
+tmpl(void)::genMoore()
+//////////////////////
+{
+    // VCI target port
+    p_vci_target.cmdack  = ( r_target_fsm.read() == T_IDLE );
+    p_vci_target.rspval  = ( r_target_fsm.read() != T_IDLE );
+    p_vci_target.rsrcid  = r_srcid.read();
+    p_vci_target.rtrdid  = r_trdid.read();
+    p_vci_target.rpktid  = r_pktid.read();
+    p_vci_target.reop    = true;
+
+    switch ( r_target_fsm.read() )
+    {
+        case T_RSP_READ:
+            p_vci_target.rdata  = r_tdata.read();
+            p_vci_target.rerror = vci_param::ERR_NORMAL;
+            break;
+        case T_ERROR_READ:
+        case T_ERROR_WRITE:
+            p_vci_target.rdata  = 0;
+            p_vci_target.rerror = vci_param::ERR_GENERAL_DATA_ERROR;
+            break;
+        default:
+            p_vci_target.rdata  = 0;
+            p_vci_target.rerror = vci_param::ERR_NORMAL;
+            break;
+    }
+
+    // VCI initiator port
+    uint64_t address = r_buf_address.read()
+                       + (uint64_t)r_index.read() * m_block_size
+                       + r_burst_count.read() * m_burst_size;
+
+    p_vci_initiator.srcid   = m_srcid;
+    p_vci_initiator.trdid   = 0;
+    p_vci_initiator.pktid   = 0;
+    p_vci_initiator.be      = (1 << vci_param::B) - 1;
+    p_vci_initiator.plen    = m_burst_size;
+    p_vci_initiator.cons    = false;
+    p_vci_initiator.contig  = true;
+    p_vci_initiator.wrap    = false;
+    p_vci_initiator.cfixed  = false;
+    p_vci_initiator.clen    = 0;
+
+    if ( r_initiator_fsm.read() == M_READ_CMD )
+    {
+        uint32_t offset = r_words_count.read() * vci_param::B;
+        typename vci_param::data_t word = 0;
+        memcpy( &word, m_block_data + r_burst_count.read() * m_burst_size + offset, vci_param::B );
+
+        p_vci_initiator.cmdval  = true;
+        p_vci_initiator.cmd     = vci_param::CMD_WRITE;
+        p_vci_initiator.address = (typename vci_param::addr_t)(address + offset);
+        p_vci_initiator.wdata   = word;
+        p_vci_initiator.eop     = ( r_words_count.read() == (m_words_per_burst - 1) );
+    }
+    else if ( r_initiator_fsm.read() == M_WRITE_CMD )
+    {
+        p_vci_initiator.cmdval  = true;
+        p_vci_initiator.cmd     = vci_param::CMD_READ;
+        p_vci_initiator.address = (typename vci_param::addr_t)address;
+        p_vci_initiator.wdata   = 0;
+        p_vci_initiator.eop     = true;
+    }
+    else
+    {
+        p_vci_initiator.cmdval  = false;
+        p_vci_initiator.cmd     = vci_param::CMD_NOP;
+        p_vci_initiator.address = 0;
+        p_vci_initiator.wdata   = 0;
+        p_vci_initiator.eop     = false;
+    }
+
+    p_vci_initiator.rspack = ( (r_initiator_fsm.read() == M_READ_RSP) or
+                               (r_initiator_fsm.read() == M_WRITE_RSP) );
+
+    // IRQ
+    uint32_t s = status();
+    p_irq = r_irq_enable.read() and (s != BLOCK_DEVICE_IDLE) and (s != BLOCK_DEVICE_BUSY);
+} // end genMoore()
+
+//////////////////////////////////////////////////////////////////////////////
+tmpl(/**/)::VciBlockDeviceAsync( sc_core::sc_module_name              name,
+                                 const soclib::common::MappingTable   &mt,
+                                 const soclib::common::IntTab         &srcid,
+                                 const soclib::common::IntTab         &tgtid,
+                                 const std::string                    &filename,
+                                 const uint32_t                       block_size,
+                                 const uint32_t                       burst_size,
+                                 const uint32_t                       latency,
+                                 const size_t                         nb_threads,
+                                 const size_t                         cache_blocks,
+                                 const size_t                         prefetch_blocks,
+                                 const bool                           use_mmap )
+//////////////////////////////////////////////////////////////////////////////
+    : caba::BaseModule(name),
+      m_srcid( mt.indexForId(srcid) ),
+      m_seglist( mt.getSegmentList(tgtid) ),
+      m_block_size( block_size ),
+      m_burst_size( burst_size ),
+      m_words_per_burst( burst_size / vci_param::B ),
+      m_bursts_per_block( block_size / burst_size ),
+      m_latency( latency ),
+      p_clk( "p_clk" ),
+      p_resetn( "p_resetn" ),
+      p_vci_initiator( "p_vci_initiator" ),
+      p_vci_target( "p_vci_target" ),
+      p_irq( "p_irq" )
+{
+    std::cout << "  - Building VciBlockDeviceAsync " << name << std::endl;
+
+    assert( (m_seglist.size() == 1) and
+            "VCI_BLOCK_DEVICE_ASYNC error : only one segment allowed" );
+
+    assert( ((block_size & (block_size - 1)) == 0) and (block_size >= 64) and
+            "VCI_BLOCK_DEVICE_ASYNC error : block size must be a power of 2 >= 64" );
+
+    assert( ((burst_size & (burst_size - 1)) == 0) and (burst_size >= vci_param::B) and
+            (burst_size <= block_size) and
+            "VCI_BLOCK_DEVICE_ASYNC error : illegal burst size" );
+
+    m_local_buffer = new uint8_t[block_size];
+    m_block_data   = m_local_buffer;
+
+    m_backend = new soclib::common::DiskImageBackend( filename,
+                                                      block_size,
+                                                      nb_threads,
+                                                      cache_blocks,
+                                                      prefetch_blocks,
+                                                      use_mmap );
+
+    if ( m_backend->nb_blocks() == 0 )
+    {
+        std::cout << "VCI_BLOCK_DEVICE_ASYNC error : cannot use disk image "
+                  << filename << std::endl;
+        exit(1);
+    }
+
+    SC_METHOD(transition);
+    dont_initialize();
+    sensitive << p_clk.pos();
+
+    SC_METHOD(genMoore);
+    dont_initialize();
+    sensitive << p_clk.neg();
+}
+
+////////////////////////////////////
+tmpl(/**/)::~VciBlockDeviceAsync()
+////////////////////////////////////
+{
+    delete m_backend;
+    delete [] m_local_buffer;
+}
+
+/////////////////////////
+tmpl(void)::print_trace()
+/////////////////////////
+{
+    std::cout << "BDA_" << name()
+              << " : " << SoclibBdaTargetFsmStr[r_target_fsm.read()]
+              << " / " << SoclibBdaInitiatorFsmStr[r_initiator_fsm.read()]
+              << " / lba = " << r_lba.read()
+              << " / block = " << r_index.read()
+              << " / burst = " << r_burst_count.read()
+              << " / word = " << r_words_count.read()
+              << " / go = " << r_go.read() << std::endl;
+}
+
+/////////////////////////
+tmpl(void)::print_stats()
+/////////////////////////
+{
+    std::cout << "BDA_" << name() << " : cycles = " << m_cpt_cycles
+              << " / blocks read = " << m_cpt_read
+              << " / blocks written = " << m_cpt_write << std::endl;
+    m_backend->print_stats();
+}
+
+}} // end namespace
+
+// Local Variables:
+// tab-width: 4
+// c-basic-offset: 4
+// c-file-offsets:((innamespace . 0)(inline-open . 0))
+// indent-tabs-mode: nil
+// End:
+
+// vim: filetype=cpp:expandtab:shiftwidth=4:tabstop=4:softtabstop=4